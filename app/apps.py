@@ -2,4 +2,18 @@ from django.apps import AppConfig
 
 class App(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app'
\ No newline at end of file
+    name = 'app'
+
+    def ready(self):
+        # PRAGMA de SQLite (WAL, synchronous, busy_timeout) en cada conexión nueva; ver settings.SQLITE_PRAGMAS
+        from django.db.backends.signals import connection_created
+        from .layers.persistence import sqlite
+        connection_created.connect(sqlite.configure_connection, dispatch_uid='app.sqlite.configure_connection')
+
+        # tiempo y cantidad de consultas SQL de cada request (capa 'db' de Server-Timing y /metrics)
+        from .layers.utilities import metrics
+        connection_created.connect(metrics.install_query_timer, dispatch_uid='app.metrics.install_query_timer')
+
+        # refresco periódico del catálogo en segundo plano, si está activado (config.CATALOG_REFRESH_INTERVAL)
+        from .layers.transport import refresher
+        refresher.start()
@@ -1,10 +1,42 @@
 # archivo de configuración del sistema.
+import os
+
+# carpeta raíz del proyecto (donde está manage.py).
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # versión del TP.
 VERSION = 'Trabajo práctico - PRIMER SEMESTRE 2025'
 
 # URL - API
-STUDENTS_REST_API_URL = 'https://pokeapi.co/api/v2/pokemon/'
+STUDENTS_REST_API_URL = os.environ.get('POKEMON_API_URL', 'https://pokeapi.co/api/v2/pokemon/')
+
+# ORIGEN DE LOS DATOS - 'http' (la API de STUDENTS_REST_API_URL) o 'mirror' (copia local en POKEMON_MIRROR_PATH: carpeta
+# con <id>.json, archivo .zip, base SQLite o 'database' para la tabla del catálogo; ver transport/mirror.py). El comando
+# export_mirror arma un mirror desde el cache.
+POKEMON_SOURCE = os.environ.get('POKEMON_SOURCE', 'http')
+POKEMON_MIRROR_PATH = os.environ.get('POKEMON_MIRROR_PATH', os.path.join(BASE_DIR, 'mirror'))
+
+# IMÁGENES - las de este origen se sirven a través del proxy /sprites/ como miniaturas guardadas en disco (ver transport/images.py).
+SPRITES_BASE_URL = os.environ.get('POKEMON_SPRITES_URL', 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/')
+THUMBNAIL_SIZES = {'card': 256, 'icon': 64}  # lado máximo en px (aprox. el doble de lo que ocupan en pantalla, por pantallas de alta densidad)
+IMAGE_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'images')
+IMAGE_MAX_AGE = 60 * 60 * 24 * 365  # las miniaturas no cambian: los navegadores pueden guardarlas un año sin revalidar
+IMAGE_MISSING_TTL = 5 * 60  # segundos durante los que no se vuelve a pedir al origen una imagen que respondió 404
+
+# CATÁLOGO - cantidad de Pokémon a mostrar (IDs 1..N; 151 = primera generación, 1025 = todas) y cards por página.
+POKEMON_CATALOG_SIZE = int(os.environ.get('POKEMON_CATALOG_SIZE', 151))
+PAGE_SIZE = 24
+API_MAX_LIMIT = 100  # máximo de pokemon por página en la API JSON (parámetro limit)
+CARD_FRAGMENT_TIMEOUT = 60 * 60  # segundos que se guarda el HTML ya dibujado de cada card (la clave incluye la versión del catálogo)
+CATALOG_MAX_AGE = 60  # segundos que navegadores y proxies pueden reutilizar una página del catálogo sin revalidarla
+FAVOURITES_MAX_BATCH = 100  # pokemon que se pueden agregar o borrar de favoritos en un solo pedido
+AUTOCOMPLETE_LIMIT = 8  # sugerencias por defecto del autocompletado del buscador (parámetro limit)
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_CACHE_SIZE = 4096  # respuestas del autocompletado guardadas por proceso (se vacían al cambiar el catálogo)
+# si es True, una página del catálogo que no está en cache se envía en streaming: primero el encabezado y el buscador y
+# después cada card, en orden de ID, apenas llegan sus datos (ver views.stream_render). Solo con el motor 'threads': con
+# el 'async' (el de ASGI) los datos llegan todos juntos y la página se dibuja entera (ver transport.can_stream).
+STREAM_COLD_PAGES = os.environ.get('POKEMON_STREAM_COLD_PAGES', '1').lower() in ('1', 'true', 'yes')
 
 TYPE_ID_MAP = {
     'normal': 1,
@@ -25,4 +57,37 @@ TYPE_ID_MAP = {
     'dragon': 16,
     'dark': 17,
     'fairy': 18
-}
\ No newline at end of file
+}
+
+# SNAPSHOT - copia persistente en disco del cache de Pokémon (ver transport/snapshot.py)
+SNAPSHOT_PATH = os.path.join(BASE_DIR, 'pokemon_cache.json')
+SNAPSHOT_TTL = 60 * 60 * 24  # segundos que una entrada se considera fresca
+SNAPSHOT_SAVE_INTERVAL = 30  # segundos mínimos entre escrituras del snapshot; las que llegan antes se juntan en una
+
+# REFRESCO - cada cuántos segundos un hilo del proceso vuelve a pedir el catálogo a la API (0 = desactivado; ver transport/refresher.py).
+# También se puede refrescar desde afuera con: python manage.py refresh_catalog
+CATALOG_REFRESH_INTERVAL = int(os.environ.get('POKEMON_REFRESH_INTERVAL', 0))
+
+# CACHE COMPARTIDO - alias de settings.CACHES donde se guardan los Pokémon (ver transport/shared_cache.py)
+POKEMON_CACHE_ALIAS = 'pokemon'
+POKEMON_CACHE_LOCK_TIMEOUT = 60  # segundos que dura como máximo el lock de recarga
+POKEMON_CACHE_LOCK_WAIT = 30  # segundos que espera un proceso a que otro publique el catálogo
+
+# MOTOR DE DESCARGA - 'threads' (ThreadPoolExecutor + requests) o 'async' (asyncio + httpx, ver transport/async_transport.py).
+# main/asgi.py elige 'async' por defecto.
+TRANSPORT_ENGINE = os.environ.get('POKEMON_TRANSPORT_ENGINE', 'threads')
+
+# VISTAS ASYNC - si es True, las vistas del catálogo y de favoritos son las variantes async de views.py (ORM async y
+# descargas con el motor async), para que un proceso ASGI atienda muchos usuarios mientras espera a PokeAPI o a la base.
+# main/asgi.py las activa por defecto; bajo WSGI conviene dejarlas apagadas (cada request async necesita su event loop).
+ASYNC_VIEWS = os.environ.get('POKEMON_ASYNC_VIEWS', '0').lower() in ('1', 'true', 'yes')
+
+# MÉTRICAS - /metrics solo responde a usuarios staff o a quien mande este token en la cabecera
+# "Authorization: Bearer <token>" (lo que se configura en el scrape de Prometheus). Vacío: solo staff.
+METRICS_TOKEN = os.environ.get('POKEMON_METRICS_TOKEN', '')
+
+# API CAÍDA O LENTA - ver transport/circuit_breaker.py
+CIRCUIT_FAILURE_THRESHOLD = 10  # fallas seguidas (timeouts, errores de red, 5xx) que abren el circuito
+CIRCUIT_RESET_TIMEOUT = 30  # segundos con el circuito abierto antes de probar de nuevo
+FETCH_DEADLINE = 15  # segundos como máximo para una descarga en lote; lo que no llegó se omite
+NEGATIVE_CACHE_TTL = 30  # segundos durante los que no se vuelve a pedir un Pokémon que falló
@@ -1,43 +1,122 @@
 # capa DAO de acceso/persistencia de datos.
 
-from sqlite3 import IntegrityError
-from app.models import Favourite
+from django.db import DatabaseError
+from app.layers.utilities import metrics
+from app.models import Favourite, Pokemon
+
+# columnas del catálogo que se copian de la card (todas menos el id)
+POKEMON_FIELDS = ('name', 'height', 'weight', 'base_experience', 'types', 'image')
 
 
 def save_favourite(fav):
+    # un INSERT OR IGNORE: si el usuario ya lo tenía no se lanza IntegrityError ni se aborta la transacción
+    return add_favourites(fav.user, [fav])
+
+
+@metrics.timed('repository')
+def add_favourites(user, cards):
+    """
+    Guarda varios favoritos del usuario: primero asegura que cada Pokémon esté en el catálogo (un INSERT ... ON
+    CONFLICT DO UPDATE) y después crea los favoritos en una sola consulta; los que ya tenía se ignoran.
+
+    Returns:
+        int: cantidad de favoritos enviados a la base (incluye los ignorados por repetidos)
+    """
     try:
-        fav = Favourite.objects.create(
-            name=fav.name,  # Nombre del personaje
-            pokemon_id=fav.id,  # ID de pokeapi
-            types=fav.types,  # tipos
-            height=fav.height,  # altura
-            weight=fav.weight,  # peso
-            image=fav.image,  # Imagen
-            user=fav.user  # Usuario autenticado
+        # sin transacción: si falla el segundo INSERT, que el catálogo quede actualizado no molesta
+        save_pokemon(cards)
+        favourites = [Favourite(pokemon_id=card.id, user=user) for card in cards]
+        return len(Favourite.objects.bulk_create(favourites, ignore_conflicts=True))
+    except (DatabaseError, ValueError, TypeError) as e:
+        print(f"Error al guardar los favoritos: {e}")
+        return 0
+
+
+def save_pokemon(cards):
+    """Agrega o actualiza en el catálogo los Pokémon de las cards, en una sola consulta."""
+    catalog = _catalog_rows(cards)
+    if not catalog:
+        return 0
+    return len(Pokemon.objects.bulk_create(catalog, update_conflicts=True, unique_fields=['id'], update_fields=POKEMON_FIELDS))
+
+
+def get_pokemon_ids():
+    """IDs de los Pokémon guardados en el catálogo de la base."""
+    return list(Pokemon.objects.values_list('id', flat=True))
+
+
+def _catalog_rows(cards):
+    return [
+        Pokemon(
+            id=card.id,  # ID de pokeapi
+            name=card.name,  # Nombre del personaje
+            height=card.height,  # altura
+            weight=card.weight,  # peso
+            base_experience=card.base,  # experiencia base
+            types=card.types,  # tipos
+            image=card.image or '',  # Imagen
         )
-        return fav
-    except IntegrityError as e:
-        print(f"Error de integridad al guardar el favorito: {e}")
-        return None
-    except KeyError as e:
-        print(f"Error de datos al guardar el favorito: Falta el campo {e}")
-        return None
+        for card in cards
+    ]
 
 
+@metrics.timed('repository')
 def get_all_favourites(user):
-    return list(Favourite.objects.filter(user=user).values(
-        'id', 'pokemon_id', 'name', 'height', 'weight', 'types','base_experience', 'image'
-    ))
+    # un solo SELECT con JOIN al catálogo, ordenado por el índice (user, pokemon)
+    return list(Pokemon.objects.filter(favourites__user=user).order_by('favourites__pokemon_id').values('id', *POKEMON_FIELDS))
+
+
+# versiones async para las vistas async (ORM async de Django: abulk_create, adelete, iteración con async for).
+# Hacen las mismas consultas que las de arriba.
+@metrics.timed('repository')
+async def aadd_favourites(user, cards):
+    try:
+        catalog = _catalog_rows(cards)
+        if catalog:
+            await Pokemon.objects.abulk_create(catalog, update_conflicts=True, unique_fields=['id'], update_fields=POKEMON_FIELDS)
+        favourites = [Favourite(pokemon_id=card.id, user=user) for card in cards]
+        return len(await Favourite.objects.abulk_create(favourites, ignore_conflicts=True))
+    except (DatabaseError, ValueError, TypeError) as e:
+        print(f"Error al guardar los favoritos: {e}")
+        return 0
+
+
+@metrics.timed('repository')
+async def aget_all_favourites(user):
+    return [favourite async for favourite in Pokemon.objects.filter(favourites__user=user).order_by('favourites__pokemon_id').values('id', *POKEMON_FIELDS)]
+
+
+@metrics.timed('repository')
+async def adelete_favourites(user, pokemon_ids):
+    try:
+        deleted, _ = await Favourite.objects.filter(user=user, pokemon_id__in=pokemon_ids).adelete()
+    except (DatabaseError, ValueError) as e:
+        print(f"Error al eliminar los favoritos: {e}")
+        return 0
+    if not deleted:
+        print(f"Los favoritos {list(pokemon_ids)} no existen o no pertenecen al usuario.")
+    return deleted
+
+
+def delete_favourite(user, pokemon_id):
+    """Borra el favorito pokemon_id del usuario (un solo DELETE). Devuelve True si existía."""
+    return delete_favourites(user, [pokemon_id]) > 0
+
 
+@metrics.timed('repository')
+def delete_favourites(user, pokemon_ids):
+    """
+    Borra varios favoritos del usuario en una sola consulta. El filtro por usuario hace que nadie pueda borrar
+    favoritos ajenos aunque mande IDs de otros.
 
-def delete_favourite(fav_id):
+    Returns:
+        int: cantidad de favoritos borrados
+    """
     try:
-        favourite = Favourite.objects.get(id=fav_id)
-        favourite.delete()
-        return True
-    except Favourite.DoesNotExist:
-        print(f"El favorito con ID {fav_id} no existe o no pertenece al usuario.")
-        return False
-    except Exception as e:
-        print(f"Error al eliminar el favorito: {e}")
-        return False
+        deleted, _ = Favourite.objects.filter(user=user, pokemon_id__in=pokemon_ids).delete()
+    except (DatabaseError, ValueError) as e:
+        print(f"Error al eliminar los favoritos: {e}")
+        return 0
+    if not deleted:
+        print(f"Los favoritos {list(pokemon_ids)} no existen o no pertenecen al usuario.")
+    return deleted
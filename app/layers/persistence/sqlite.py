@@ -0,0 +1,20 @@
+# sqlite: ajustes de SQLite para varios hilos o workers escribiendo y leyendo a la vez (favoritos, sesiones).
+# Se aplican al abrir cada conexión (señal connection_created, conectada en apps.py) a partir de settings.SQLITE_PRAGMAS.
+
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_pragmas(connection, names=None):
+    """Valores actuales de los PRAGMA de la conexión (por defecto, los de settings.SQLITE_PRAGMAS)."""
+    names = names or list(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    with connection.cursor() as cursor:
+        return {name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in names}
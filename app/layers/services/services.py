@@ -1,81 +1,373 @@
 # capa de servicio/lógica de negocio
 
-from ..transport import transport
+import json
+from bisect import bisect_right
+from datetime import datetime, timezone
+from asgiref.sync import sync_to_async
+from ..transport import async_transport, images, transport
 from ...config import config
 from ..persistence import repositories
-from ..utilities import translator
-from django.contrib.auth import get_user
+from ..utilities import metrics, translator
+from ..utilities.card import FrozenCard
+from ..utilities.search_index import NameIndex, TypeIndex
+from django.core.paginator import Paginator
+from django.urls import reverse
 
 # función que devuelve un listado de cards. Cada card representa una imagen de la API de Pokemon
 def getAllImages(request=None):
     raw_images = transport.getAllImages()
-    favourite_ids = []
+    favourite_ids = getFavouriteIds(request)
 
-    # Solo obtener favoritos si hay request y el usuario está autenticado
-    if request and request.user.is_authenticated:
-        favourites = getAllFavourites(request)
-        favourite_ids = [str(card.id) for card in favourites]
+    return [withFavourite(card, favourite_ids) for card in getCards(raw_images)]
 
-    card_list = []
+# cards ya convertidas, compartidas entre requests: {pokemon_id: (payload, card)}. Una card se reutiliza mientras transport
+# siga devolviendo el mismo objeto payload; si el cache se refresca, el payload es otro y la card se vuelve a armar.
+_card_cache = {}
 
+# función que convierte payloads de la API en cards sin volver a traducir los que ya se tradujeron.
+# Las cards devueltas son compartidas, así que son FrozenCard (de solo lectura; ver withFavourite).
+def getCards(raw_images):
+    cards = []
     for raw in raw_images:
-        card = translator.fromRequestIntoCard(raw)
-        card.is_favourite = str(card.id) in favourite_ids  # Marcar si ya es favorito
-        card_list.append(card)
+        cached = _card_cache.get(raw['id'])
+        if cached is None or cached[0] is not raw:
+            cached = (raw, FrozenCard.of(translator.fromRequestIntoCard(raw)))
+            _card_cache[raw['id']] = cached
+        cards.append(cached[1])
+    return cards
 
-    return card_list
+# marca la card como favorita del usuario. Como las cards del cache son compartidas, se marca una copia.
+def withFavourite(card, favourite_ids):
+    if card.id not in favourite_ids:
+        return card
+    return card.replace(is_favourite=True)
 
-# función que filtra según el nombre del pokemon.
-def filterByCharacter(name):
-    # Obtener todas las imágenes una sola vez
-    all_cards = getAllImages()
-    filtered_cards = []
+# función que devuelve una página del catálogo. Solo se obtienen (y se convierten en cards) los Pokémon de esa página.
+def getImagesPage(request, page_number):
+    catalog = CardCatalog(transport.get_catalog_ids(), getFavouriteIds(request))
+    return Paginator(catalog, config.PAGE_SIZE).get_page(page_number)
 
-    for card in all_cards:
-        # debe verificar si el name está contenido en el nombre de la card, antes de agregarlo al listado de filtered_cards.
-        if name.lower() in card.name.lower():            
-            filtered_cards.append(card)
+# página del catálogo para la respuesta en streaming (ver views.stream_render). Si todos los pokemon de la página ya están
+# en cache, o transport no los entrega de a uno (motor async o mirror, ver transport.can_stream), devuelve None (conviene
+# dibujarla de una vez con getImagesPage); si no, devuelve la página, paginada sobre los IDs, y un generador de sus cards
+# en orden de ID.
+def getColdImagesPage(request, page_number):
+    page = Paginator(transport.get_catalog_ids(), config.PAGE_SIZE).get_page(page_number)
+    if not transport.can_stream() or transport.is_cached(page.object_list):
+        return None
+    return page, iterCardsInOrder(list(page.object_list), getFavouriteIds(request))
 
-    return filtered_cards
+# cards de los pokemon indicados, en ese orden, a medida que transport los va obteniendo: cada card se entrega apenas
+# llegaron sus datos y los de todas las anteriores. Los que no se pudieron obtener se omiten.
+def iterCardsInOrder(pokemon_ids, favourite_ids):
+    arrived = {}
+    position = 0
+    for raw in transport.iter_pokemon(pokemon_ids):
+        arrived[raw['id']] = raw
+        while position < len(pokemon_ids) and pokemon_ids[position] in arrived:
+            yield withFavourite(getCards([arrived.pop(pokemon_ids[position])])[0], favourite_ids)
+            position += 1
 
-# función que filtra las cards según su tipo.
-def filterByType(type_filter):
-    # Obtener todas las imágenes una sola vez
-    all_cards = getAllImages()
-    filtered_cards = []
+    # lo que quedó detrás de un pokemon que falló
+    for pokemon_id in pokemon_ids[position:]:
+        if pokemon_id in arrived:
+            yield withFavourite(getCards([arrived[pokemon_id]])[0], favourite_ids)
 
-    for card in all_cards:
-        # debe verificar si la casa de la card coincide con la recibida por parámetro. Si es así, se añade al listado de filtered_cards.
-        if type_filter.lower() in [type.lower() for type in card.types]:
-            filtered_cards.append(card)
+# validadores HTTP del catálogo (ver views.catalog_etag): cambian cuando se refresca el cache de transport.
+def getCatalogVersion():
+    return transport.get_catalog_version()
 
-    return filtered_cards
+def getCatalogLastModified():
+    timestamp = transport.get_last_modified()
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp else None
 
-# añadir favoritos (usado desde el template 'home.html')
-def saveFavourite(request):
-    fav = translator.fromTemplateIntoCard(request) # transformamos un request en una Card (ver translator.py)
-    fav.user = get_user(request) # le asignamos el usuario correspondiente.
+# empieza a seguir si el request en curso recibe todos los pokemon que pide (ver transport.track_completeness): una
+# página armada con el deadline vencido o el cortacircuitos abierto puede quedar con cards de menos.
+def trackCatalogCompleteness():
+    return transport.track_completeness()
+
+# estado del catálogo: versión, cantidad de pokemon en cache, último refresco (fecha y duración; None si nunca se refrescó)
+# y estado del cortacircuitos de la API.
+def getCatalogStatus():
+    stats = transport.get_refresh_stats()
+    return {
+        'version': getCatalogVersion(),
+        'size': transport.get_cache_size(),
+        'last_modified': getCatalogLastModified(),
+        'last_refresh': datetime.fromtimestamp(stats['refreshed_at'], tz=timezone.utc) if stats else None,
+        'refresh_duration': stats['duration'] if stats else None,
+        'refresh_changed': stats['changed'] if stats else None,
+        'upstream': transport.get_upstream_state(),
+    }
+
+# métricas del proceso en formato de texto de Prometheus (ver utilities/metrics.py); los gauges se actualizan al pedirlas.
+def getMetrics():
+    metrics.registry.set('app_catalog_cache_size', transport.get_cache_size())
+    metrics.registry.set('app_upstream_circuit_open', int(transport.get_upstream_state() != 'closed'))
+    return metrics.registry.render()
+
+# función que pagina un listado de cards ya armado (por ejemplo, el resultado de un filtro).
+def paginate(cards, page_number):
+    return Paginator(cards, config.PAGE_SIZE).get_page(page_number)
+
+# conjunto de pokemon_id favoritos del usuario logueado; vacío si no hay request o no está autenticado.
+def getFavouriteIds(request):
+    if not request or not request.user.is_authenticated:
+        return set()
+    return {card.id for card in getAllFavourites(request)}
+
+class CardCatalog:
+    """
+    Catálogo "perezoso" para el Paginator de Django: sabe cuántos pokemon hay, pero solo le pide a transport
+    (y convierte en cards) los del slice que se pide.
+    """
+
+    def __init__(self, pokemon_ids, favourite_ids):
+        self.pokemon_ids = pokemon_ids
+        self.favourite_ids = favourite_ids
+
+    def __len__(self):
+        return len(self.pokemon_ids)
+
+    def __getitem__(self, index):
+        ids = self.pokemon_ids[index] if isinstance(index, slice) else [self.pokemon_ids[index]]
+        cards = [withFavourite(card, self.favourite_ids) for card in getCards(transport.get_pokemon(ids))]
+        return cards if isinstance(index, slice) else cards[0]
+
+# porción del catálogo para la API (paginación por cursor): los limit pokemon siguientes a after_id, opcionalmente
+# filtrados por una expresión de tipos. Como los IDs están ordenados, el cursor es simplemente el último ID entregado
+# y sigue siendo válido aunque el catálogo cambie entre una página y otra.
+# Devuelve (cards, cursor de la página siguiente o None si no hay más). Lanza ValueError si la expresión de tipos es inválida.
+def getCatalogSlice(after_id=None, limit=config.PAGE_SIZE, type_filter=None, request=None):
+    if type_filter:
+        _, type_index = getCatalogIndexes()
+        pokemon_ids = type_index.query(type_filter)
+    else:
+        pokemon_ids = transport.get_catalog_ids()
+
+    start = bisect_right(pokemon_ids, after_id) if after_id is not None else 0
+    page_ids = pokemon_ids[start:start + limit]
+    favourite_ids = getFavouriteIds(request)
+    cards = [withFavourite(card, favourite_ids) for card in getCards(transport.get_pokemon(page_ids))]
+
+    next_cursor = page_ids[-1] if start + limit < len(pokemon_ids) else None
+    return cards, next_cursor
+
+# recorre el catálogo completo de a chunk_size pokemon, sin armar la lista entera (usado por la respuesta en streaming de la API).
+def iterCatalog(request=None, chunk_size=config.PAGE_SIZE):
+    pokemon_ids = transport.get_catalog_ids()
+    favourite_ids = getFavouriteIds(request) # se consulta antes de empezar a responder, no en medio del streaming
+
+    def cards():
+        for start in range(0, len(pokemon_ids), chunk_size):
+            for card in getCards(transport.get_pokemon(pokemon_ids[start:start + chunk_size])):
+                yield withFavourite(card, favourite_ids)
+    return cards()
+
+# card de un pokemon del catálogo, o None si el ID no es parte del catálogo (o la API no lo devolvió).
+def getCard(pokemon_id, request=None):
+    if not transport.in_catalog(pokemon_id):
+        return None
+    raw_images = transport.get_pokemon([pokemon_id])
+    if not raw_images:
+        return None
+    return withFavourite(getCards(raw_images)[0], getFavouriteIds(request))
+
+# función que filtra según el nombre del pokemon (subcadena, prefijo o con errores de tipeo), ordenado por relevancia.
+def filterByCharacter(name, request=None):
+    favourite_ids = getFavouriteIds(request)
+    return [withFavourite(card, favourite_ids) for card in getCards(transport.get_pokemon(searchIdsByName(name)))]
+
+# IDs de los pokemon cuyo nombre coincide con name, ordenados por relevancia.
+def searchIdsByName(name):
+    name_index, _ = getCatalogIndexes()
+    return name_index.search(name)
+
+# función que filtra las cards según su tipo. Acepta combinaciones como "fire AND flying", "water OR ice" o
+# "grass NOT poison" (ver TypeIndex) y, opcionalmente, un nombre: en ese caso el orden es el de relevancia del nombre.
+# Lanza ValueError si la expresión de tipos es inválida.
+def filterByType(type_filter, name=None, request=None):
+    type_ids = searchIdsByType(type_filter, name)
+    favourite_ids = getFavouriteIds(request)
+    return [withFavourite(card, favourite_ids) for card in getCards(transport.get_pokemon(type_ids))]
+
+# IDs de los pokemon que cumplen la expresión de tipos (y el nombre, si se indica). Lanza ValueError si la expresión es inválida.
+def searchIdsByType(type_filter, name=None):
+    name_index, type_index = getCatalogIndexes()
+
+    type_ids = type_index.query(type_filter)
+    if name:
+        matching_types = set(type_ids)
+        type_ids = [pokemon_id for pokemon_id in name_index.search(name) if pokemon_id in matching_types]
+    return type_ids
+
+# índices de nombres y de tipos del catálogo; se arman una sola vez y se vuelven a armar solo cuando cambia el cache de transport.
+# Mientras la generación no cambie (y el índice tenga el catálogo completo) no se recorre el catálogo: cada búsqueda
+# cuesta lo que cuesta consultar el índice.
+_catalog_indexes = (None, None, None, False)  # (generación del cache, índice de nombres, índice de tipos, ¿catálogo completo?)
+
+def getCatalogIndexes():
+    global _catalog_indexes
+    cached_generation, name_index, type_index, complete = _catalog_indexes
+    if complete and cached_generation == transport.get_synced_generation():
+        return name_index, type_index
+
+    # falta algo (arranque en frío o pokemon que fallaron): se pide el catálogo entero, que obtiene lo que falte
+    raw_images = transport.getAllImages()
+    generation = transport.get_generation()
+    if cached_generation != generation:
+        name_index = NameIndex((raw['id'], raw['name']) for raw in raw_images)
+        type_index = TypeIndex((raw['id'], translator.getTypes(raw)) for raw in raw_images)
+    _catalog_indexes = (generation, name_index, type_index, len(raw_images) == len(transport.get_catalog_ids()))
+    return name_index, type_index
 
-    return repositories.save_favourite(fav)
+# sugerencias del buscador mientras se escribe: hasta limit pokemon cuyo nombre empieza con query (o, si no alcanzan,
+# lo contiene), como JSON compacto [{"id", "name", "image"}] con la miniatura chica. La respuesta ya serializada se
+# guarda por versión del catálogo, así cada tecla (de cualquier usuario) que se repite es una búsqueda en un diccionario.
+_suggestions = (None, {})  # (versión del catálogo, {(query, limit): json})
 
-# usados desde el template 'favourites.html'
+def getSuggestions(query, limit=config.AUTOCOMPLETE_LIMIT):
+    global _suggestions
+    key = ((query or '').strip().lower(), limit)
+    version = getCatalogVersion()
+    cached_version, responses = _suggestions
+    if cached_version != version:
+        responses = {}
+        _suggestions = (version, responses)
+
+    body = responses.get(key)
+    if body is None:
+        body = json.dumps(buildSuggestions(*key), separators=(',', ':'))
+        if len(responses) >= config.AUTOCOMPLETE_CACHE_SIZE:
+            responses.clear()
+        responses[key] = body
+    return body
+
+def buildSuggestions(query, limit):
+    name_index, _ = getCatalogIndexes()
+    cards = getCards(transport.get_pokemon(name_index.complete(query, limit)))
+    return [{'id': card.id, 'name': card.name, 'image': getThumbnailUrl(card.image, 'icon')} for card in cards]
+
+# pone al día la tabla del catálogo de la base (los Pokémon de los favoritos) con el catálogo de transport, por ejemplo
+# las filas que la migración 0008 copió de los favoritos. Devuelve la cantidad de filas guardadas.
+def syncPokemonTable():
+    pokemon_ids = [pokemon_id for pokemon_id in repositories.get_pokemon_ids() if transport.in_catalog(pokemon_id)]
+    return repositories.save_pokemon(getCards(transport.get_pokemon(pokemon_ids)))
+
+# añadir favoritos (usado desde el template 'home.html'). El formulario solo manda el id: el resto de los datos sale
+# del catálogo, así nadie puede guardar un favorito con datos inventados.
+def saveFavourite(request):
+    return addFavourites(request, request.POST.getlist('id'))
+
+# usados desde el template 'favourites.html'. El resultado se guarda en el request, así la consulta a la base se hace
+# una sola vez por request aunque lo usen la vista, getFavouriteIds y los filtros.
 def getAllFavourites(request):
     if not request.user.is_authenticated:
         return []
-    
-    user = get_user(request)
-    favourite_list = repositories.get_all_favourites(user) # buscamos desde el repositories.py TODOS Los favoritos del usuario (variable 'user').
+
+    if hasattr(request, '_favourite_cards'):
+        return request._favourite_cards
+
+    # request.user ya está cargado por el middleware; get_user(request) volvería a buscarlo en la base.
+    favourite_list = repositories.get_all_favourites(request.user) # buscamos desde el repositories.py TODOS Los favoritos del usuario.
     mapped_favourites = []
 
     for favourite in favourite_list:
         card = translator.fromRepositoryIntoCard(favourite) # convertimos cada favorito en una Card, y lo almacenamos en el listado de mapped_favourites que luego se retorna.
         mapped_favourites.append(card)
 
+    request._favourite_cards = mapped_favourites
     return mapped_favourites
 
+# borra los favoritos del usuario logueado. El template manda el pokemon_id de cada card en 'id' (puede ser más de uno).
+# lanzan ValueError si se mandan más de config.FAVOURITES_MAX_BATCH IDs (ver parsePokemonIds).
 def deleteFavourite(request):
-    fav_id = request.POST.get('id')
-    return repositories.delete_favourite(fav_id) # borramos un favorito por su ID
+    pokemon_ids = parsePokemonIds(request.POST.getlist('id'))
+    return repositories.delete_favourites(request.user, pokemon_ids)
+
+# agrega de una vez varios pokemon del catálogo a los favoritos del usuario (los datos salen del catálogo, no del formulario)
+# y guarda o actualiza esos pokemon en la tabla del catálogo de la base.
+def addFavourites(request, pokemon_ids):
+    cards = getCards(transport.get_pokemon(parseCatalogIds(pokemon_ids)))
+    return repositories.add_favourites(request.user, cards)
+
+# IDs enteros y sin repetir; los valores que no son números se descartan. Lanza ValueError si son más de
+# config.FAVOURITES_MAX_BATCH, así un pedido no puede disparar miles de consultas o descargas.
+def parsePokemonIds(values):
+    if len(values) > config.FAVOURITES_MAX_BATCH:
+        raise ValueError(f"Se pueden enviar como máximo {config.FAVOURITES_MAX_BATCH} pokemon por vez")
+    return sorted({int(value) for value in values if str(value).strip().isdigit()})
+
+# como parsePokemonIds, pero solo los IDs del catálogo: los demás no se piden a la API ni se guardan en ningún cache.
+def parseCatalogIds(values):
+    return [pokemon_id for pokemon_id in parsePokemonIds(values) if transport.in_catalog(pokemon_id)]
+
+# URL de la miniatura local (proxy /sprites/) de una imagen de PokeAPI. Las imágenes de otros orígenes quedan como están.
+def getThumbnailUrl(url, size):
+    if not url or not url.startswith(config.SPRITES_BASE_URL) or size not in config.THUMBNAIL_SIZES:
+        return url
+    return reverse('sprite', args=[size, url[len(config.SPRITES_BASE_URL):]])
+
+# miniatura en disco para el proxy de imágenes: (ruta del archivo, content type), o None si no existe.
+def getThumbnail(size, path):
+    return images.get_thumbnail(path, size)
+
+# versiones async de los servicios, usadas por las vistas async (ver config.ASYNC_VIEWS). Hacen lo mismo que las de
+# arriba sin bloquear el event loop: el usuario y los favoritos se leen con el ORM async y el catálogo se pide con
+# async_transport (el cache corre en un hilo y las descargas vuelven al event loop).
+
+# usuario del request. request.user se carga la primera vez que se usa, con consultas sync (sesión y usuario), así que
+# se resuelve en un hilo; después ya está cargado y se puede usar desde el event loop.
+async def getUserAsync(request):
+    def load_user():
+        request.user.is_authenticated  # fuerza la carga perezosa
+        return request.user
+
+    return await sync_to_async(load_user)()
+
+async def getAllFavouritesAsync(request):
+    user = await getUserAsync(request)
+    if not user.is_authenticated:
+        return []
+
+    if not hasattr(request, '_favourite_cards'):
+        favourite_list = await repositories.aget_all_favourites(user)
+        request._favourite_cards = [translator.fromRepositoryIntoCard(favourite) for favourite in favourite_list]
+    return request._favourite_cards
+
+async def getFavouriteIdsAsync(request):
+    if not request:
+        return set()
+    return {card.id for card in await getAllFavouritesAsync(request)}
+
+# cards de los pokemon indicados, marcadas según los favoritos del usuario.
+async def getCatalogCardsAsync(pokemon_ids, favourite_ids):
+    raw_images = await async_transport.get_pokemon(pokemon_ids)
+    return [withFavourite(card, favourite_ids) for card in getCards(raw_images)]
+
+# página del catálogo: se pagina sobre los IDs y después se piden a transport solo los de la página.
+async def getImagesPageAsync(request, page_number):
+    page = Paginator(transport.get_catalog_ids(), config.PAGE_SIZE).get_page(page_number)
+    page.object_list = await getCatalogCardsAsync(page.object_list, await getFavouriteIdsAsync(request))
+    return page
+
+async def filterByCharacterAsync(name, request=None):
+    pokemon_ids = await sync_to_async(searchIdsByName, thread_sensitive=False)(name)
+    return await getCatalogCardsAsync(pokemon_ids, await getFavouriteIdsAsync(request))
+
+# lanza ValueError si la expresión de tipos es inválida, igual que filterByType.
+async def filterByTypeAsync(type_filter, name=None, request=None):
+    type_ids = await sync_to_async(searchIdsByType, thread_sensitive=False)(type_filter, name)
+    return await getCatalogCardsAsync(type_ids, await getFavouriteIdsAsync(request))
+
+async def saveFavouriteAsync(request):
+    user = await getUserAsync(request)
+    cards = getCards(await async_transport.get_pokemon(parseCatalogIds(request.POST.getlist('id'))))
+    return await repositories.aadd_favourites(user, cards)
+
+async def deleteFavouriteAsync(request):
+    user = await getUserAsync(request)
+    return await repositories.adelete_favourites(user, parsePokemonIds(request.POST.getlist('id')))
 
 #obtenemos de TYPE_ID_MAP el id correspondiente a un tipo segun su nombre
 def get_type_icon_url_by_name(type_name):
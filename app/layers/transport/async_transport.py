@@ -0,0 +1,216 @@
+# async_transport: motor asíncrono para pedir muchos Pokémon a la vez.
+# Usa un único cliente httpx (pool de conexiones con keep-alive), un semáforo que limita la concurrencia y
+# reintentos con backoff exponencial + jitter. Se activa con config.TRANSPORT_ENGINE = 'async' (por defecto bajo ASGI).
+# El cliente es uno por proceso, como la requests.Session de transport.py: vive en un event loop propio (en un hilo
+# aparte), se crea con el primer lote y se cierra al terminar el proceso. Así las conexiones se reusan entre lotes
+# aunque cada lote se pida desde un event loop distinto (async_to_sync crea uno por llamada).
+
+import asyncio
+import atexit
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from ...config import config
+from . import circuit_breaker, conditional
+from .payload import project_payload
+
+ASYNC_MAX_CONCURRENCY = 20  # requests simultáneos como máximo
+ASYNC_RETRIES = 3  # reintentos ante timeouts, errores de red o 5xx
+ASYNC_BACKOFF_BASE = 0.2  # segundos; el n-ésimo reintento espera hasta BASE * 2**n
+REQUEST_TIMEOUT = 10
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def create_client() -> httpx.AsyncClient:
+    """Crea un cliente con pool de conexiones reutilizables, dimensionado según la concurrencia máxima."""
+    limits = httpx.Limits(
+        max_connections=ASYNC_MAX_CONCURRENCY,
+        max_keepalive_connections=ASYNC_MAX_CONCURRENCY,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Event loop del transporte, donde vive el cliente compartido. Se arranca con el primer lote."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='async-transport', daemon=True).start()
+        return _loop
+
+
+def get_client() -> httpx.AsyncClient:
+    """Cliente compartido; solo se usa desde el event loop del transporte."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+def close_client() -> None:
+    """Cierra el cliente compartido y detiene su event loop. Se llama al terminar el proceso."""
+    global _loop, _client
+    with _loop_lock:
+        loop, client, _loop, _client = _loop, _client, None, None
+    if loop is None:
+        return
+    if client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(REQUEST_TIMEOUT)
+        except Exception as e:
+            print(f"[async_transport.py]: No se pudo cerrar el cliente: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(close_client)
+
+
+def fetch_all_pokemon_sync(pokemon_ids, **kwargs) -> List[Dict]:
+    """fetch_all_pokemon para código sync: el lote corre en el event loop del transporte y acá se espera."""
+    return asyncio.run_coroutine_threadsafe(fetch_all_pokemon(pokemon_ids, **kwargs), get_loop()).result()
+
+
+async def fetch_all_pokemon(pokemon_ids, client: Optional[httpx.AsyncClient] = None,
+                            validators: Optional[Dict] = None, cached: Optional[Dict] = None,
+                            deadline: Optional[float] = None) -> List[Dict]:
+    """
+    Obtiene los Pokémon indicados de forma concurrente, ordenados por ID. Los que fallan se omiten.
+
+    Args:
+        pokemon_ids: IDs a pedir
+        client: cliente a usar; si no se pasa, el compartido del proceso (ver get_client)
+        validators: {id: validadores} para pedidos condicionales; se actualiza con los de cada respuesta nueva
+        cached: {id: payload} que se devuelve cuando la API responde 304
+        deadline: segundos como máximo para todo el lote; lo que no terminó a tiempo se cancela y se omite
+    """
+    if not pokemon_ids:
+        return []
+    if client is None:
+        loop = get_loop()
+        if asyncio.get_running_loop() is not loop:
+            # el cliente compartido es del event loop del transporte: el lote corre allá y acá solo se espera
+            future = asyncio.run_coroutine_threadsafe(fetch_all_pokemon(pokemon_ids, None, validators, cached, deadline), loop)
+            return await asyncio.wrap_future(future)
+        client = get_client()
+
+    semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+    tasks = [asyncio.ensure_future(fetch_single_pokemon(client, pokemon_id, semaphore, validators, cached)) for pokemon_id in pokemon_ids]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    if pending:
+        print(f"[async_transport.py]: Se agotó el plazo de {deadline}s, quedan {len(pending)} Pokémon sin obtener")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = [task.result() for task in done if not task.exception()]
+    json_collection = [pokemon for pokemon in results if pokemon]
+    json_collection.sort(key=lambda x: x.get('id', 0))
+    return json_collection
+
+
+async def fetch_single_pokemon(client: httpx.AsyncClient, pokemon_id, semaphore: asyncio.Semaphore,
+                               validators: Optional[Dict] = None, cached: Optional[Dict] = None) -> Optional[Dict]:
+    """Obtiene un solo Pokémon, reintentando con backoff ante errores transitorios."""
+    url = config.STUDENTS_REST_API_URL + str(pokemon_id)
+    headers = conditional.request_headers((validators or {}).get(pokemon_id))
+
+    from .transport import record_upstream  # import diferido: transport importa este módulo
+
+    breaker = circuit_breaker.upstream
+    for attempt in range(ASYNC_RETRIES + 1):
+        in_flight = False
+        try:
+            async with semaphore:
+                # se consulta justo antes de cada envío (también en los reintentos), no al crear la tarea: las que
+                # estaban esperando turno ven las fallas de las anteriores y no salen si el circuito ya se abrió
+                if not breaker.allow():
+                    print(f"[async_transport.py]: Circuito abierto, se omite el id {pokemon_id}")
+                    return None
+                start = time.perf_counter()
+                in_flight = True
+                response = await client.get(url, headers=headers)
+                in_flight = False
+            record_upstream('async', response.status_code, start)
+
+            # un 5xx cuenta como falla de la API; un 404 no (la API responde bien, el Pokémon no existe)
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            # 304: no cambió desde la última vez, se sigue usando el payload que ya teníamos
+            if response.status_code == conditional.NOT_MODIFIED and cached and pokemon_id in cached:
+                return cached[pokemon_id]
+            if response.status_code < 500:
+                pokemon = _parse_response(response, pokemon_id)
+                if pokemon and validators is not None:
+                    validators[pokemon_id] = conditional.response_validators(response.headers)
+                return pokemon
+            print(f"[async_transport.py]: Error {response.status_code} para el id {pokemon_id}")
+        except asyncio.CancelledError:
+            # se agotó el plazo del lote: cuenta como falla solo si el pedido estaba en curso (y así libera la llamada de
+            # prueba si era la del semiabierto); los que esperaban turno en el semáforo o el backoff no llegaron a la API
+            if in_flight:
+                breaker.record_failure()
+            raise
+        except httpx.TimeoutException:
+            record_upstream('async', 'timeout', start)
+            breaker.record_failure()
+            print(f"[async_transport.py]: Timeout para el id {pokemon_id}")
+        except httpx.HTTPError as e:
+            record_upstream('async', 'error', start)
+            breaker.record_failure()
+            print(f"[async_transport.py]: Error de red para el id {pokemon_id}: {e}")
+
+        if breaker.state == breaker.OPEN:
+            # esta falla (o la de otra tarea) abrió el circuito: reintentar no tiene sentido
+            return None
+        if attempt < ASYNC_RETRIES:
+            await asyncio.sleep(backoff_delay(attempt))
+
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponencial con "full jitter": un valor al azar entre 0 y BASE * 2**attempt."""
+    return random.uniform(0, ASYNC_BACKOFF_BASE * (2 ** attempt))
+
+
+def _parse_response(response: httpx.Response, pokemon_id) -> Optional[Dict]:
+    if not response.is_success:
+        print(f"[async_transport.py]: Error al obtener datos para el id {pokemon_id}")
+        return None
+
+    raw_data = response.json()
+
+    if 'detail' in raw_data and raw_data['detail'] == 'Not found.':
+        print(f"[async_transport.py]: Pokémon con id {pokemon_id} no encontrado.")
+        return None
+
+    return project_payload(raw_data)
+
+
+async def getAllImages() -> List[Dict]:
+    """
+    Versión asíncrona de transport.getAllImages para vistas async. La lógica de cache (local, compartido y
+    snapshot) corre en un hilo aparte y las descargas vuelven a este event loop, sin bloquearlo.
+    """
+    from . import transport
+
+    return await sync_to_async(transport.getAllImages, thread_sensitive=False)(engine='async')
+
+
+async def get_pokemon(pokemon_ids) -> List[Dict]:
+    """Versión asíncrona de transport.get_pokemon (solo una página o un filtro), igual que getAllImages."""
+    from . import transport
+
+    return await sync_to_async(transport.get_pokemon, thread_sensitive=False)(list(pokemon_ids), engine='async')
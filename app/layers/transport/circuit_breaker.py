@@ -0,0 +1,85 @@
+# circuit_breaker: deja de llamar a PokeAPI mientras está caída o muy lenta, en lugar de que cada request espere
+# REQUEST_TIMEOUT por cada Pokémon. Lo usan los dos motores de descarga (transport.py y async_transport.py).
+
+import threading
+import time
+
+from ...config import config
+
+
+class CircuitBreaker:
+    """
+    Cortacircuitos clásico de tres estados:
+      - cerrado: las llamadas pasan; se cuentan las fallas consecutivas.
+      - abierto: después de failure_threshold fallas seguidas, las llamadas se rechazan sin ir a la red.
+      - semiabierto: pasados reset_timeout segundos se deja pasar una sola llamada de prueba. Si anda, se cierra;
+        si falla, vuelve a abrirse por otros reset_timeout segundos.
+
+    Uso:
+        if not breaker.allow():
+            return None
+        ... llamada ...
+        breaker.record_success() / breaker.record_failure()
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Indica si se puede hacer la llamada. En semiabierto solo la primera (la de prueba) recibe True."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                print("[circuit_breaker.py]: La API volvió a responder, circuito cerrado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"[circuit_breaker.py]: {self._failures} fallas seguidas, circuito abierto por {self.reset_timeout}s")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+# cortacircuitos de PokeAPI, compartido por todos los hilos y motores del proceso
+upstream = CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_TIMEOUT)
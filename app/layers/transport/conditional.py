@@ -0,0 +1,27 @@
+# conditional: pedidos condicionales a PokeAPI (ETag / Last-Modified).
+# Se guardan los validadores de cada respuesta junto al payload; al refrescar se mandan de vuelta y, si el recurso
+# no cambió, la API responde 304 sin cuerpo y se sigue usando el payload que ya teníamos.
+
+from typing import Dict, Optional
+
+NOT_MODIFIED = 304
+
+
+def request_headers(validators: Optional[Dict]) -> Dict[str, str]:
+    """Cabeceras If-None-Match / If-Modified-Since a partir de los validadores guardados (vacío si no hay)."""
+    headers = {}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def response_validators(headers) -> Dict[str, str]:
+    """Validadores (etag, last_modified) de una respuesta; solo los que vinieron."""
+    validators = {}
+    if headers.get('ETag'):
+        validators['etag'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        validators['last_modified'] = headers['Last-Modified']
+    return validators
@@ -0,0 +1,144 @@
+# images: proxy de las imágenes de PokeAPI (artwork oficial, íconos de tipos) con miniaturas guardadas en disco.
+# Cada imagen se pide una sola vez al origen (config.SPRITES_BASE_URL), se achica al tamaño en que se muestra
+# (config.THUMBNAIL_SIZES) y se guarda en config.IMAGE_CACHE_DIR; los pedidos siguientes se sirven desde el disco.
+# Las que el origen no tiene (404) no se vuelven a pedir hasta pasados config.IMAGE_MISSING_TTL segundos.
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import requests
+from PIL import Image, UnidentifiedImageError, features
+
+from ...config import config
+
+REQUEST_TIMEOUT = 10
+
+_session = requests.Session()
+
+# cache negativo: URL de origen -> momento (monotonic) a partir del cual se vuelve a pedir. Acotado, porque las rutas
+# las elige el cliente: al llenarse se descartan las más viejas.
+MISSING_MAX_ENTRIES = 1000
+_missing_until = {}
+_missing_lock = threading.Lock()
+
+# WebP pesa bastante menos que PNG con transparencia; si Pillow no tiene soporte para WebP se usa PNG.
+if features.check('webp'):
+    THUMBNAIL_FORMAT, THUMBNAIL_CONTENT_TYPE, THUMBNAIL_EXTENSION = 'WEBP', 'image/webp', 'webp'
+else:
+    THUMBNAIL_FORMAT, THUMBNAIL_CONTENT_TYPE, THUMBNAIL_EXTENSION = 'PNG', 'image/png', 'png'
+
+
+def is_valid_path(path: str) -> bool:
+    """Solo rutas relativas al origen, sin '..': el proxy no puede usarse para pedir cualquier URL."""
+    parts = path.split('/')
+    return bool(path) and not path.startswith('/') and '..' not in parts and '' not in parts and '\\' not in path
+
+
+def thumbnail_path(path: str, size: str) -> str:
+    """Archivo en disco de la miniatura (el nombre es un hash de la ruta, así no depende de lo que venga en la URL)."""
+    digest = hashlib.sha1(path.encode()).hexdigest()
+    return os.path.join(config.IMAGE_CACHE_DIR, size, f'{digest}.{THUMBNAIL_EXTENSION}')
+
+
+def get_thumbnail(path: str, size: str) -> Optional[Tuple[Union[str, bytes], str]]:
+    """
+    Devuelve la miniatura de la imagen config.SPRITES_BASE_URL + path en el tamaño indicado (una clave de
+    config.THUMBNAIL_SIZES), generándola si todavía no está en disco.
+
+    Returns:
+        tuple: (ruta del archivo, content type), o (bytes de la miniatura, content type) si no se pudo guardar en
+        disco; None si la ruta o el tamaño no son válidos o el origen no la tiene
+    """
+    if size not in config.THUMBNAIL_SIZES or not is_valid_path(path):
+        return None
+
+    file_path = thumbnail_path(path, size)
+    if os.path.exists(file_path):
+        return file_path, THUMBNAIL_CONTENT_TYPE
+
+    original = fetch_original(path)
+    if original is None:
+        return None
+
+    try:
+        thumbnail = make_thumbnail(original, config.THUMBNAIL_SIZES[size])
+    except (UnidentifiedImageError, OSError) as e:
+        print(f"[images.py]: No se pudo procesar la imagen {path}: {e}")
+        return None
+
+    print(f"[images.py]: Miniatura {size} de {path}: {len(original)} -> {len(thumbnail)} bytes")
+    if not _write_atomically(file_path, thumbnail):
+        return thumbnail, THUMBNAIL_CONTENT_TYPE
+    return file_path, THUMBNAIL_CONTENT_TYPE
+
+
+def fetch_original(path: str) -> Optional[bytes]:
+    url = config.SPRITES_BASE_URL + path
+    with _missing_lock:
+        if _missing_until.get(url, 0) > time.monotonic():
+            return None
+
+    try:
+        response = _session.get(url, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        print(f"[images.py]: Error de red al pedir la imagen {path}: {e}")
+        return None
+
+    if not response.ok:
+        print(f"[images.py]: Error {response.status_code} al pedir la imagen {path}")
+        if response.status_code == 404:
+            _remember_missing(url)
+        return None
+    return response.content
+
+
+def _remember_missing(url: str) -> None:
+    with _missing_lock:
+        _missing_until.pop(url, None)
+        _missing_until[url] = time.monotonic() + config.IMAGE_MISSING_TTL
+        while len(_missing_until) > MISSING_MAX_ENTRIES:
+            del _missing_until[next(iter(_missing_until))]
+
+
+def clear_missing() -> None:
+    """Vacía el cache negativo (para tests)."""
+    with _missing_lock:
+        _missing_until.clear()
+
+
+def make_thumbnail(data: bytes, max_size: int) -> bytes:
+    """Achica la imagen para que entre en un cuadrado de max_size px (sin agrandarla ni deformarla)."""
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((max_size, max_size))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        output = io.BytesIO()
+        image.save(output, THUMBNAIL_FORMAT, **({'quality': 80, 'method': 6} if THUMBNAIL_FORMAT == 'WEBP' else {'optimize': True}))
+    return output.getvalue()
+
+
+def _write_atomically(file_path: str, data: bytes) -> bool:
+    # como el snapshot: si dos requests generan la misma miniatura a la vez, ninguno ve un archivo a medias.
+    # Si el disco falla (lleno, sin permisos...) no se deja el temporal y se avisa con False.
+    directory = os.path.dirname(file_path)
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, file_path)
+        return True
+    except OSError as e:
+        print(f"[images.py]: No se pudo guardar la miniatura {file_path}: {e}")
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return False
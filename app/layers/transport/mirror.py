@@ -0,0 +1,173 @@
+# mirror: copia local de PokeAPI para trabajar sin red (tests, staging, pruebas de carga reproducibles).
+# Se activa con config.POKEMON_SOURCE = 'mirror'; el formato se deduce de config.POKEMON_MIRROR_PATH:
+#   - carpeta: un <id>.json por Pokémon (o <id>/index.json, como el repositorio api-data de PokeAPI),
+#   - archivo .zip con los mismos <id>.json,
+#   - base SQLite (.sqlite3, .sqlite o .db) con una tabla pokemon(id, data),
+#   - 'database': la tabla del catálogo (app.models.Pokemon) en la base de Django.
+# El comando export_mirror genera cualquiera de los cuatro a partir del cache actual.
+
+import json
+import os
+import sqlite3
+import tempfile
+import zipfile
+from typing import Dict, Iterable, List, Optional
+
+from .payload import project_payload
+
+SQLITE_SUFFIXES = ('.sqlite3', '.sqlite', '.db')
+DATABASE = 'database'
+
+
+class DirectoryMirror:
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, pokemon_id) -> Optional[str]:
+        for name in (f'{pokemon_id}.json', os.path.join(str(pokemon_id), 'index.json')):
+            try:
+                with open(os.path.join(self.path, name), 'r', encoding='utf-8') as pokemon_file:
+                    return pokemon_file.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def fetch(self, pokemon_ids) -> List[Dict]:
+        return _parse_all((pokemon_id, self.read(pokemon_id)) for pokemon_id in pokemon_ids)
+
+    def write(self, payloads: Iterable[Dict]) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        count = 0
+        for pokemon in payloads:
+            # como en el snapshot: archivo temporal y reemplazo, para que un lector nunca vea un JSON a medias
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump(pokemon, tmp_file, separators=(',', ':'))
+            os.replace(tmp_path, os.path.join(self.path, f"{pokemon['id']}.json"))
+            count += 1
+        return count
+
+
+class ZipMirror:
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, pokemon_ids) -> List[Dict]:
+        try:
+            archive = zipfile.ZipFile(self.path)
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"[mirror.py]: No se pudo abrir {self.path}: {e}")
+            return []
+
+        with archive:
+            names = set(archive.namelist())
+
+            def read(pokemon_id):
+                for name in (f'{pokemon_id}.json', f'{pokemon_id}/index.json'):
+                    if name in names:
+                        return archive.read(name).decode('utf-8')
+                return None
+
+            return _parse_all((pokemon_id, read(pokemon_id)) for pokemon_id in pokemon_ids)
+
+    def write(self, payloads: Iterable[Dict]) -> int:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        os.close(fd)
+        count = 0
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for pokemon in payloads:
+                archive.writestr(f"{pokemon['id']}.json", json.dumps(pokemon, separators=(',', ':')))
+                count += 1
+        os.replace(tmp_path, self.path)
+        return count
+
+
+class SqliteMirror:
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, pokemon_ids) -> List[Dict]:
+        pokemon_ids = list(pokemon_ids)
+        if not os.path.exists(self.path):
+            print(f"[mirror.py]: No existe {self.path}")
+            return []
+
+        # una conexión por llamada: fetch se usa desde varios hilos a la vez
+        connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        try:
+            placeholders = ','.join('?' * len(pokemon_ids))
+            rows = connection.execute(f'SELECT id, data FROM pokemon WHERE id IN ({placeholders})', pokemon_ids).fetchall() if pokemon_ids else []
+        except sqlite3.Error as e:
+            print(f"[mirror.py]: Error al leer {self.path}: {e}")
+            return []
+        finally:
+            connection.close()
+        return _parse_all(rows)
+
+    def write(self, payloads: Iterable[Dict]) -> int:
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS pokemon (id INTEGER PRIMARY KEY, data TEXT NOT NULL)')
+                rows = [(pokemon['id'], json.dumps(pokemon, separators=(',', ':'))) for pokemon in payloads]
+                connection.executemany('INSERT OR REPLACE INTO pokemon (id, data) VALUES (?, ?)', rows)
+        finally:
+            connection.close()
+        return len(rows)
+
+
+class DatabaseMirror:
+    """Catálogo guardado en la tabla app_pokemon (el mismo que usan los favoritos)."""
+
+    def fetch(self, pokemon_ids) -> List[Dict]:
+        from app.models import Pokemon  # import diferido: transport no depende de Django salvo con este mirror
+
+        pokemon_ids = list(pokemon_ids)
+        rows = Pokemon.objects.filter(id__in=pokemon_ids).order_by('id')
+        json_collection = [row.to_payload() for row in rows]
+        missing = len(pokemon_ids) - len(json_collection)
+        if missing:
+            print(f"[mirror.py]: {missing} Pokémon no están en la tabla del catálogo.")
+        return json_collection
+
+    def write(self, payloads: Iterable[Dict]) -> int:
+        from app.models import Pokemon
+
+        rows = [Pokemon.from_payload(pokemon) for pokemon in payloads]
+        fields = [field.name for field in Pokemon._meta.concrete_fields if not field.primary_key]
+        Pokemon.objects.bulk_create(rows, batch_size=500, update_conflicts=True, unique_fields=['id'], update_fields=fields)
+        return len(rows)
+
+
+def open_mirror(path):
+    """
+    Devuelve el mirror que corresponde a path: la tabla del catálogo si es 'database', SQLite por extensión, .zip,
+    o carpeta en cualquier otro caso.
+    """
+    if path == DATABASE:
+        return DatabaseMirror()
+    lowered = str(path).lower()
+    if lowered.endswith(SQLITE_SUFFIXES):
+        return SqliteMirror(path)
+    if lowered.endswith('.zip'):
+        return ZipMirror(path)
+    return DirectoryMirror(path)
+
+
+def _parse_all(rows) -> List[Dict]:
+    """(id, texto JSON o None) -> payloads recortados y ordenados por ID. Los que faltan o están rotos se omiten."""
+    json_collection = []
+    for pokemon_id, content in rows:
+        if content is None:
+            print(f"[mirror.py]: Pokémon con id {pokemon_id} no está en el mirror.")
+            continue
+        try:
+            json_collection.append(project_payload(json.loads(content)))
+        except ValueError as e:
+            print(f"[mirror.py]: JSON inválido para el id {pokemon_id}: {e}")
+    json_collection.sort(key=lambda x: x.get('id', 0))
+    return json_collection
@@ -0,0 +1,24 @@
+# payload: recorte de las respuestas de PokeAPI a los campos que usa la aplicación.
+# Cada respuesta completa trae movimientos, índices de juegos y todas las variantes de sprites (decenas de KB); el
+# translator solo usa id, nombre, altura, peso, experiencia base, tipos y la imagen oficial.
+
+
+def project_payload(raw_data):
+    """
+    Devuelve una copia reducida del payload, con la misma estructura que el original para que translator.py
+    la lea igual. Es idempotente: proyectar un payload ya proyectado devuelve uno equivalente.
+    """
+    artwork = (((raw_data.get('sprites') or {}).get('other') or {}).get('official-artwork') or {}).get('front_default')
+
+    return {
+        'id': raw_data.get('id'),
+        'name': raw_data.get('name'),
+        'height': raw_data.get('height'),
+        'weight': raw_data.get('weight'),
+        'base_experience': raw_data.get('base_experience'),
+        'types': [
+            {'slot': entry.get('slot'), 'type': {'name': (entry.get('type') or {}).get('name')}}
+            for entry in raw_data.get('types') or []
+        ],
+        'sprites': {'other': {'official-artwork': {'front_default': artwork}}},
+    }
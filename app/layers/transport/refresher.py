@@ -0,0 +1,62 @@
+# refresher: hilo que refresca el catálogo cada cierto tiempo dentro del mismo proceso (opcional).
+# Se activa con config.CATALOG_REFRESH_INTERVAL > 0 (ver app/apps.py); si no, se puede usar el comando refresh_catalog.
+
+import threading
+from typing import Optional
+
+from ...config import config
+from . import transport
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class CatalogRefresher(threading.Thread):
+    """
+    Cada interval segundos vuelve a pedir a la API los Pokémon que se obtuvieron hace más de interval segundos
+    (transport.refresh_catalog). Los requests siguen usando el catálogo anterior hasta que termina cada refresco.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name='catalog-refresher', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                transport.refresh_catalog(max_age=self.interval)
+            except Exception as e:
+                # un refresco fallido no debe matar el hilo: se sigue sirviendo lo que hay y se reintenta en la próxima vuelta
+                print(f"[refresher.py]: Error al refrescar el catálogo: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start(interval: Optional[float] = None) -> Optional[CatalogRefresher]:
+    """
+    Lanza el hilo de refresco (uno solo por proceso).
+
+    Returns:
+        CatalogRefresher: el hilo en ejecución, o None si el intervalo es 0
+    """
+    global _scheduler
+    interval = config.CATALOG_REFRESH_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return None
+
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = CatalogRefresher(interval)
+            _scheduler.start()
+            print(f"[refresher.py]: Refrescando el catálogo cada {interval}s")
+        return _scheduler
+
+
+def stop() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
@@ -0,0 +1,124 @@
+# shared_cache: cache de Pokémon compartido entre procesos (workers) usando el framework de cache de Django.
+# El backend se elige en settings.CACHES (alias config.POKEMON_CACHE_ALIAS): locmem, archivo, base de datos o Redis.
+
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.core.cache import caches
+
+from ...config import config
+
+CATALOG_KEY = 'pokemon:catalog'  # {'ids': [...], 'version': str}
+LOCK_PREFIX = 'pokemon:lock:'
+REFRESH_STATS_KEY = 'pokemon:refresh'  # resultado del último refresco (ver transport.refresh_catalog)
+
+
+def _key(pokemon_id) -> str:
+    return f'pokemon:{pokemon_id}'
+
+
+def get_cache():
+    return caches[config.POKEMON_CACHE_ALIAS]
+
+
+def get_version() -> Optional[str]:
+    """Devuelve la versión del catálogo compartido, o None si todavía no se cargó."""
+    catalog = get_cache().get(CATALOG_KEY)
+    return catalog['version'] if catalog else None
+
+
+def get_entries() -> Dict[int, dict]:
+    """
+    Lee todas las entradas del catálogo compartido.
+
+    Returns:
+        dict: {pokemon_id: {'data': payload, 'fetched_at': timestamp}} (vacío si no hay catálogo)
+    """
+    cache = get_cache()
+    catalog = cache.get(CATALOG_KEY)
+    if not catalog:
+        return {}
+
+    found = cache.get_many([_key(pokemon_id) for pokemon_id in catalog['ids']])
+    return {int(key.split(':')[1]): entry for key, entry in found.items()}
+
+
+def set_entries(entries: Dict[int, dict], new_version: bool = True) -> str:
+    """
+    Publica entradas en el catálogo compartido y genera una nueva versión, para que los demás procesos
+    sepan que tienen que recargar. Con new_version=False se conserva la versión actual (si la hay).
+
+    Returns:
+        str: la versión del catálogo
+    """
+    cache = get_cache()
+    cache.set_many({_key(pokemon_id): entry for pokemon_id, entry in entries.items()}, timeout=None)
+
+    catalog = cache.get(CATALOG_KEY) or {'ids': []}
+    version = catalog['version'] if not new_version and catalog.get('version') else uuid.uuid4().hex
+    cache.set(CATALOG_KEY, {'ids': sorted(set(catalog['ids']) | set(entries)), 'version': version}, timeout=None)
+    return version
+
+
+def get_refresh_stats() -> Optional[dict]:
+    return get_cache().get(REFRESH_STATS_KEY)
+
+
+def set_refresh_stats(stats: dict) -> None:
+    get_cache().set(REFRESH_STATS_KEY, stats, timeout=None)
+
+
+def clear() -> None:
+    """Borra el catálogo compartido (las entradas quedan huérfanas y se pisan en la próxima carga)."""
+    get_cache().delete_many([CATALOG_KEY, REFRESH_STATS_KEY])
+
+
+def ids_lock_name(pokemon_ids) -> str:
+    """
+    Nombre del lock de llenado para un conjunto de IDs (ej. los que le faltan a una página): pedidos en frío de páginas
+    distintas no se esperan entre sí; los de la misma página sí, y solo uno va a la API.
+    """
+    digest = hashlib.sha1(','.join(str(pokemon_id) for pokemon_id in sorted(set(pokemon_ids))).encode()).hexdigest()
+    return f'catalog:{digest[:16]}'
+
+
+@contextmanager
+def refill_lock(name: str):
+    """
+    Lock entre procesos para evitar la "estampida": solo quien lo obtiene va a la API, el resto espera o sirve
+    datos viejos. Se basa en cache.add, que es atómico en todos los backends soportados, y vence solo después de
+    config.POKEMON_CACHE_LOCK_TIMEOUT segundos por si el proceso que lo tomó muere.
+
+    Yields:
+        bool: True si se obtuvo el lock
+    """
+    cache = get_cache()
+    key = LOCK_PREFIX + name
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout=config.POKEMON_CACHE_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def wait_for_entries(pokemon_ids, lock_name: str, timeout: float, interval: float = 0.1) -> Dict[int, dict]:
+    """
+    Espera (hasta timeout segundos) a que otro proceso publique los Pokémon indicados o suelte el lock.
+
+    Returns:
+        dict: las entradas del catálogo compartido al terminar la espera
+    """
+    cache = get_cache()
+    deadline = time.monotonic() + timeout
+    while True:
+        entries = get_entries()
+        if set(pokemon_ids) <= set(entries) or cache.get(LOCK_PREFIX + lock_name) is None:
+            return entries
+        if time.monotonic() >= deadline:
+            return entries
+        time.sleep(interval)
@@ -0,0 +1,87 @@
+# snapshot: copia persistente en disco del cache de Pokémon, para no tener que volver a pedir todo a la API cada vez que arranca un proceso.
+
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Optional
+
+# versión del formato del archivo. Si cambia, los snapshots viejos se ignoran.
+SNAPSHOT_VERSION = 1
+
+
+def load_snapshot(path) -> Dict[int, dict]:
+    """
+    Lee el snapshot desde disco.
+
+    Returns:
+        dict: {pokemon_id: {'data': payload, 'fetched_at': timestamp}}. Vacío si el archivo no existe,
+        está vacío, está corrupto o es de otra versión.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as snapshot_file:
+            content = snapshot_file.read()
+    except OSError:
+        return {}
+
+    if not content.strip():
+        return {}
+
+    try:
+        snapshot = json.loads(content)
+    except ValueError as e:
+        print(f"[snapshot.py]: Snapshot corrupto en {path}: {e}")
+        return {}
+
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        print(f"[snapshot.py]: Versión de snapshot no soportada en {path}")
+        return {}
+
+    entries = {}
+    for pokemon_id, entry in snapshot.get('entries', {}).items():
+        if isinstance(entry, dict) and entry.get('data'):
+            entries[int(pokemon_id)] = entry
+    return entries
+
+
+def save_snapshot(path, entries: Dict[int, dict]) -> None:
+    """
+    Escribe el snapshot de forma atómica: primero en un archivo temporal de la misma carpeta y luego
+    lo reemplaza, así un lector nunca ve un archivo a medio escribir. Es solo una copia: si no se puede escribir
+    (carpeta inexistente, sin permisos, disco lleno) se avisa y se sigue.
+    """
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'entries': {str(pokemon_id): entry for pokemon_id, entry in sorted(entries.items())},
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix='.pokemon_cache.', suffix='.tmp', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            json.dump(snapshot, tmp_file, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[snapshot.py]: No se pudo guardar el snapshot en {path}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def make_entry(data, fetched_at: Optional[float] = None, validators: Optional[dict] = None) -> dict:
+    """Arma una entrada del snapshot con su marca de tiempo y, si hay, los validadores HTTP (etag, last_modified)."""
+    entry = {'data': data, 'fetched_at': time.time() if fetched_at is None else fetched_at}
+    entry.update(validators or {})
+    return entry
+
+
+def entry_validators(entry: dict) -> dict:
+    """Validadores HTTP guardados en una entrada (los snapshots viejos no tienen)."""
+    return {key: entry[key] for key in ('etag', 'last_modified') if entry.get(key)}
+
+
+def is_stale(entry: dict, ttl: float, now: Optional[float] = None) -> bool:
+    """Indica si una entrada superó su tiempo de vida (TTL)."""
+    now = time.time() if now is None else now
+    return now - entry.get('fetched_at', 0) > ttl
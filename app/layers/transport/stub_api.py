@@ -0,0 +1,187 @@
+# stub_api: servidores HTTP locales que imitan /api/v2/pokemon/<id>/ de PokeAPI y el origen de sus imágenes.
+# Se usa en los tests y benchmarks para no depender de la red (ver app/tests.py y los comandos de app/management).
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_pokemon(pokemon_id, name=None, types=('normal',)):
+    """Arma un payload mínimo con la misma forma que devuelve PokeAPI."""
+    return {
+        'id': pokemon_id,
+        'name': name or f'pokemon-{pokemon_id}',
+        'height': 10,
+        'weight': 100,
+        'base_experience': 50,
+        'types': [{'slot': i + 1, 'type': {'name': t}} for i, t in enumerate(types)],
+        'sprites': {'other': {'official-artwork': {'front_default': f'https://img.test/{pokemon_id}.png'}}},
+    }
+
+
+def make_full_pokemon(pokemon_id, name=None, types=('normal',)):
+    """
+    Como make_pokemon, pero con el volumen de una respuesta real de PokeAPI (movimientos, índices de juegos,
+    estadísticas, variantes de sprites...). Sirve para medir memoria y bytes transferidos.
+    """
+    sprite = f'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{pokemon_id}.png'
+    version_groups = [f'version-group-{i}' for i in range(12)]
+    pokemon = make_pokemon(pokemon_id, name, types)
+    pokemon.update({
+        'abilities': [{'ability': {'name': f'ability-{i}', 'url': f'https://pokeapi.co/api/v2/ability/{i}/'},
+                       'is_hidden': i == 2, 'slot': i + 1} for i in range(3)],
+        'forms': [{'name': pokemon['name'], 'url': f'https://pokeapi.co/api/v2/pokemon-form/{pokemon_id}/'}],
+        'game_indices': [{'game_index': pokemon_id, 'version': {'name': f'version-{i}', 'url': f'https://pokeapi.co/api/v2/version/{i}/'}}
+                         for i in range(20)],
+        'held_items': [],
+        'location_area_encounters': f'https://pokeapi.co/api/v2/pokemon/{pokemon_id}/encounters',
+        'moves': [{'move': {'name': f'move-{i}', 'url': f'https://pokeapi.co/api/v2/move/{i}/'},
+                   'version_group_details': [{'level_learned_at': i % 50, 'move_learn_method': {'name': 'level-up', 'url': 'https://pokeapi.co/api/v2/move-learn-method/1/'},
+                                              'version_group': {'name': group, 'url': f'https://pokeapi.co/api/v2/version-group/{j}/'}}
+                                             for j, group in enumerate(version_groups[:4])]}
+                  for i in range(80)],
+        'stats': [{'base_stat': 45 + i, 'effort': 0, 'stat': {'name': f'stat-{i}', 'url': f'https://pokeapi.co/api/v2/stat/{i}/'}} for i in range(6)],
+    })
+    pokemon['sprites'].update({key: sprite for key in ('back_default', 'back_female', 'back_shiny', 'back_shiny_female',
+                                                        'front_default', 'front_female', 'front_shiny', 'front_shiny_female')})
+    pokemon['sprites']['versions'] = {f'generation-{i}': {group: {'front_default': sprite, 'back_default': sprite} for group in version_groups[:3]}
+                                      for i in range(8)}
+    return pokemon
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # el valor por defecto (5) rechaza conexiones bajo carga concurrente
+
+
+class StubPokeAPI:
+    """
+    API local en un puerto libre. Usar como context manager:
+
+        with StubPokeAPI([make_pokemon(1)], latency=0.05) as api:
+            requests.get(api.url + '1')
+
+    Args:
+        pokemon: payloads a servir (se buscan por 'id')
+        latency: segundos de espera antes de cada respuesta
+        failures: cantidad de respuestas 503 que recibe cada ID antes de responder bien
+        etags: si es True, cada respuesta lleva un ETag y los pedidos con If-None-Match que coincide reciben 304
+        error_rate: proporción (0 a 1) de pedidos que reciben un 503 al azar
+        seed: semilla para error_rate, para que una corrida sea reproducible
+    """
+
+    def __init__(self, pokemon, latency=0.0, failures=0, etags=True, error_rate=0.0, seed=None):
+        self.pokemon = {p['id']: p for p in pokemon}
+        self.latency = latency
+        self.failures = failures
+        self.etags = etags
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._failed = {}
+        self.requests = []
+        self.not_modified = 0  # respuestas 304
+        self.bytes_sent = 0  # bytes de cuerpo enviados (sin cabeceras)
+        self.connections = set()  # puertos de cliente distintos: mide si se reutilizan conexiones
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # permite keep-alive
+            disable_nagle_algorithm = True  # cabeceras y cuerpo van en escrituras separadas
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                stub.connections.add(self.client_address)
+                if stub.latency:
+                    time.sleep(stub.latency)
+                match = re.search(r'/pokemon/(\d+)', self.path)
+                pokemon_id = int(match.group(1)) if match else None
+                if stub._failed.get(pokemon_id, 0) < stub.failures:
+                    stub._failed[pokemon_id] = stub._failed.get(pokemon_id, 0) + 1
+                    return self.send_json(503, {'detail': 'Service Unavailable'})
+                if stub.error_rate and stub._random.random() < stub.error_rate:
+                    return self.send_json(503, {'detail': 'Service Unavailable'})
+                data = stub.pokemon.get(pokemon_id)
+                if not data:
+                    return self.send_json(404, {'detail': 'Not found.'})
+
+                body = json.dumps(data).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"' if stub.etags else None
+                if etag and self.headers.get('If-None-Match') == etag:
+                    stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_json(200, data, {'ETag': etag} if etag else {}, body)
+
+            def send_json(self, status, payload, headers=None, body=None):
+                body = body if body is not None else json.dumps(payload).encode()
+                stub.bytes_sent += len(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _StubServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/v2/pokemon/'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubFileServer:
+    """
+    Origen de archivos estáticos en un puerto libre (para el proxy de imágenes). Usar como context manager:
+
+        with StubFileServer({'types/1.png': png_bytes}) as origin:
+            requests.get(origin.url + 'types/1.png')
+
+    Args:
+        files: {ruta relativa: contenido en bytes}
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                body = stub.files.get(self.path[len('/files/'):]) if self.path.startswith('/files/') else None
+                self.send_response(200 if body is not None else 404)
+                body = body if body is not None else b'Not found'
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _StubServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/files/'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -2,65 +2,345 @@
 
 import requests
 from ...config import config
+from . import async_transport, circuit_breaker, conditional, mirror, shared_cache, snapshot
+from .payload import project_payload
+from ..utilities import metrics
+import atexit
 import concurrent.futures
+import contextvars
+import queue
+import threading
+import time
 from threading import Lock
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 
 # Constantes para configuración
 MAX_WORKERS = 5
-POKEMON_RANGE = (1, 152)  # Rango de IDs de Pokémon a obtener
+POKEMON_RANGE = (1, config.POKEMON_CATALOG_SIZE + 1)  # Rango de IDs de Pokémon a obtener
 REQUEST_TIMEOUT = 10
 
-# Cache para evitar hacer múltiples requests
+# Sesión HTTP compartida: reutiliza conexiones (keep-alive) en vez de abrir una nueva por cada Pokémon
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+_session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+# Cache para evitar hacer múltiples requests (copia local del proceso; la compartida está en shared_cache)
 _cache = {}
+_fetched_at = {}  # momento en que se obtuvo cada Pokémon (para el TTL del snapshot)
+_validators = {}  # ETag / Last-Modified de la última respuesta de cada Pokémon (ver conditional.py)
+_failed_until = {}  # Pokémon que fallaron -> momento (monotonic) a partir del cual se vuelven a pedir (cache negativo)
+_cache_version = None  # versión del catálogo compartido que tiene cargada este proceso
+_generation = 0  # aumenta cada vez que cambia el cache local (para invalidar índices y cards derivadas)
 _cache_lock = Lock()
+_refresh_thread = None
+_refresh_stats = None  # resultado del último refresco hecho por este proceso (ver get_refresh_stats)
+_snapshot_lock = Lock()
+_snapshot_saved_at = None  # momento (monotonic) de la última escritura del snapshot
+_snapshot_timer = None  # escritura pendiente (ver save_snapshot)
+_completeness = contextvars.ContextVar('pokemon_completeness', default=None)  # seguimiento del request en curso (ver track_completeness)
+
+def getAllImages(engine=None):
+    """
+    Devuelve los payloads de todos los Pokémon de POKEMON_RANGE, ordenados por ID.
+
+    Args:
+        engine: 'threads' o 'async' para las descargas; por defecto config.TRANSPORT_ENGINE
+    """
+    return get_pokemon(get_catalog_ids(), engine)
+
+@metrics.timed('transport')
+def get_pokemon(pokemon_ids, engine=None) -> List[Dict]:
+    """
+    Devuelve los payloads de los Pokémon indicados, en el mismo orden. Solo se piden a la API los que no están
+    en ningún cache, así una página del catálogo no obliga a descargar el catálogo entero.
+
+    Args:
+        pokemon_ids: IDs a obtener
+        engine: 'threads' o 'async' para las descargas; por defecto config.TRANSPORT_ENGINE
+    """
+    pokemon_ids = list(pokemon_ids)
+    missing_ids = _lookup(pokemon_ids)
+    if missing_ids:
+        _refill(missing_ids, engine)
 
-def getAllImages():
     with _cache_lock:
-        if _cache:
-            print("[transport.py]: Usando cache de Pokémon")
-            return list(_cache.values())
-    
-    print("[transport.py]: Obteniendo datos de la API...")
-    json_collection = []
-    
+        pokemon = [_cache[pokemon_id] for pokemon_id in pokemon_ids if pokemon_id in _cache]
+    if len(pokemon) < len(pokemon_ids) and (tracker := _completeness.get()) is not None:
+        tracker['complete'] = False
+    return pokemon
+
+def track_completeness() -> Dict:
+    """
+    Empieza a seguir si el contexto actual (un request) recibió todos los Pokémon que pidió. Devuelve un dict
+    {'complete': bool} que get_pokemon pone en False cuando no puede entregar alguno (deadline, cortacircuitos abierto
+    o cache negativo). El dict es compartido con las copias del contexto, así que también lo marcan las llamadas que
+    pasan por sync_to_async.
+    """
+    tracker = {'complete': True}
+    _completeness.set(tracker)
+    return tracker
+
+def iter_pokemon(pokemon_ids, engine=None) -> Iterator[Dict]:
+    """
+    Como get_pokemon, pero entrega cada payload apenas está disponible: primero los que ya estaban en cache y después
+    los que llegan de la API, en el orden en que terminan las descargas (no por ID). Solo tiene sentido con el motor
+    'threads' (ver can_stream).
+
+    La descarga corre en un hilo aparte que pasa los payloads por una cola: el lock de llenado se suelta al terminar de
+    descargar, no cuando el que consume el generador (por ejemplo, un cliente lento de una respuesta en streaming)
+    termina de leer. Si el generador se cierra antes de tiempo, la descarga sigue y se guarda igual en los caches.
+    """
+    pokemon_ids = list(pokemon_ids)
+    missing_ids = _lookup(pokemon_ids)
+    yield from _cached(pokemon_ids, missing_ids)
+    if not missing_ids:
+        return
+
+    arrived = queue.Queue()
+    done = object()
+
+    def refill():
+        try:
+            _refill(missing_ids, engine, arrived.put)
+        except Exception as e:
+            arrived.put(e)
+        finally:
+            arrived.put(done)
+
+    threading.Thread(target=refill, name='catalog-refill', daemon=True).start()
+    while (pokemon := arrived.get()) is not done:
+        if isinstance(pokemon, Exception):
+            raise pokemon
+        yield pokemon
+
+def can_stream(engine=None) -> bool:
+    """
+    True si iter_pokemon entrega los payloads a medida que llegan. Con el motor 'async' (el de ASGI) y con el mirror
+    llegan todos juntos al final, así que enviar la página en streaming no adelanta nada.
+    """
+    return config.POKEMON_SOURCE != 'mirror' and (engine or config.TRANSPORT_ENGINE) != 'async'
+
+def _lookup(pokemon_ids) -> List[int]:
+    """Pone al día la copia local y devuelve los IDs que hay que pedir (con sus métricas de hit/miss)."""
+    _sync_local_cache()
+    missing_ids = _missing(pokemon_ids)
+    metrics.registry.inc('app_catalog_cache_requests_total', len(pokemon_ids) - len(missing_ids), result='hit')
+    metrics.registry.inc('app_catalog_cache_requests_total', len(missing_ids), result='miss')
+    if not missing_ids:
+        print("[transport.py]: Usando cache de Pokémon")
+    return missing_ids
+
+def _refill(missing_ids, engine=None, emit=None) -> None:
+    """
+    Obtiene los Pokémon que faltan y los guarda en los caches. emit(payload), si se pasa, recibe cada uno apenas
+    llega (los que publicó otro proceso y los descargados).
+    """
+    emit = emit or (lambda pokemon: None)
+    # Solo un proceso va a la API por los mismos IDs; el resto espera a que publique lo que falta
+    lock_name = shared_cache.ids_lock_name(missing_ids)
+    with shared_cache.refill_lock(lock_name) as acquired:
+        if not acquired:
+            print("[transport.py]: Otro proceso está obteniendo los datos, esperando...")
+            entries = shared_cache.wait_for_entries(missing_ids, lock_name, config.POKEMON_CACHE_LOCK_WAIT)
+            _load_entries(entries)
+            waited_ids, missing_ids = missing_ids, _missing(missing_ids)
+            for pokemon in _cached(waited_ids, missing_ids):
+                emit(pokemon)
+
+        if missing_ids:
+            print(f"[transport.py]: Obteniendo {len(missing_ids)} Pokémon de la API...")
+            json_collection = []
+            try:
+                for pokemon in iter_fetch_many(missing_ids, engine):
+                    json_collection.append(pokemon)
+                    emit(pokemon)
+            finally:
+                # Guardar en cache
+                if json_collection:
+                    _store_in_cache(json_collection)
+                    _publish(json_collection)
+                    save_snapshot()
+                print(f"[transport.py]: Obtenidos {len(json_collection)} Pokémon")
+
+def _cached(pokemon_ids, missing_ids) -> List[Dict]:
+    """Payloads en cache de pokemon_ids, salvo los de missing_ids."""
+    missing_ids = set(missing_ids)
+    with _cache_lock:
+        return [_cache[pokemon_id] for pokemon_id in pokemon_ids if pokemon_id not in missing_ids and pokemon_id in _cache]
+
+def get_catalog_ids() -> List[int]:
+    """IDs de todos los Pokémon del catálogo configurado (config.POKEMON_CATALOG_SIZE)."""
+    return list(range(POKEMON_RANGE[0], POKEMON_RANGE[1]))
+
+def is_cached(pokemon_ids) -> bool:
+    """True si get_pokemon(pokemon_ids) no tendría que ir a la API (ya están en cache o fallaron hace poco)."""
+    _sync_local_cache()
+    return not _missing(pokemon_ids)
+
+def in_catalog(pokemon_id) -> bool:
+    """True si el ID es parte del catálogo configurado (sin armar la lista de IDs)."""
+    return POKEMON_RANGE[0] <= pokemon_id < POKEMON_RANGE[1]
+
+def _missing(pokemon_ids) -> List[int]:
+    """IDs que no están en el cache local, salvo los que fallaron hace menos de config.NEGATIVE_CACHE_TTL segundos."""
+    now = time.monotonic()
+    with _cache_lock:
+        return [pokemon_id for pokemon_id in pokemon_ids if pokemon_id not in _cache and _failed_until.get(pokemon_id, 0) <= now]
+
+def _sync_local_cache():
+    """
+    Pone al día la copia local: si otro proceso publicó una versión nueva la recarga del cache compartido, y en un
+    arranque en frío prueba con el cache compartido y después con el snapshot en disco.
+    """
+    shared_version = shared_cache.get_version()
+    with _cache_lock:
+        if _cache and shared_version in (None, _cache_version):
+            return
+
+    if not load_from_shared_cache() and not get_cache_size():
+        load_from_snapshot()
+
+def fetch_many(pokemon_ids, engine=None, deadline=None) -> List[Dict]:
+    """
+    Obtiene los Pokémon indicados de la API con el motor elegido ('threads' o 'async'), o del mirror local si
+    config.POKEMON_SOURCE es 'mirror'. Devuelve los que se pudieron obtener, ordenados por ID.
+
+    Los que ya están en cache se piden de forma condicional (If-None-Match / If-Modified-Since): si la API responde
+    304 se devuelve el mismo objeto que ya teníamos, sin descargar ni procesar el cuerpo.
+
+    La descarga dura como máximo deadline segundos (por defecto config.FETCH_DEADLINE). Los que no llegaron a
+    tiempo o fallaron no se vuelven a pedir hasta dentro de config.NEGATIVE_CACHE_TTL segundos (ver _missing).
+    """
+    json_collection = list(iter_fetch_many(pokemon_ids, engine, deadline))
+    json_collection.sort(key=lambda x: x.get('id', 0))
+    return json_collection
+
+def iter_fetch_many(pokemon_ids, engine=None, deadline=None) -> Iterator[Dict]:
+    """
+    Como fetch_many, pero entrega cada Pokémon apenas se obtiene. Con el motor 'threads' es el orden en que terminan
+    las descargas; con 'async' y con el mirror llegan todos juntos al final.
+    """
+    deadline = config.FETCH_DEADLINE if deadline is None else deadline
+    pokemon_ids = list(pokemon_ids)
+    with _cache_lock:
+        cached = {pokemon_id: _cache[pokemon_id] for pokemon_id in pokemon_ids if pokemon_id in _cache and pokemon_id in _validators}
+        validators = {pokemon_id: _validators[pokemon_id] for pokemon_id in cached}
+
+    if config.POKEMON_SOURCE == 'mirror':
+        results = mirror.open_mirror(config.POKEMON_MIRROR_PATH).fetch(pokemon_ids)
+    elif (engine or config.TRANSPORT_ENGINE) == 'async':
+        # el lote corre en el event loop del transporte, con el cliente httpx compartido (ver async_transport)
+        results = async_transport.fetch_all_pokemon_sync(pokemon_ids, validators=validators, cached=cached, deadline=deadline)
+    else:
+        results = iter_fetch_all_pokemon(pokemon_ids, validators, cached, deadline)
+
+    fetched_ids = set()
+    for pokemon in results:
+        fetched_ids.add(pokemon['id'])
+        yield pokemon
+
+    failed_ids = [pokemon_id for pokemon_id in pokemon_ids if pokemon_id not in fetched_ids]
+    retry_at = time.monotonic() + config.NEGATIVE_CACHE_TTL
+    with _cache_lock:
+        _validators.update(validators)
+        for pokemon_id in fetched_ids:
+            _failed_until.pop(pokemon_id, None)
+        for pokemon_id in failed_ids:
+            _failed_until[pokemon_id] = retry_at
+    if failed_ids:
+        print(f"[transport.py]: {len(failed_ids)} Pokémon no se pudieron obtener; se reintentan en {config.NEGATIVE_CACHE_TTL}s")
+
+def fetch_all_pokemon(pokemon_ids, validators=None, cached=None, deadline=None) -> List[Dict]:
+    """
+    Obtiene en paralelo los Pokémon indicados, ordenados por ID. Los que fallan se omiten.
+
+    Args:
+        validators: {id: validadores} para pedidos condicionales; se actualiza con los de cada respuesta nueva
+        cached: {id: payload} que se devuelve cuando la API responde 304
+        deadline: segundos como máximo para todo el lote; lo que no terminó a tiempo se omite
+    """
+    json_collection = list(iter_fetch_all_pokemon(pokemon_ids, validators, cached, deadline))
+
+    # Ordenar por ID para mantener consistencia
+    json_collection.sort(key=lambda x: x.get('id', 0))
+    return json_collection
+
+def iter_fetch_all_pokemon(pokemon_ids, validators=None, cached=None, deadline=None) -> Iterator[Dict]:
+    """Como fetch_all_pokemon, pero entrega cada Pokémon apenas termina su descarga (en el orden de as_completed)."""
     # Usar ThreadPoolExecutor para hacer peticiones paralelas
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
         # Crear futures para cada petición
         future_to_id = {
-            executor.submit(fetch_single_pokemon, pokemon_id): pokemon_id 
-            for pokemon_id in range(POKEMON_RANGE[0], POKEMON_RANGE[1])
+            executor.submit(fetch_single_pokemon, pokemon_id, validators, cached): pokemon_id 
+            for pokemon_id in pokemon_ids
         }
         
-        for future in concurrent.futures.as_completed(future_to_id):
-            pokemon_id = future_to_id[future]
-            try:
-                pokemon_data = future.result()
+        try:
+            for future in concurrent.futures.as_completed(future_to_id, timeout=deadline):
+                pokemon_id = future_to_id[future]
+                try:
+                    pokemon_data = future.result()
+                except Exception as exc:
+                    print(f"[transport.py]: Error al obtener Pokémon {pokemon_id}: {exc}")
+                    continue
                 if pokemon_data:
-                    json_collection.append(pokemon_data)
-            except Exception as exc:
-                print(f"[transport.py]: Error al obtener Pokémon {pokemon_id}: {exc}")
-    
-    # Ordenar por ID para mantener consistencia
-    json_collection.sort(key=lambda x: x.get('id', 0))
-    
-    # Guardar en cache
+                    yield pokemon_data
+        except concurrent.futures.TimeoutError:
+            pending = sum(1 for future in future_to_id if not future.done())
+            print(f"[transport.py]: Se agotó el plazo de {deadline}s, quedan {pending} Pokémon sin obtener")
+    finally:
+        # no se espera a los pedidos en curso: terminan solos (a lo sumo REQUEST_TIMEOUT) y su resultado se descarta
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _store_in_cache(json_collection, fetched_at=None) -> List[Dict]:
+    """
+    Guarda los Pokémon en el cache local, todos de una vez: un request que lee el cache ve la versión anterior
+    completa o la nueva completa, nunca una mezcla. Los que no cambiaron conservan el objeto que ya estaba (y todo
+    lo que se derivó de él); solo se actualiza su fecha.
+
+    Returns:
+        list: los Pokémon nuevos o que cambiaron
+    """
+    global _generation
+    fetched_at = time.time() if fetched_at is None else fetched_at
     with _cache_lock:
+        changed = [pokemon for pokemon in json_collection if _cache.get(pokemon['id']) != pokemon]
         for pokemon in json_collection:
-            _cache[pokemon['id']] = pokemon
-    
-    print(f"[transport.py]: Obtenidos {len(json_collection)} Pokémon")
-    return json_collection
+            _fetched_at[pokemon['id']] = fetched_at
+        if changed:
+            _generation += 1
+            _cache.update((pokemon['id'], pokemon) for pokemon in changed)
+    return changed
+
+def fetch_single_pokemon(pokemon_id, validators=None, cached=None):
+    """Función auxiliar para obtener un solo Pokémon (ver fetch_all_pokemon para validators y cached)"""
+    breaker = circuit_breaker.upstream
+    if not breaker.allow():
+        print(f"[transport.py]: Circuito abierto, se omite el id {pokemon_id}")
+        return None
 
-def fetch_single_pokemon(pokemon_id):
-    """Función auxiliar para obtener un solo Pokémon"""
+    start = time.perf_counter()
     try:
-        response = requests.get(
+        response = _session.get(
             config.STUDENTS_REST_API_URL + str(pokemon_id), 
+            headers=conditional.request_headers((validators or {}).get(pokemon_id)),
             timeout=REQUEST_TIMEOUT
         )
+        record_upstream('threads', response.status_code, start)
+
+        # un 5xx cuenta como falla de la API; un 404 no (la API responde bien, el Pokémon no existe)
+        if response.status_code >= 500:
+            breaker.record_failure()
+            print(f"[transport.py]: Error {response.status_code} para el id {pokemon_id}")
+            return None
+        breaker.record_success()
+
+        # 304: no cambió desde la última vez, se sigue usando el payload que ya teníamos
+        if response.status_code == conditional.NOT_MODIFIED and cached and pokemon_id in cached:
+            return cached[pokemon_id]
         
-        if not response.ok:
+        if response.status_code == conditional.NOT_MODIFIED or not response.ok:
             print(f"[transport.py]: Error al obtener datos para el id {pokemon_id}")
             return None
 
@@ -70,18 +350,29 @@ def fetch_single_pokemon(pokemon_id):
             print(f"[transport.py]: Pokémon con id {pokemon_id} no encontrado.")
             return None
 
-        return raw_data
+        if validators is not None:
+            validators[pokemon_id] = conditional.response_validators(response.headers)
+        return project_payload(raw_data)
         
     except requests.exceptions.Timeout:
+        record_upstream('threads', 'timeout', start)
+        breaker.record_failure()
         print(f"[transport.py]: Timeout para el id {pokemon_id}")
         return None
     except requests.exceptions.RequestException as e:
+        record_upstream('threads', 'error', start)
+        breaker.record_failure()
         print(f"[transport.py]: Error de red para el id {pokemon_id}: {e}")
         return None
     except Exception as e:
         print(f"[transport.py]: Error inesperado para el id {pokemon_id}: {e}")
         return None
 
+def record_upstream(engine, result, start):
+    """Cuenta un pedido a PokeAPI (result: código HTTP, 'timeout' o 'error') y su latencia desde start."""
+    metrics.registry.inc('app_upstream_requests_total', engine=engine, result=result)
+    metrics.registry.observe('app_upstream_request_duration_seconds', time.perf_counter() - start, engine=engine)
+
 # obtiene la imagen correspodiente para un type_id especifico 
 def get_type_icon_url_by_id(type_id):
     base_url = 'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/types/generation-iii/colosseum/'
@@ -90,12 +381,26 @@ def get_type_icon_url_by_id(type_id):
 
 def clear_cache() -> None:
     """
-    Limpia el cache de Pokémon.
+    Limpia el cache de Pokémon, tanto el local como el compartido.
     
-    Útil para forzar una nueva obtención de datos de la API.
+    Útil para forzar una nueva carga de datos (desde el snapshot en disco o, si no hay, desde la API).
     """
+    global _cache_version, _generation, _refresh_stats, _snapshot_saved_at, _snapshot_timer
+    with _snapshot_lock:
+        if _snapshot_timer is not None:
+            _snapshot_timer.cancel()
+        _snapshot_timer = None
+        _snapshot_saved_at = None
     with _cache_lock:
+        _generation += 1
         _cache.clear()
+        _fetched_at.clear()
+        _validators.clear()
+        _failed_until.clear()
+        _cache_version = None
+        _refresh_stats = None
+    shared_cache.clear()
+    circuit_breaker.upstream.reset()
     print("[transport.py]: Cache limpiado")
 
 
@@ -107,4 +412,244 @@ def get_cache_size() -> int:
         int: Número de Pokémon en cache
     """
     with _cache_lock:
-        return len(_cache)
\ No newline at end of file
+        return len(_cache)
+
+
+def get_generation() -> int:
+    """
+    Devuelve un número que cambia cada vez que cambia el contenido del cache local. Sirve para saber si algo
+    calculado a partir del catálogo (índices, cards) sigue siendo válido.
+    """
+    with _cache_lock:
+        return _generation
+
+
+def get_synced_generation() -> int:
+    """Como get_generation, pero antes se pone al día con el cache compartido (sin recorrer el catálogo)."""
+    _sync_local_cache()
+    return get_generation()
+
+
+def get_catalog_version() -> str:
+    """
+    Versión del catálogo cargado: la del cache compartido (igual en todos los workers que lo comparten) o, si no
+    hay, la generación local. Sirve para armar validadores HTTP (ETag).
+    """
+    _sync_local_cache()
+    with _cache_lock:
+        return _cache_version or f'local-{_generation}'
+
+
+def get_last_modified() -> Optional[float]:
+    """Momento (timestamp) en que se obtuvo el Pokémon más reciente del cache local, o None si está vacío."""
+    with _cache_lock:
+        return max(_fetched_at.values()) if _fetched_at else None
+
+
+def load_from_shared_cache() -> bool:
+    """
+    Carga el cache local desde el cache compartido entre procesos.
+
+    Returns:
+        bool: True si se cargó al menos un Pokémon
+    """
+    global _cache_version
+    version = shared_cache.get_version()
+    entries = shared_cache.get_entries()
+    if not entries:
+        return False
+
+    _load_entries(entries)
+    _cache_version = version
+    print(f"[transport.py]: Cargados {len(entries)} Pokémon desde el cache compartido")
+    return True
+
+
+def load_from_snapshot() -> bool:
+    """
+    Carga el cache desde el snapshot en disco (config.SNAPSHOT_PATH) y lo publica en el cache compartido.
+
+    Si hay entradas vencidas según config.SNAPSHOT_TTL, las sirve igual y lanza un refresco en segundo plano.
+
+    Returns:
+        bool: True si se cargó al menos un Pokémon
+    """
+    global _cache_version
+    entries = snapshot.load_snapshot(config.SNAPSHOT_PATH)
+    if not entries:
+        return False
+
+    _load_entries(entries)
+    _cache_version = shared_cache.set_entries(entries)
+    print(f"[transport.py]: Cargados {len(entries)} Pokémon desde el snapshot")
+    return True
+
+
+def _load_entries(entries):
+    """Pasa entradas {'data', 'fetched_at'} al cache local y refresca en segundo plano las vencidas."""
+    global _generation
+    with _cache_lock:
+        changed = False
+        for pokemon_id, entry in entries.items():
+            # si ya tenemos esa misma versión del payload, conservamos el objeto (y todo lo que se derivó de él)
+            fetched_at = entry.get('fetched_at', 0)
+            if pokemon_id in _cache and _fetched_at.get(pokemon_id) == fetched_at:
+                continue
+            data = project_payload(entry['data'])
+            _fetched_at[pokemon_id] = fetched_at
+            _validators[pokemon_id] = snapshot.entry_validators(entry)
+            if _cache.get(pokemon_id) == data:
+                continue  # un refresco que no encontró cambios: solo cambia la fecha
+            _cache[pokemon_id] = data
+            changed = True
+        if changed:
+            _generation += 1
+
+    stale_ids = [pokemon_id for pokemon_id, entry in entries.items() if snapshot.is_stale(entry, config.SNAPSHOT_TTL)]
+    if stale_ids:
+        refresh_in_background(sorted(stale_ids))
+
+
+def _publish(json_collection, new_version=True):
+    """
+    Publica en el cache compartido los Pokémon recién obtenidos. Con new_version=False (nada cambió, solo las
+    fechas) se conserva la versión del catálogo, así no se invalidan ETags ni fragmentos en los demás procesos.
+    """
+    global _cache_version
+    with _cache_lock:
+        entries = {pokemon['id']: _make_entry(pokemon['id'], pokemon) for pokemon in json_collection}
+    if entries:
+        _cache_version = shared_cache.set_entries(entries, new_version)
+
+
+def _make_entry(pokemon_id, data):
+    # se llama con _cache_lock tomado
+    return snapshot.make_entry(data, _fetched_at.get(pokemon_id), _validators.get(pokemon_id))
+
+
+def save_snapshot(force=False) -> None:
+    """
+    Guarda el contenido actual del cache en el snapshot en disco. Cada escritura serializa el catálogo entero, así que
+    se hace como mucho una vez cada config.SNAPSHOT_SAVE_INTERVAL segundos: si se pide antes, se programa una sola
+    escritura para cuando se cumple el intervalo, con todo lo que llegue mientras tanto. Con force se escribe ya.
+    """
+    global _snapshot_timer
+    with _snapshot_lock:
+        if not force and _snapshot_saved_at is not None:
+            wait = _snapshot_saved_at + config.SNAPSHOT_SAVE_INTERVAL - time.monotonic()
+            if wait > 0:
+                if _snapshot_timer is None:
+                    _snapshot_timer = threading.Timer(wait, _save_pending_snapshot)
+                    _snapshot_timer.daemon = True
+                    _snapshot_timer.start()
+                return
+        _write_snapshot()
+
+
+def _save_pending_snapshot() -> None:
+    global _snapshot_timer
+    with _snapshot_lock:
+        if _snapshot_timer is None:
+            return
+        _snapshot_timer.cancel()
+        _snapshot_timer = None
+        _write_snapshot()
+
+
+def _write_snapshot() -> None:
+    # se llama con _snapshot_lock tomado
+    global _snapshot_saved_at
+    _snapshot_saved_at = time.monotonic()
+    with _cache_lock:
+        entries = {pokemon_id: _make_entry(pokemon_id, data) for pokemon_id, data in _cache.items()}
+    if entries:
+        snapshot.save_snapshot(config.SNAPSHOT_PATH, entries)
+
+
+# lo que quedó pendiente se escribe al terminar el proceso
+atexit.register(_save_pending_snapshot)
+
+
+def refresh_in_background(pokemon_ids) -> Optional[threading.Thread]:
+    """
+    Vuelve a pedir a la API los Pokémon indicados en un hilo aparte, sin bloquear el request actual.
+    Si ya hay un refresco en curso no lanza otro.
+
+    Returns:
+        Thread: el hilo lanzado, o None si ya había uno corriendo
+    """
+    global _refresh_thread
+    with _cache_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return None
+        _refresh_thread = threading.Thread(target=_refresh, args=(list(pokemon_ids),), daemon=True)
+        _refresh_thread.start()
+        return _refresh_thread
+
+
+def _refresh(pokemon_ids):
+    print(f"[transport.py]: Refrescando {len(pokemon_ids)} Pokémon en segundo plano")
+    refresh_catalog(pokemon_ids)
+
+
+def refresh_catalog(pokemon_ids=None, max_age=None, engine=None) -> Optional[Dict]:
+    """
+    Vuelve a pedir a la API los Pokémon del catálogo y reemplaza de una sola vez los que cambiaron. Mientras
+    dura la descarga los requests siguen sirviendo la versión anterior (stale-while-revalidate).
+
+    Args:
+        pokemon_ids: IDs a refrescar; por defecto todo el catálogo
+        max_age: si se indica, solo se refrescan los obtenidos hace más de max_age segundos
+        engine: 'threads' o 'async' para las descargas; por defecto config.TRANSPORT_ENGINE
+
+    Returns:
+        dict: estadísticas del refresco (ver get_refresh_stats), o None si otro proceso ya estaba refrescando
+    """
+    global _refresh_stats
+    pokemon_ids = list(get_catalog_ids() if pokemon_ids is None else pokemon_ids)
+
+    # Si otro proceso ya está refrescando, seguimos sirviendo los datos viejos hasta que publique la versión nueva
+    with shared_cache.refill_lock('refresh') as acquired:
+        if not acquired:
+            return None
+
+        _sync_local_cache()
+        started_at = time.time()
+        if max_age is not None:
+            with _cache_lock:
+                pokemon_ids = [pokemon_id for pokemon_id in pokemon_ids if started_at - _fetched_at.get(pokemon_id, 0) > max_age]
+
+        start = time.perf_counter()
+        json_collection = fetch_many(pokemon_ids, engine) if pokemon_ids else []
+        with _cache_lock:
+            not_modified = sum(1 for pokemon in json_collection if _cache.get(pokemon['id']) is pokemon)
+        changed = _store_in_cache(json_collection)
+        if json_collection:
+            _publish(json_collection, new_version=bool(changed))
+            save_snapshot(force=True)
+
+        stats = {
+            'refreshed_at': started_at,
+            'duration': time.perf_counter() - start,
+            'requested': len(pokemon_ids),
+            'fetched': len(json_collection),
+            'not_modified': not_modified,  # respondidos con 304
+            'changed': len(changed),
+        }
+        _refresh_stats = stats
+        shared_cache.set_refresh_stats(stats)
+        print(f"[transport.py]: Refresco terminado: {stats['changed']} de {stats['requested']} Pokémon cambiaron ({stats['duration']:.2f}s)")
+        return stats
+
+
+def get_upstream_state() -> str:
+    """Estado del cortacircuitos de PokeAPI en este proceso: 'closed', 'open' o 'half_open'."""
+    return circuit_breaker.upstream.state
+
+
+def get_refresh_stats() -> Optional[Dict]:
+    """
+    Resultado del último refresco del catálogo, hecho por este proceso o por otro (cache compartido):
+    {'refreshed_at': timestamp, 'duration': segundos, 'requested', 'fetched', 'not_modified', 'changed'}. None si nunca se refrescó.
+    """
+    return shared_cache.get_refresh_stats() or _refresh_stats
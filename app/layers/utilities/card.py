@@ -1,4 +1,7 @@
 class Card:
+    # __slots__ evita un __dict__ por instancia: con el catálogo entero en memoria cada card ocupa bastante menos.
+    __slots__ = ('name', 'height', 'weight', 'base', 'image', 'user', 'id', 'types', 'type_images', 'is_favourite')
+
     def __init__(self, name, height, base, weight, image, types, user=None, id=None, type_images=None, is_favourite=False):
         self.name = name  # Nombre del pokemon
         self.height = height  # ALTURA
@@ -25,3 +28,29 @@ class Card:
     # Método hashCode.
     def __hash__(self):
         return hash((self.name, self.height, self.weight, self.id))
+
+    # copia de la card con algunos campos cambiados (ej. card.replace(is_favourite=True)); siempre es una Card común.
+    def replace(self, **changes):
+        values = {field: getattr(self, field) for field in Card.__slots__}
+        values.update(changes)
+        return Card(**values)
+
+
+class FrozenCard(Card):
+    # Card de solo lectura, para las que se comparten entre requests (el cache de services.getCards): asignar un campo
+    # lanza AttributeError y los tipos son tuplas. Para cambiar algo se usa replace(), que devuelve una Card nueva.
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, card):
+        frozen = object.__new__(cls)
+        for field in Card.__slots__:
+            value = getattr(card, field)
+            object.__setattr__(frozen, field, tuple(value) if isinstance(value, list) else value)
+        return frozen
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"La card {self.id} es de solo lectura (usar replace)")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"La card {self.id} es de solo lectura (usar replace)")
@@ -0,0 +1,187 @@
+# metrics: instrumentación liviana de la aplicación, sin dependencias externas.
+#   - registry: contadores, gauges e histogramas del proceso, que la vista /metrics devuelve en formato de texto de
+#     Prometheus (cache hit ratio, latencia de PokeAPI, consultas a la base, tiempos por capa...).
+#   - timer / timed: miden cuánto tarda cada capa (transport, translate, repository, render). Además de alimentar el
+#     histograma app_layer_duration_seconds, acumulan los tiempos del request en curso, que main/middleware.py manda
+#     en la cabecera Server-Timing y en el log del request.
+
+import contextvars
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Optional
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# tiempos del request en curso: capa -> [segundos, llamadas]. None fuera de un request (comandos, hilos de fondo).
+_timings = contextvars.ContextVar('timings', default=None)
+
+
+class Registry:
+    """Métricas del proceso. Cada serie es (nombre, etiquetas); los nombres se declaran con su tipo y descripción."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}  # nombre -> (tipo, descripción, buckets)
+        self._values = {}  # (nombre, etiquetas) -> valor (contadores y gauges)
+        self._histograms = {}  # (nombre, etiquetas) -> [conteo por bucket, suma, total]
+
+    def declare(self, name, kind, description, buckets=DEFAULT_BUCKETS):
+        self._help[name] = (kind, description, tuple(buckets))
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        buckets = self._help[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def get(self, name, **labels):
+        """Valor actual de un contador o gauge (0 si todavía no se registró nada)."""
+        with self._lock:
+            return self._values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Todas las series en el formato de texto de Prometheus (version 0.0.4)."""
+        with self._lock:
+            values = sorted(self._values.items())
+            histograms = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._histograms.items())
+
+        lines = []
+        for name, (kind, description, buckets) in sorted(self._help.items()):
+            series = [(labels, value) for (series_name, labels), value in values if series_name == name]
+            observed = [(labels, data) for (series_name, labels), data in histograms if series_name == name]
+            if not series and not observed:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in series:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for labels, (counts, total, count) in observed:
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {bucket_count}')
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+registry.declare('app_http_requests_total', 'counter', 'Requests atendidos, por vista y código de respuesta.')
+registry.declare('app_http_request_duration_seconds', 'histogram', 'Duración de los requests, por vista.')
+registry.declare('app_layer_duration_seconds', 'histogram', 'Tiempo de cada llamada instrumentada, por capa.')
+registry.declare('app_db_queries_total', 'counter', 'Consultas SQL ejecutadas durante requests.')
+registry.declare('app_db_queries_per_request', 'histogram', 'Consultas SQL por request.', buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+registry.declare('app_catalog_cache_requests_total', 'counter', 'Pokémon pedidos al cache de transport: hit (ya estaban) o miss (hubo que buscarlos).')
+registry.declare('app_catalog_cache_size', 'gauge', 'Pokémon en el cache local del proceso.')
+registry.declare('app_upstream_requests_total', 'counter', 'Pedidos a PokeAPI, por motor y resultado (código HTTP, timeout, error).')
+registry.declare('app_upstream_request_duration_seconds', 'histogram', 'Latencia de los pedidos a PokeAPI, por motor.')
+registry.declare('app_upstream_circuit_open', 'gauge', '1 si el cortacircuitos de PokeAPI está abierto o semiabierto.')
+
+
+def start_request():
+    """Empieza a acumular los tiempos por capa del request en curso. Devuelve el token para end_request."""
+    return _timings.set({})
+
+
+def end_request(token) -> Dict[str, list]:
+    """Termina el request en curso y devuelve sus tiempos: capa -> [segundos, llamadas]."""
+    timings = _timings.get()
+    _timings.reset(token)
+    return timings or {}
+
+
+def record(layer, elapsed, calls=1):
+    """Suma elapsed segundos a la capa en el request en curso (no hace nada fuera de un request)."""
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(layer, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += calls
+
+
+@contextmanager
+def timer(layer):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('app_layer_duration_seconds', elapsed, layer=layer)
+        record(layer, elapsed)
+
+
+def timed(layer):
+    """Decorador: mide cada llamada a la función con timer(layer). Sirve también para funciones async."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timer(layer):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(layer):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def time_queries(execute, sql, params, many, context):
+    """execute_wrapper de Django: suma cada consulta SQL a la capa 'db' del request en curso."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('db', time.perf_counter() - start)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    Receptor de connection_created (ver apps.py): instala time_queries en cada conexión nueva. Como los tiempos del
+    request viven en un contextvar, se cuentan también las consultas del ORM async, que corren en otros hilos.
+    """
+    connection.execute_wrappers.append(time_queries)
+
+
+def server_timing(timings: Dict[str, list], total: Optional[float] = None) -> str:
+    """Valor de la cabecera Server-Timing: una métrica por capa (dur en milisegundos, desc con la cantidad de llamadas)."""
+    parts = [f'{layer};dur={seconds * 1000:.1f};desc="{calls} calls"' for layer, (seconds, calls) in timings.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
@@ -0,0 +1,226 @@
+# índice de búsqueda por nombre: se arma una sola vez por versión del catálogo y evita recorrer todas las cards en cada búsqueda.
+from bisect import bisect_left
+from itertools import islice
+from collections import defaultdict
+
+NGRAM_SIZE = 3  # largo máximo de los n-gramas indexados
+FUZZY_MIN_LENGTH = 4  # con búsquedas más cortas casi todo está "a un error de distancia"
+MAX_QUERY_TOKENS = 64  # largo máximo de una expresión de tipos (el parser es recursivo: acota también el anidamiento)
+
+
+class NameIndex:
+    """
+    Índice de nombres de pokemon en minúsculas con:
+      - una lista ordenada para búsquedas por prefijo (bisect),
+      - n-gramas de 1 a NGRAM_SIZE caracteres para búsquedas por subcadena,
+      - distancia de edición sobre los candidatos que comparten n-gramas, para tolerar errores de tipeo.
+    """
+
+    def __init__(self, entries):
+        # entries: iterable de (id, nombre)
+        self.names = {}
+        self.sorted_names = []
+        self.ngrams = defaultdict(set)
+
+        for pokemon_id, name in entries:
+            lowered = (name or '').lower()
+            self.names[pokemon_id] = lowered
+            self.sorted_names.append((lowered, pokemon_id))
+            for gram in _ngrams(lowered):
+                self.ngrams[gram].add(pokemon_id)
+
+        self.sorted_names.sort()
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=None, fuzzy=True):
+        """
+        Devuelve los IDs que coinciden con query, ordenados por relevancia: nombre exacto, prefijo, subcadena
+        (cuanto antes aparece, mejor) y por último coincidencias aproximadas (menor distancia de edición primero).
+        """
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+
+        ranked = {}
+        for pokemon_id in self.prefix(query):
+            ranked[pokemon_id] = (0 if self.names[pokemon_id] == query else 1, 0)
+        for pokemon_id in self.substring(query):
+            ranked.setdefault(pokemon_id, (2, self.names[pokemon_id].index(query)))
+        if fuzzy:
+            for pokemon_id, distance in self.fuzzy(query):
+                ranked.setdefault(pokemon_id, (3, distance))
+
+        result = sorted(ranked, key=lambda pokemon_id: (ranked[pokemon_id], len(self.names[pokemon_id]), pokemon_id))
+        return result[:limit] if limit else result
+
+    def prefix(self, query, limit=None):
+        """IDs cuyo nombre empieza con query, en orden alfabético (los primeros limit, si se indica)."""
+        start = bisect_left(self.sorted_names, (query,))
+        result = []
+        for name, pokemon_id in islice(self.sorted_names, start, start + limit if limit else None):
+            if not name.startswith(query):
+                break
+            result.append(pokemon_id)
+        return result
+
+    def complete(self, query, limit):
+        """
+        Sugerencias para autocompletar: hasta limit IDs cuyo nombre empieza con query, en orden alfabético (el nombre
+        exacto queda primero); si no alcanzan, se completan con los que lo contienen (cuanto antes aparece, mejor).
+        Con la lista ordenada, el caso común (prefijo) cuesta una búsqueda binaria más limit pasos.
+        """
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+
+        result = self.prefix(query, limit)
+        if len(result) < limit:
+            found = set(result)
+            others = [pokemon_id for pokemon_id in self.substring(query) if pokemon_id not in found]
+            others.sort(key=lambda pokemon_id: (self.names[pokemon_id].index(query), len(self.names[pokemon_id]), pokemon_id))
+            result += others[:limit - len(result)]
+        return result
+
+    def substring(self, query):
+        """IDs cuyo nombre contiene query."""
+        grams = {query} if len(query) <= NGRAM_SIZE else set(_ngrams_of_size(query, NGRAM_SIZE))
+        postings = sorted((self.ngrams.get(gram, set()) for gram in grams), key=len)
+        candidates = set.intersection(*postings)
+        return [pokemon_id for pokemon_id in candidates if query in self.names[pokemon_id]]
+
+    def fuzzy(self, query, max_distance=None):
+        """(id, distancia) de los nombres a distancia de edición <= max_distance (por defecto, 1 cada 4 letras)."""
+        if len(query) < FUZZY_MIN_LENGTH:
+            return []
+        max_distance = max_distance if max_distance is not None else max(1, len(query) // 4)
+
+        # lema de q-gramas: cada edición (incluida una transposición) rompe como mucho 3 bigramas, así que un nombre
+        # a distancia <= max_distance comparte al menos (bigramas de query - 3 * max_distance) bigramas con la búsqueda.
+        bigrams = list(_ngrams_of_size(query, 2))
+        shared = defaultdict(int)
+        for gram in set(bigrams):
+            for pokemon_id in self.ngrams.get(gram, ()):
+                shared[pokemon_id] += 1
+        min_shared = max(1, len(set(bigrams)) - 3 * max_distance)
+
+        result = []
+        for pokemon_id in (pokemon_id for pokemon_id, count in shared.items() if count >= min_shared):
+            name = self.names[pokemon_id]
+            # se compara contra el nombre completo y contra su prefijo del largo de la búsqueda ("pikahcu" ~ "pikachu")
+            distance = min(
+                _edit_distance(query, name, max_distance),
+                _edit_distance(query, name[:len(query)], max_distance),
+            )
+            if distance <= max_distance:
+                result.append((pokemon_id, distance))
+        return result
+
+
+def _ngrams(text):
+    for size in range(1, NGRAM_SIZE + 1):
+        yield from _ngrams_of_size(text, size)
+
+
+def _ngrams_of_size(text, size):
+    return (text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def _edit_distance(a, b, limit):
+    """
+    Distancia de edición (Levenshtein + transposición de letras vecinas, que es el error de tipeo más común).
+    Corta apenas se sabe que supera limit y en ese caso devuelve limit + 1.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before_previous and i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+class TypeIndex:
+    """
+    Índice invertido tipo -> pokemon. Cada tipo guarda un bitset (un int de Python: el bit i corresponde al
+    i-ésimo ID en orden), así AND/OR/NOT son operaciones de bits sobre todo el catálogo a la vez.
+
+    Las consultas aceptan AND, OR, NOT y paréntesis, sin distinguir mayúsculas: "fire AND flying",
+    "water OR ice", "grass NOT poison", "(fire OR water) AND NOT flying". Dos tipos seguidos sin operador se
+    toman como AND.
+    """
+
+    def __init__(self, entries):
+        # entries: iterable de (id, [tipos])
+        entries = sorted(entries)
+        self.ids = [pokemon_id for pokemon_id, _ in entries]
+        self.all_bits = (1 << len(self.ids)) - 1
+        self.bits = defaultdict(int)
+
+        for position, (_, types) in enumerate(entries):
+            for type_name in types:
+                self.bits[type_name.lower()] |= 1 << position
+
+    def types(self):
+        return sorted(self.bits)
+
+    def query(self, expression):
+        """Devuelve los IDs (ordenados) que cumplen la expresión. Un tipo desconocido no coincide con nada."""
+        tokens = _tokenize(expression)
+        if not tokens:
+            return []
+        if len(tokens) > MAX_QUERY_TOKENS:
+            raise ValueError(f"Expresión de tipos demasiado larga (máximo {MAX_QUERY_TOKENS} términos)")
+        bits, position = self._parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"Expresión de tipos inválida: {expression!r}")
+        return self.to_ids(bits)
+
+    def to_ids(self, bits):
+        return [pokemon_id for position, pokemon_id in enumerate(self.ids) if bits >> position & 1]
+
+    def _parse_or(self, tokens, position):
+        bits, position = self._parse_and(tokens, position)
+        while position < len(tokens) and tokens[position] == 'or':
+            right, position = self._parse_and(tokens, position + 1)
+            bits |= right
+        return bits, position
+
+    def _parse_and(self, tokens, position):
+        bits, position = self._parse_not(tokens, position)
+        while position < len(tokens) and tokens[position] not in ('or', ')'):
+            if tokens[position] == 'and':
+                position += 1
+            right, position = self._parse_not(tokens, position)
+            bits &= right
+        return bits, position
+
+    def _parse_not(self, tokens, position):
+        if position >= len(tokens):
+            raise ValueError("Expresión de tipos incompleta")
+        token = tokens[position]
+        if token == 'not':
+            bits, position = self._parse_not(tokens, position + 1)
+            return self.all_bits & ~bits, position
+        if token == '(':
+            bits, position = self._parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ')':
+                raise ValueError("Falta cerrar un paréntesis")
+            return bits, position + 1
+        if token in ('and', 'or', ')'):
+            raise ValueError(f"Operador inesperado: {token!r}")
+        return self.bits.get(token, 0), position + 1
+
+
+def _tokenize(expression):
+    return (expression or '').lower().replace('(', ' ( ').replace(')', ' ) ').split()
@@ -1,8 +1,9 @@
 # translator: se refiere a un componente o conjunto de funciones que se utiliza para convertir o "mapear" datos de un formato o estructura a otro. Esta conversión se realiza típicamente cuando se trabaja con diferentes capas de una aplicación, como por ejemplo, entre la capa de datos y la capa de presentación, o entre dos modelos de datos diferentes.
-import ast
 from app.layers.utilities.card import Card
+from app.layers.utilities import metrics
 from app.layers.services import services
 # Usado cuando la información viene de la API, para transformarla en una Card.
+@metrics.timed('translate')
 def fromRequestIntoCard(poke_data):
     types = getTypes(poke_data)
     type_images = [services.get_type_icon_url_by_name(type_name) for type_name in types]
@@ -27,37 +28,24 @@ def getTypes(poke_data):
         types.append(t)
     return types
 
-# Usado cuando la información viene del template, para transformarla en una Card antes de guardarla en la base de datos.
-def fromTemplateIntoCard(templ): 
-    card = Card(
-        name=templ.POST.get("name"),
-        id=templ.POST.get("id"),  # id de pokeapi, corresponde a pokemon_id en la base de datos
-        height=templ.POST.get("height"),
-        weight=templ.POST.get("weight"),
-        types=templ.POST.get("types"),
-        base=templ.POST.get("base"),
-        image=templ.POST.get("image")
-    )
-    return card
+# campos de una Card que se pueden pedir en la API JSON (?fields=name,types)
+CARD_FIELDS = ('id', 'name', 'height', 'weight', 'base', 'image', 'types', 'type_images', 'is_favourite')
 
+# Usado por la API: transforma una Card en un dict serializable a JSON, solo con los campos pedidos (todos si fields es None).
+def fromCardIntoDict(card, fields=None):
+    return {field: getattr(card, field) for field in (fields or CARD_FIELDS)}
 
+
+# Usado cuando la información viene de la base (catálogo de Pokémon, ver repositories.get_all_favourites).
+@metrics.timed('translate')
 def fromRepositoryIntoCard(repo_dict):
-    types_list = repo_dict.get('types', [])
-    
-    if isinstance(types_list, str):
-        try:
-            types_list = ast.literal_eval(types_list)
-        except (ValueError, SyntaxError) as e:
-            print(f"Error al evaluar types: {e}, usando lista vacía")
-            types_list = []
-    
     return Card(
-        id=repo_dict.get('pokemon_id'),  # id de pokeapi, corresponde a pokemon_id en la base de datos
+        id=repo_dict.get('id'),  # id de pokeapi, es la clave primaria del catálogo
         name=repo_dict.get('name'),
         height=repo_dict.get('height'),
         weight=repo_dict.get('weight'),
         base=repo_dict.get('base_experience'),
-        types=types_list,
+        types=repo_dict.get('types') or [],
         image=repo_dict.get('image')
     )
 
@@ -0,0 +1,39 @@
+# Mide el tiempo de CPU que un request gasta en convertir el catálogo en cards: traduciendo todo en cada request
+# (como antes) contra las cards memorizadas de services.getCards.
+# Uso: python manage.py benchmark_cards --requests 200
+
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from app.layers.services import services
+from app.layers.transport import transport
+from app.layers.transport.stub_api import make_pokemon
+from app.layers.utilities import translator
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de CPU por request de traducir el catálogo entero contra reutilizar las cards memorizadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Cantidad de requests simulados por variante.')
+
+    def handle(self, *args, **options):
+        raw_images = [make_pokemon(pokemon_id, types=('grass', 'poison')) for pokemon_id in transport.get_catalog_ids()]
+        total = options['requests']
+
+        with mock.patch.object(transport, 'getAllImages', return_value=raw_images):
+            before = self.measure(lambda: [translator.fromRequestIntoCard(raw) for raw in raw_images], total)
+            services.getAllImages()  # primer request: llena el cache de cards
+            after = self.measure(services.getAllImages, total)
+
+        self.stdout.write(f'{len(raw_images)} Pokémon, {total} requests')
+        self.stdout.write(f'  traduciendo en cada request: {before * 1000:.3f} ms de CPU por request')
+        self.stdout.write(f'  cards memorizadas:           {after * 1000:.3f} ms de CPU por request')
+
+    def measure(self, request_path, total):
+        start = time.process_time()
+        for _ in range(total):
+            request_path()
+        return (time.process_time() - start) / total
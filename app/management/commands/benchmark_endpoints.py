@@ -0,0 +1,229 @@
+# Prueba de carga reproducible de las vistas principales contra un stub local de PokeAPI (ver transport/stub_api.py):
+#   - arranca el stub (con demora y proporción de errores configurables) y apunta config.STUDENTS_REST_API_URL a él,
+#   - usa una base de datos temporal (la misma maquinaria que los tests: migraciones incluidas), caches locmem y un
+#     snapshot temporal, así no toca db.sqlite3 ni el cache real y cada corrida arranca igual,
+#   - sirve la aplicación con un servidor WSGI de varios hilos en un puerto libre y la pide por HTTP, como un navegador.
+# Para cada endpoint mide la latencia en frío (caches vacíos: incluye la descarga del catálogo), la latencia en caliente
+# (p50/p95 de pedidos uno por uno) y el throughput con --clients clientes concurrentes durante --seconds segundos.
+# Con --asgi pide las vistas a la aplicación ASGI (main/asgi.py) en el mismo proceso, con clientes async de httpx; así
+# se comparan las vistas sync y las async (POKEMON_ASYNC_VIEWS=0/1) con muchos clientes esperando I/O a la vez.
+# Uso: python manage.py benchmark_endpoints --latency 0.02 --error-rate 0.05 --clients 8
+#      POKEMON_ASYNC_VIEWS=1 python manage.py benchmark_endpoints --asgi --clients 64
+
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.asgi import get_asgi_application
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from app.config import config
+from app.layers.persistence import repositories
+from app.layers.services import services
+from app.layers.transport import circuit_breaker, transport
+from app.layers.transport.stub_api import StubPokeAPI, make_full_pokemon
+
+TYPES = ('grass', 'fire', 'water', 'bug', 'normal', 'poison', 'electric', 'ground')
+
+ENDPOINTS = (
+    ('home', '/home/'),
+    ('buscar', '/buscar/?query=pokemon-1'),
+    ('filter_by_type', '/filter_by_type/?type=fire'),
+    ('favoritos', '/favourites/'),
+    ('api-pokemon', '/api/pokemon/?limit=50'),
+    ('api-favoritos', '/api/favourites/'),
+)
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-default'},
+    config.POKEMON_CACHE_ALIAS: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-pokemon'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-fragments'},
+}
+
+
+class QuietHandler(WSGIRequestHandler):
+    disable_nagle_algorithm = True  # con keep-alive, Nagle + ACK diferido del cliente suman ~40ms por respuesta
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia en frío y en caliente y throughput concurrente de las vistas principales contra un stub de PokeAPI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.02, help='Demora del stub por pedido, en segundos.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Proporción de pedidos al stub que responden 503.')
+        parser.add_argument('--seed', type=int, default=1, help='Semilla de los errores del stub.')
+        parser.add_argument('--clients', type=int, default=8, help='Clientes concurrentes para medir throughput.')
+        parser.add_argument('--seconds', type=float, default=3, help='Duración de cada medición de throughput.')
+        parser.add_argument('--warm-requests', type=int, default=30, help='Pedidos uno por uno para la latencia en caliente.')
+        parser.add_argument('--favourites', type=int, default=20, help='Favoritos del usuario de prueba.')
+        parser.add_argument('--asgi', action='store_true', help='Pide las vistas a la aplicación ASGI en el mismo proceso.')
+
+    def handle(self, *args, **options):
+        # la base y el snapshot van en una carpeta temporal propia, que se borra al terminar
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.benchmark(tmp_dir, options)
+
+    def benchmark(self, tmp_dir, options):
+        # base temporal en un archivo (no en memoria), para medir SQLite como en producción
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        pokemon = [make_full_pokemon(pokemon_id, types=(TYPES[pokemon_id % len(TYPES)],)) for pokemon_id in transport.get_catalog_ids()]
+        stub = StubPokeAPI(pokemon, latency=options['latency'], error_rate=options['error_rate'], seed=options['seed'])
+        patches = [
+            mock.patch.object(config, 'STUDENTS_REST_API_URL', stub.url),
+            mock.patch.object(config, 'POKEMON_SOURCE', 'http'),
+            mock.patch.object(config, 'SNAPSHOT_PATH', os.path.join(tmp_dir, 'pokemon_cache.json')),
+        ]
+        try:
+            with stub, override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['127.0.0.1']):
+                for patch in patches:
+                    patch.start()
+                self.run(stub, options)
+        finally:
+            for patch in patches:
+                patch.stop()
+            transport.clear_cache()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, stub, options):
+        user = User.objects.create_user('benchmark-endpoints', password='!')
+        client = Client()
+        client.force_login(user)
+        session_cookie = client.cookies['sessionid'].value
+
+        if options['asgi']:
+            asgi_app = get_asgi_application()
+            server = None
+            measure = async_to_sync(self.measure_asgi)
+        else:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+            server.set_app(get_wsgi_application())
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            measure = self.measure_wsgi
+
+        self.stdout.write(f'{len(stub.pokemon)} Pokémon, stub con {options["latency"] * 1000:.0f}ms de demora y '
+                          f'{options["error_rate"]:.0%} de errores, {options["clients"]} clientes concurrentes, '
+                          f'{"ASGI" if options["asgi"] else "WSGI"} con vistas {"async" if config.ASYNC_VIEWS else "sync"}')
+        self.stdout.write(f'{"endpoint":>15} {"frío":>9} {"p50":>8} {"p95":>8} {"req/s":>8} {"errores":>8}')
+        try:
+            for name, path in ENDPOINTS:
+                self.reset_caches()
+                # los favoritos se guardan con el catálogo cargado (sus datos salen del cache de transport)
+                cards = services.getCards(transport.get_pokemon(range(1, options['favourites'] + 1)))
+                repositories.add_favourites(user, cards)
+                self.reset_caches()
+
+                if options['asgi']:
+                    cold_status, cold, warm, throughput, errors = measure(asgi_app, session_cookie, path, options)
+                else:
+                    cold_status, cold, warm, throughput, errors = measure(session_cookie, base_url + path, options)
+                warm.sort()
+                p95 = warm[min(len(warm) - 1, int(len(warm) * 0.95))]
+                cold_text = f'{cold * 1000:.0f}ms' + ('' if cold_status == 200 else f' ({cold_status})')
+                self.stdout.write(f'{name:>15} {cold_text:>9} {statistics.median(warm) * 1000:>6.1f}ms '
+                                  f'{p95 * 1000:>6.1f}ms {throughput:>8.0f} {errors:>8}')
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+        self.stdout.write(f'pedidos al stub: {len(stub.requests)}')
+
+    def reset_caches(self):
+        for alias in LOCMEM_CACHES:
+            caches[alias].clear()
+        transport.clear_cache()
+        circuit_breaker.upstream.reset()
+        if os.path.exists(config.SNAPSHOT_PATH):
+            os.remove(config.SNAPSHOT_PATH)
+
+    def measure_wsgi(self, session_cookie, url, options):
+        def new_session():
+            session = requests.Session()
+            session.cookies.set('sessionid', session_cookie)
+            return session
+
+        session = new_session()
+        start = time.perf_counter()
+        cold_status = session.get(url).status_code
+        cold = time.perf_counter() - start
+
+        warm = []
+        for _ in range(options['warm_requests']):
+            start = time.perf_counter()
+            session.get(url)
+            warm.append(time.perf_counter() - start)
+
+        throughput, errors = self.throughput(new_session, url, options['clients'], options['seconds'])
+        return cold_status, cold, warm, throughput, errors
+
+    async def measure_asgi(self, asgi_app, session_cookie, path, options):
+        # un solo cliente httpx alcanza: cada pedido es una tarea del event loop, sin conexiones de por medio
+        asgi_transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=asgi_transport, base_url='http://127.0.0.1', cookies={'sessionid': session_cookie}) as client:
+            start = time.perf_counter()
+            cold_status = (await client.get(path)).status_code
+            cold = time.perf_counter() - start
+
+            warm = []
+            for _ in range(options['warm_requests']):
+                start = time.perf_counter()
+                await client.get(path)
+                warm.append(time.perf_counter() - start)
+
+            counts = [0] * options['clients']
+            errors = [0] * options['clients']
+            deadline = time.monotonic() + options['seconds']
+
+            async def worker(index):
+                while time.monotonic() < deadline:
+                    try:
+                        ok = (await client.get(path)).status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    counts[index] += ok
+                    errors[index] += not ok
+
+            await asyncio.gather(*(worker(index) for index in range(options['clients'])))
+        return cold_status, cold, warm, sum(counts) / options['seconds'], sum(errors)
+
+    def throughput(self, new_session, url, clients, seconds):
+        counts = [0] * clients
+        errors = [0] * clients
+        deadline = time.monotonic() + seconds
+
+        def worker(index):
+            session = new_session()
+            while time.monotonic() < deadline:
+                try:
+                    ok = session.get(url).status_code == 200
+                except requests.exceptions.RequestException:
+                    ok = False
+                counts[index] += ok
+                errors[index] += not ok
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / seconds, sum(errors)
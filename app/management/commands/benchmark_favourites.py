@@ -0,0 +1,94 @@
+# Mide el rendimiento de los favoritos en la base configurada (SQLite por defecto) con miles de usuarios y filas:
+# altas una por una vs. en lote, lectura por usuario y bajas con get+delete vs. un solo DELETE.
+# Los usuarios, favoritos y Pokémon que crea se borran al terminar; los Pokémon usan IDs que no existen en PokeAPI
+# para no pisar el catálogo real.
+# Uso: python manage.py benchmark_favourites --users 2000 --per-user 20
+
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app.layers.persistence import repositories
+from app.layers.utilities.card import Card
+from app.models import Favourite, Pokemon
+
+USERNAME_PREFIX = 'benchmark-favourites-'
+POKEMON_ID_OFFSET = 1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Mide altas, lecturas y bajas de favoritos con muchos usuarios y filas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Cantidad de usuarios.')
+        parser.add_argument('--per-user', type=int, default=20, help='Favoritos por usuario.')
+        parser.add_argument('--sample', type=int, default=300, help='Operaciones medidas una por una.')
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        try:
+            self.run(options['users'], options['per_user'], options['sample'])
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        Pokemon.objects.filter(id__gt=POKEMON_ID_OFFSET).delete()
+
+    def run(self, user_count, per_user, sample):
+        User.objects.bulk_create(User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(user_count))
+        users = list(User.objects.filter(username__startswith=USERNAME_PREFIX))
+
+        # altas: todas en lote (un INSERT por usuario)
+        start = time.perf_counter()
+        for user in users:
+            repositories.add_favourites(user, [make_card(pokemon_id) for pokemon_id in range(1, per_user + 1)])
+        elapsed = time.perf_counter() - start
+        self.report('alta en lote', len(users) * per_user, elapsed, 'filas')
+
+        # altas: una fila por request, como antes (create con su propia transacción)
+        sampled = random.sample(users, min(sample, len(users)))
+        extra = make_card(per_user + 1)
+        repositories.save_pokemon([extra])
+        start = time.perf_counter()
+        for user in sampled:
+            Favourite.objects.create(pokemon_id=extra.id, user=user)
+        self.report('alta de a una', len(sampled), time.perf_counter() - start, 'filas')
+
+        # lectura de los favoritos de un usuario
+        start = time.perf_counter()
+        for user in sampled:
+            repositories.get_all_favourites(user)
+        self.report('lectura por usuario', len(sampled), time.perf_counter() - start, 'consultas')
+
+        with connection.cursor() as cursor:
+            sql, params = Pokemon.objects.filter(favourites__user=users[0]).order_by('favourites__pokemon_id').values('id', 'name').query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            self.stdout.write('  plan: ' + '; '.join(str(row[-1]) for row in cursor.fetchall()))
+
+        # bajas: get + delete (dos consultas) vs. un solo DELETE filtrado por usuario
+        start = time.perf_counter()
+        for user in sampled:
+            Favourite.objects.get(user=user, pokemon_id=extra.id).delete()
+        self.report('baja get+delete', len(sampled), time.perf_counter() - start, 'filas')
+
+        start = time.perf_counter()
+        for user in sampled:
+            repositories.delete_favourite(user, POKEMON_ID_OFFSET + 1)
+        self.report('baja con un DELETE', len(sampled), time.perf_counter() - start, 'filas')
+
+        start = time.perf_counter()
+        deleted = sum(repositories.delete_favourites(user, range(POKEMON_ID_OFFSET + 2, POKEMON_ID_OFFSET + per_user + 1)) for user in sampled)
+        self.report('baja en lote', deleted, time.perf_counter() - start, 'filas')
+
+    def report(self, label, count, elapsed, unit):
+        self.stdout.write(f'{label:>20}: {count} {unit} en {elapsed:.3f}s ({count / elapsed:,.0f} {unit}/s)')
+
+
+def make_card(number):
+    pokemon_id = POKEMON_ID_OFFSET + number
+    return Card(name=f'pokemon-{pokemon_id}', height=10, base=50, weight=100,
+                image=f'https://img.test/{pokemon_id}.png', types=['normal'], id=pokemon_id)
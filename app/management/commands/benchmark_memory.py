@@ -0,0 +1,56 @@
+# Mide con tracemalloc la memoria que ocupa el catálogo completo en un worker: payloads completos de PokeAPI
+# contra payloads recortados (payload.project_payload), y cards con __dict__ contra cards con __slots__.
+# Uso: python manage.py benchmark_memory
+
+import copy
+import json
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from app.layers.transport import transport
+from app.layers.transport.payload import project_payload
+from app.layers.transport.stub_api import make_full_pokemon
+from app.layers.utilities import translator
+
+
+class _UnslottedCard:
+    """Card tal como era antes de __slots__ (un __dict__ por instancia), solo para comparar."""
+
+    def __init__(self, card):
+        for attribute in type(card).__slots__:
+            setattr(self, attribute, getattr(card, attribute))
+
+
+class Command(BaseCommand):
+    help = 'Compara la memoria del catálogo completo con payloads completos/recortados y cards con/sin __slots__.'
+
+    def handle(self, *args, **options):
+        pokemon_ids = transport.get_catalog_ids()
+        # se guardan como JSON y se decodifican dentro de la medición, igual que response.json()
+        responses = [json.dumps(make_full_pokemon(pokemon_id, types=('grass', 'poison'))) for pokemon_id in pokemon_ids]
+
+        _, full_size = measure(lambda: [json.loads(body) for body in responses])
+        projected, projected_size = measure(lambda: [project_payload(json.loads(body)) for body in responses])
+
+        # las dos variantes de card comparten los mismos valores: solo se mide lo que ocupa cada objeto
+        cards = [translator.fromRequestIntoCard(raw) for raw in projected]
+        _, slotted_size = measure(lambda: [copy.copy(card) for card in cards])
+        _, unslotted_size = measure(lambda: [_UnslottedCard(card) for card in cards])
+
+        self.stdout.write(f'{len(pokemon_ids)} Pokémon')
+        self.stdout.write(f'  payloads completos:  {full_size / 1024:10.1f} KiB')
+        self.stdout.write(f'  payloads recortados: {projected_size / 1024:10.1f} KiB ({full_size / projected_size:.0f}x menos)')
+        self.stdout.write(f'  cards con __dict__:  {unslotted_size / 1024:10.1f} KiB')
+        self.stdout.write(f'  cards con __slots__: {slotted_size / 1024:10.1f} KiB')
+
+
+def measure(build):
+    """Devuelve (resultado, bytes que siguen ocupados por el resultado) de build()."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
@@ -0,0 +1,112 @@
+# Prueba de carga de la base SQLite con varios hilos leyendo y escribiendo favoritos a la vez (como varios workers
+# atendiendo requests), comparando la configuración por defecto de SQLite con la de settings.SQLITE_PRAGMAS:
+#   - antes: journal_mode=DELETE, synchronous=FULL, busy_timeout de 5s y una conexión nueva por operación (CONN_MAX_AGE=0).
+#   - ahora: los PRAGMA de settings (WAL, synchronous=NORMAL, busy_timeout) y conexiones persistentes (como con
+#     DB_CONN_MAX_AGE > 0).
+# Usa usuarios y Pokémon propios (mismos prefijos que benchmark_favourites) y los borra al terminar.
+# Uso: python manage.py benchmark_sqlite --threads 8 --seconds 5 --write-ratio 0.2
+
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+
+from app.layers.persistence import repositories
+from app.models import Favourite, Pokemon
+
+from .benchmark_favourites import POKEMON_ID_OFFSET, USERNAME_PREFIX, make_card
+
+POKEMON_COUNT = 50
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full', 'busy_timeout': 5000}
+
+
+class Command(BaseCommand):
+    help = 'Mide lecturas y escrituras concurrentes de favoritos con la configuración por defecto de SQLite y con la ajustada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Hilos concurrentes.')
+        parser.add_argument('--seconds', type=float, default=5, help='Duración de cada corrida.')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Proporción de operaciones que escriben.')
+        parser.add_argument('--users', type=int, default=50, help='Cantidad de usuarios.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('La base configurada no es SQLite; no hay nada que comparar.')
+            return
+
+        self.cleanup()
+        try:
+            User.objects.bulk_create(User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(options['users']))
+            repositories.save_pokemon([make_card(number) for number in range(1, POKEMON_COUNT + 1)])
+            user_ids = list(User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('id', flat=True))
+            connection.close()
+
+            runs = [('antes', DEFAULT_PRAGMAS, False), ('ahora', settings.SQLITE_PRAGMAS, True)]
+            for label, pragmas, persistent in runs:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    stats = self.run(user_ids, options['threads'], options['seconds'], options['write_ratio'], persistent)
+                self.report(label, pragmas, persistent, stats, options['seconds'])
+        finally:
+            connection.close()  # la próxima conexión vuelve a aplicar settings.SQLITE_PRAGMAS (journal_mode queda en el archivo)
+            self.cleanup()
+
+    def cleanup(self):
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        Pokemon.objects.filter(id__gt=POKEMON_ID_OFFSET).delete()
+
+    def run(self, user_ids, thread_count, seconds, write_ratio, persistent):
+        stats = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+        stats_lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def worker():
+            local = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+            try:
+                while time.monotonic() < deadline:
+                    user_id = random.choice(user_ids)
+                    pokemon_id = POKEMON_ID_OFFSET + random.randint(1, POKEMON_COUNT)
+                    write = random.random() < write_ratio
+                    start = time.perf_counter()
+                    try:
+                        if write:
+                            # alta o baja del favorito, una escritura por operación como en las vistas
+                            if not Favourite.objects.filter(user_id=user_id, pokemon_id=pokemon_id).delete()[0]:
+                                Favourite.objects.bulk_create([Favourite(user_id=user_id, pokemon_id=pokemon_id)], ignore_conflicts=True)
+                        else:
+                            list(Pokemon.objects.filter(favourites__user=user_id).order_by('favourites__pokemon_id').values('id', 'name'))
+                    except OperationalError:
+                        local['locked'] += 1
+                        continue
+                    finally:
+                        if not persistent:
+                            connection.close()
+                    local['latencies'].append(time.perf_counter() - start)
+                    local['writes' if write else 'reads'] += 1
+            finally:
+                connection.close()
+                with stats_lock:
+                    for key in ('reads', 'writes', 'locked'):
+                        stats[key] += local[key]
+                    stats['latencies'] += local['latencies']
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
+
+    def report(self, label, pragmas, persistent, stats, seconds):
+        latencies = sorted(stats['latencies']) or [0]
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        total = stats['reads'] + stats['writes']
+        settings_text = ', '.join(f'{name}={value}' for name, value in pragmas.items())
+        self.stdout.write(f'{label} ({settings_text}, conexiones {"persistentes" if persistent else "por operación"}):')
+        self.stdout.write(f'  {total / seconds:,.0f} ops/s ({stats["reads"]} lecturas, {stats["writes"]} escrituras), '
+                          f'p50 {p50:.2f}ms, p99 {p99:.2f}ms, {stats["locked"]} "database is locked"')
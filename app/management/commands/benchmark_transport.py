@@ -0,0 +1,37 @@
+# Compara el tiempo de descarga de todo POKEMON_RANGE con cada motor del transporte, contra un stub local de PokeAPI.
+# Uso: python manage.py benchmark_transport --latency 0.05
+
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from app.config import config
+from app.layers.transport import transport
+from app.layers.transport.stub_api import StubPokeAPI, make_pokemon
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de descarga del catálogo completo con los motores "threads" y "async" contra un stub local.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.05, help='Demora simulada por request, en segundos.')
+        parser.add_argument('--repeat', type=int, default=3, help='Cantidad de corridas por motor.')
+
+    def handle(self, *args, **options):
+        pokemon_ids = transport.get_catalog_ids()
+        stub = StubPokeAPI([make_pokemon(pokemon_id) for pokemon_id in pokemon_ids], latency=options['latency'])
+
+        with stub, mock.patch.object(config, 'STUDENTS_REST_API_URL', stub.url):
+            for engine in ('threads', 'async'):
+                timings = []
+                for _ in range(options['repeat']):
+                    stub.connections.clear()
+                    start = time.perf_counter()
+                    fetched = transport.fetch_many(pokemon_ids, engine)
+                    timings.append(time.perf_counter() - start)
+
+                self.stdout.write(
+                    f'{engine:>8}: {len(fetched)} Pokémon, mejor {min(timings):.3f}s, '
+                    f'peor {max(timings):.3f}s, {len(stub.connections)} conexiones TCP'
+                )
@@ -0,0 +1,21 @@
+# Exporta el catálogo en cache a un mirror local de PokeAPI (ver app/layers/transport/mirror.py), para después
+# arrancar sin red con POKEMON_SOURCE=mirror.
+# Uso: python manage.py export_mirror [ruta]   (carpeta, archivo .zip, base .sqlite3 o 'database' para la tabla del catálogo)
+
+from django.core.management.base import BaseCommand
+
+from app.config import config
+from app.layers.transport import mirror, transport
+
+
+class Command(BaseCommand):
+    help = 'Guarda el catálogo actual (cache, snapshot o API) como mirror local: carpeta, .zip, SQLite o la tabla del catálogo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=config.POKEMON_MIRROR_PATH,
+                            help="Destino; el formato se deduce de la extensión, o 'database' (por defecto config.POKEMON_MIRROR_PATH).")
+
+    def handle(self, *args, **options):
+        target = mirror.open_mirror(options['path'])
+        count = target.write(transport.getAllImages())
+        self.stdout.write(f"{count} Pokémon exportados a {options['path']} ({type(target).__name__})")
@@ -0,0 +1,41 @@
+# Refresca el catálogo de Pokémon desde la API y publica los cambios en el cache compartido y el snapshot.
+# Pensado para cron o un proceso aparte; los workers web ven la versión nueva cuando comparten el cache
+# (POKEMON_CACHE_BACKEND file/db/redis). Con locmem, usar el hilo de refresco (POKEMON_REFRESH_INTERVAL).
+# Después de cada refresco pone al día la tabla del catálogo de la base (los datos que muestran los favoritos).
+# Uso: python manage.py refresh_catalog [--max-age 3600] [--interval 600]
+
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from app.layers.services import services
+from app.layers.transport import transport
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a pedir el catálogo a la API y reemplaza los Pokémon que cambiaron, sin cortar el servicio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=float, default=None,
+                            help='Solo refrescar los Pokémon obtenidos hace más de estos segundos (por defecto, todos).')
+        parser.add_argument('--engine', choices=('threads', 'async'), default=None, help='Motor de descarga.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repetir cada estos segundos en lugar de refrescar una sola vez.')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = transport.refresh_catalog(max_age=options['max_age'], engine=options['engine'])
+            if stats is None:
+                self.stdout.write('Otro proceso ya está refrescando el catálogo.')
+            else:
+                refreshed_at = datetime.fromtimestamp(stats['refreshed_at']).isoformat(timespec='seconds')
+                self.stdout.write(
+                    f"{refreshed_at}: {stats['fetched']}/{stats['requested']} Pokémon obtenidos, "
+                    f"{stats['changed']} cambiaron, {stats['duration']:.2f}s"
+                )
+                self.stdout.write(f"{services.syncPokemonTable()} Pokémon actualizados en la base")
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-18 15:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('app', '0006_alter_favourite_pokemon_id_not_null'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favourite',
+            options={'ordering': ['pokemon_id']},
+        ),
+        migrations.AlterUniqueTogether(
+            name='favourite',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='favourite',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('user', 'pokemon_id'), name='favourite_user_pokemon_uniq'),
+        ),
+    ]
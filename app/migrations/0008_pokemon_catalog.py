@@ -0,0 +1,116 @@
+# Catálogo compartido de Pokémon: los favoritos pasan a ser (usuario, pokemon) y los datos de cada Pokémon se
+# guardan una sola vez en la tabla app_pokemon en lugar de copiarse en cada favorito.
+
+import ast
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_list(types):
+    # los favoritos guardados desde el formulario tienen los tipos como texto: "['grass', 'poison']"
+    if isinstance(types, str):
+        try:
+            types = ast.literal_eval(types)
+        except (ValueError, SyntaxError):
+            types = []
+    return list(types) if isinstance(types, (list, tuple)) else []
+
+
+def fill_catalog(apps, schema_editor):
+    Favourite = apps.get_model('app', 'Favourite')
+    Pokemon = apps.get_model('app', 'Pokemon')
+    catalog = {}
+    # si el mismo Pokémon está en varios favoritos se queda con el guardado más recientemente
+    for favourite in Favourite.objects.order_by('id').iterator():
+        catalog[favourite.pokemon_id] = Pokemon(
+            id=favourite.pokemon_id,
+            name=favourite.name,
+            height=to_int(favourite.height),
+            weight=to_int(favourite.weight),
+            base_experience=favourite.base_experience,
+            types=to_list(favourite.types),
+            image=favourite.image,
+        )
+    Pokemon.objects.bulk_create(catalog.values(), batch_size=500)
+
+
+def restore_favourite_data(apps, schema_editor):
+    Favourite = apps.get_model('app', 'Favourite')
+    for favourite in Favourite.objects.select_related('pokemon').iterator():
+        pokemon = favourite.pokemon
+        Favourite.objects.filter(pk=favourite.pk).update(
+            name=pokemon.name,
+            height='' if pokemon.height is None else str(pokemon.height),
+            weight='' if pokemon.weight is None else str(pokemon.weight),
+            base_experience=pokemon.base_experience,
+            types=pokemon.types,
+            image=pokemon.image,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_favourite_user_pokemon_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pokemon',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('height', models.IntegerField(blank=True, null=True)),
+                ('weight', models.IntegerField(blank=True, null=True)),
+                ('base_experience', models.IntegerField(blank=True, null=True)),
+                ('types', models.JSONField(default=list)),
+                ('image', models.URLField(blank=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(fill_catalog, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='favourite',
+            name='favourite_user_pokemon_uniq',
+        ),
+        # la columna pokemon_id pasa a ser la clave foránea a app_pokemon, con los mismos valores
+        migrations.RenameField(
+            model_name='favourite',
+            old_name='pokemon_id',
+            new_name='pokemon',
+        ),
+        migrations.AlterField(
+            model_name='favourite',
+            name='pokemon',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favourites', to='app.pokemon'),
+        ),
+        # solo al revertir: vuelve a copiar los datos del catálogo en cada favorito
+        migrations.RunPython(migrations.RunPython.noop, restore_favourite_data),
+        # blank=True no cambia el esquema; al revertir permite volver a agregar las columnas con '' en las filas existentes
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(model_name='favourite', name='name', field=models.CharField(blank=True, max_length=200)),
+            migrations.AlterField(model_name='favourite', name='height', field=models.CharField(blank=True, max_length=200)),
+            migrations.AlterField(model_name='favourite', name='weight', field=models.CharField(blank=True, max_length=200)),
+            migrations.AlterField(model_name='favourite', name='image', field=models.URLField(blank=True)),
+        ]),
+        migrations.RemoveField(model_name='favourite', name='name'),
+        migrations.RemoveField(model_name='favourite', name='height'),
+        migrations.RemoveField(model_name='favourite', name='weight'),
+        migrations.RemoveField(model_name='favourite', name='base_experience'),
+        migrations.RemoveField(model_name='favourite', name='types'),
+        migrations.RemoveField(model_name='favourite', name='image'),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('user', 'pokemon'), name='favourite_user_pokemon_uniq'),
+        ),
+    ]
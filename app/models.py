@@ -2,22 +2,65 @@ from django.db import models
 from django.conf import settings
 
 
-class Favourite(models.Model):
-    # Detalles del pokemon.
-    pokemon_id = models.IntegerField() #ID de pokeapi
+class Pokemon(models.Model):
+    # Catálogo compartido: una fila por Pokémon, con los mismos datos que muestra la card. Los favoritos apuntan acá
+    # en lugar de copiar los datos en cada fila; se llena desde el cache de transport (ver mirror.DatabaseMirror).
+    id = models.IntegerField(primary_key=True)  # ID de pokeapi
     name = models.CharField(max_length=200)  # Nombre del personaje
-    height = models.CharField(max_length=200)  # Altura
-    weight = models.CharField(max_length=200)  # Peso
+    height = models.IntegerField(null=True, blank=True)  # Altura
+    weight = models.IntegerField(null=True, blank=True)  # Peso
     base_experience = models.IntegerField(null=True, blank=True)  # Experiencia base
     types = models.JSONField(default=list)  # Lista de tipos (ej: ["grass", "poison"])
-    image = models.URLField()  # URL de la imagen
+    image = models.URLField(blank=True)  # URL de la imagen
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} (ID: {self.id})"
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Fila a partir de un payload (recortado o completo) de PokeAPI."""
+        artwork = (((payload.get('sprites') or {}).get('other') or {}).get('official-artwork') or {}).get('front_default')
+        return cls(
+            id=payload['id'],
+            name=payload.get('name') or '',
+            height=payload.get('height'),
+            weight=payload.get('weight'),
+            base_experience=payload.get('base_experience'),
+            types=[(entry.get('type') or {}).get('name') for entry in payload.get('types') or []],
+            image=artwork or '',
+        )
+
+    def to_payload(self):
+        """Payload recortado (misma estructura que payload.project_payload), para servir el catálogo desde la base."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'height': self.height,
+            'weight': self.weight,
+            'base_experience': self.base_experience,
+            'types': [{'slot': slot, 'type': {'name': name}} for slot, name in enumerate(self.types, start=1)],
+            'sprites': {'other': {'official-artwork': {'front_default': self.image or None}}},
+        }
+
+
+class Favourite(models.Model):
+    # Pokémon guardado (los datos están en el catálogo, no se copian en cada favorito).
+    pokemon = models.ForeignKey(Pokemon, on_delete=models.CASCADE, related_name='favourites')
 
     # Asociamos el favorito con el usuario que lo guarda.
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Sin índice propio: el índice único (user, pokemon) de abajo ya sirve para buscar por usuario.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
 
     class Meta:
-        # Restringe duplicados: un mismo usuario no puede guardar el mismo personaje varias veces.
-        unique_together = (('user', 'pokemon_id'),)
+        # Restringe duplicados: un mismo usuario no puede guardar el mismo personaje varias veces. Es también el índice
+        # compuesto con el que se leen (WHERE user_id = ? ORDER BY pokemon_id, sin ordenar aparte) y se borran los favoritos.
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'pokemon'], name='favourite_user_pokemon_uniq'),
+        ]
+        ordering = ['pokemon_id']
 
     def __str__(self):
-        return f"{self.name} (ID: {self.pokemon_id}) - {self.user.username}"
+        return f"{self.pokemon_id} - {self.user.username}"
@@ -0,0 +1,12 @@
+# filtros de template para las imágenes de PokeAPI. Uso: {% load sprites %} ... <img src="{{ img.image|thumbnail:'card' }}">
+from django import template
+
+from app.layers.services import services
+
+register = template.Library()
+
+
+# reemplaza la URL original por la de la miniatura local (ver services.getThumbnailUrl y views.sprite).
+@register.filter
+def thumbnail(url, size):
+    return services.getThumbnailUrl(url, size)
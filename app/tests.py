@@ -1,3 +1,1328 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches
+from PIL import Image
+import redis
+
+from app import urls
+from app.config import config
+from app.models import Favourite, Pokemon
+from app.layers.services import services
+from app.layers.transport import async_transport, circuit_breaker, images, mirror, refresher, shared_cache, snapshot, transport
+from app.layers.persistence import repositories, sqlite
+from app.layers.transport.payload import project_payload
+from app.layers.transport.stub_api import StubFileServer, StubPokeAPI, make_full_pokemon, make_pokemon
+from app.layers.utilities import metrics, translator
+from app.layers.utilities.card import Card
+from app.layers.utilities.search_index import NameIndex, TypeIndex
+from main import settings as main_settings, urls as main_urls
+
+
+class TransportTestCase(TestCase):
+    """Base: cache vacío, snapshot en un archivo temporal y un rango chico de Pokémon."""
+
+    pokemon_range = (1, 4)
+
+    def setUp(self):
+        caches[config.POKEMON_CACHE_ALIAS].clear()
+        transport.clear_cache()
+        tmp_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.snapshot_path = os.path.join(tmp_dir, 'pokemon_cache.json')
+        patches = [
+            mock.patch.object(config, 'SNAPSHOT_PATH', self.snapshot_path),
+            mock.patch.object(transport, 'POKEMON_RANGE', self.pokemon_range),
+            mock.patch.object(config, 'STREAM_COLD_PAGES', False),  # páginas enteras; el streaming se prueba en StreamingRenderTests
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(transport.clear_cache)
+
+    def fake_api(self, pokemon=None, **options):
+        pokemon = pokemon if pokemon is not None else [make_pokemon(i) for i in range(*self.pokemon_range)]
+        api = StubPokeAPI(pokemon, **options)
+        patch = mock.patch.object(config, 'STUDENTS_REST_API_URL', api.url)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return api
+
+
+def make_favourite(user, pokemon_id, types=('normal',)):
+    pokemon, _ = Pokemon.objects.get_or_create(id=pokemon_id, defaults={
+        'name': f'pokemon-{pokemon_id}', 'height': 10, 'weight': 100, 'types': list(types), 'image': f'https://img.test/{pokemon_id}.png',
+    })
+    return Favourite.objects.create(user=user, pokemon=pokemon)
+
+
+def join_refills():
+    """Espera a que terminen las descargas de transport.iter_pokemon (corren en hilos aparte)."""
+    for thread in threading.enumerate():
+        if thread.name == 'catalog-refill':
+            thread.join(5)
+
+
+def forget_local_cache():
+    """Simula otro worker: vacía solo la copia local del proceso, no el cache compartido."""
+    transport._cache.clear()
+    transport._fetched_at.clear()
+    transport._cache_version = None
+
+
+class SnapshotTests(TransportTestCase):
+
+    def test_cold_start_fetches_and_writes_snapshot(self):
+        with self.fake_api() as api:
+            pokemon = transport.getAllImages()
+
+        self.assertEqual([p['id'] for p in pokemon], [1, 2, 3])
+        self.assertEqual(len(api.requests), 3)
+        self.assertEqual(sorted(snapshot.load_snapshot(self.snapshot_path)), [1, 2, 3])
+
+    def test_cold_start_reads_snapshot_without_calling_api(self):
+        entries = {i: snapshot.make_entry(make_pokemon(i)) for i in range(*self.pokemon_range)}
+        snapshot.save_snapshot(self.snapshot_path, entries)
+
+        with self.fake_api() as api:
+            pokemon = transport.getAllImages()
+
+        self.assertEqual([p['id'] for p in pokemon], [1, 2, 3])
+        self.assertEqual(api.requests, [])
+
+    def test_stale_entries_are_served_and_refreshed_in_background(self):
+        old = time.time() - config.SNAPSHOT_TTL - 1
+        entries = {i: snapshot.make_entry(make_pokemon(i, name='old'), old) for i in range(*self.pokemon_range)}
+        snapshot.save_snapshot(self.snapshot_path, entries)
+
+        with self.fake_api() as api:
+            pokemon = transport.getAllImages()
+            self.assertEqual({p['name'] for p in pokemon}, {'old'})
+            transport._refresh_thread.join(5)
+
+        self.assertEqual(len(api.requests), 3)
+        self.assertEqual(transport.getAllImages()[0]['name'], 'pokemon-1')
+        self.assertFalse(snapshot.is_stale(snapshot.load_snapshot(self.snapshot_path)[1], config.SNAPSHOT_TTL))
+
+    def test_unwritable_snapshot_does_not_break_requests(self):
+        with mock.patch.object(config, 'SNAPSHOT_PATH', os.path.join(self.snapshot_path, 'missing', 'pokemon_cache.json')), self.fake_api():
+            self.assertEqual(self.client.get('/buscar/', {'query': 'pokemon-1'}).status_code, 200)
+            self.assertEqual(len(transport.getAllImages()), 3)
+
+    def test_snapshot_writes_are_batched(self):
+        with mock.patch.object(snapshot, 'save_snapshot', wraps=snapshot.save_snapshot) as save, self.fake_api():
+            transport.get_pokemon([1])
+            transport.get_pokemon([2])
+            transport.get_pokemon([3])
+            self.assertEqual(save.call_count, 1)
+
+            transport._save_pending_snapshot()  # lo que hace el timer al cumplirse config.SNAPSHOT_SAVE_INTERVAL
+            self.assertEqual(save.call_count, 2)
+        self.assertEqual(sorted(snapshot.load_snapshot(self.snapshot_path)), [1, 2, 3])
+
+    def test_empty_or_foreign_snapshot_is_ignored(self):
+        open(self.snapshot_path, 'w').close()
+        self.assertEqual(snapshot.load_snapshot(self.snapshot_path), {})
+
+        with open(self.snapshot_path, 'w') as f:
+            json.dump({'version': snapshot.SNAPSHOT_VERSION + 1, 'entries': {'1': {'data': {}}}}, f)
+        self.assertEqual(snapshot.load_snapshot(self.snapshot_path), {})
+
+
+class SharedCacheTests(TransportTestCase):
+
+    def test_other_worker_reads_shared_cache_without_calling_api(self):
+        with self.fake_api() as api:
+            transport.getAllImages()
+            os.remove(self.snapshot_path)
+            forget_local_cache()
+            pokemon = transport.getAllImages()
+
+        self.assertEqual([p['id'] for p in pokemon], [1, 2, 3])
+        self.assertEqual(len(api.requests), 3)
+
+    def test_new_shared_version_is_picked_up_by_other_workers(self):
+        with self.fake_api():
+            transport.getAllImages()
+        shared_cache.set_entries({1: snapshot.make_entry(make_pokemon(1, name='renamed'))})
+
+        self.assertEqual(transport.getAllImages()[0]['name'], 'renamed')
+
+    def test_only_lock_holder_refills_while_others_wait(self):
+        results = []
+        with self.fake_api() as api, shared_cache.refill_lock(shared_cache.ids_lock_name(range(*self.pokemon_range))) as acquired:
+            self.assertTrue(acquired)
+            waiter = threading.Thread(target=lambda: results.append(transport.getAllImages()))
+            waiter.start()
+            time.sleep(0.2)
+            shared_cache.set_entries({i: snapshot.make_entry(make_pokemon(i)) for i in range(*self.pokemon_range)})
+            waiter.join(5)
+
+        self.assertEqual([p['id'] for p in results[0]], [1, 2, 3])
+        self.assertEqual(api.requests, [])
+
+    def test_cold_fetches_of_other_pokemon_do_not_wait(self):
+        # el lock es por conjunto de IDs: otro proceso llenando el 1 no frena a quien busca el 2 y el 3
+        with self.fake_api() as api, shared_cache.refill_lock(shared_cache.ids_lock_name([1])), \
+                mock.patch.object(shared_cache, 'wait_for_entries', wraps=shared_cache.wait_for_entries) as wait:
+            pokemon = transport.get_pokemon([2, 3])
+
+        self.assertEqual([p['id'] for p in pokemon], [2, 3])
+        self.assertEqual(len(api.requests), 2)
+        wait.assert_not_called()
+
+    def test_redis_backend_is_chosen_with_the_env_switch(self):
+        self.addCleanup(importlib.reload, main_settings)
+        with mock.patch.dict(os.environ, {'POKEMON_CACHE_BACKEND': 'redis', 'POKEMON_CACHE_LOCATION': 'redis://cache.test:6379/1'}):
+            importlib.reload(main_settings)
+
+        self.assertEqual(main_settings.CACHES[config.POKEMON_CACHE_ALIAS]['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(main_settings.CACHES[config.POKEMON_CACHE_ALIAS]['LOCATION'], 'redis://cache.test:6379/1')
+
+    def test_redis_backend(self):
+        # contra un Redis de verdad (POKEMON_CACHE_LOCATION, por defecto redis://127.0.0.1:6379); sin servidor se omite
+        backend = {**main_settings.POKEMON_CACHE_BACKENDS['redis'], 'TIMEOUT': None}
+        with override_settings(CACHES={'default': backend, config.POKEMON_CACHE_ALIAS: backend}):
+            try:
+                caches[config.POKEMON_CACHE_ALIAS].clear()
+            except redis.exceptions.ConnectionError:
+                self.skipTest(f"No hay un servidor Redis en {backend['LOCATION']}")
+            self.addCleanup(caches[config.POKEMON_CACHE_ALIAS].clear)
+            with self.fake_api() as api:
+                transport.getAllImages()
+                forget_local_cache()
+                os.remove(self.snapshot_path)
+                pokemon = transport.getAllImages()
+
+        self.assertEqual(len(pokemon), 3)
+        self.assertEqual(len(api.requests), 3)
+
+    def test_file_based_backend(self):
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location, 'TIMEOUT': None}
+        with override_settings(CACHES={'default': backend, config.POKEMON_CACHE_ALIAS: backend}):
+            with self.fake_api() as api:
+                transport.getAllImages()
+                forget_local_cache()
+                os.remove(self.snapshot_path)
+                pokemon = transport.getAllImages()
+
+        self.assertEqual(len(pokemon), 3)
+        self.assertEqual(len(api.requests), 3)
+
+
+class AsyncTransportTests(TransportTestCase):
+
+    pokemon_range = (1, 31)
+
+    def test_async_engine_fetches_whole_range_over_pooled_connections(self):
+        with self.fake_api(latency=0.01) as api:
+            pokemon = transport.getAllImages(engine='async')
+
+        self.assertEqual([p['id'] for p in pokemon], list(range(1, 31)))
+        self.assertLessEqual(len(api.connections), async_transport.ASYNC_MAX_CONCURRENCY)
+
+    def test_batches_reuse_the_shared_client_connections(self):
+        with self.fake_api() as api:
+            transport.fetch_many([1, 2], 'async')
+            connections = set(api.connections)
+            async_to_sync(async_transport.fetch_all_pokemon)([3, 4])
+            transport.fetch_many([5, 6], 'async')
+
+        self.assertEqual(len(api.requests), 6)
+        self.assertEqual(api.connections, connections)
+
+    def test_transient_errors_are_retried(self):
+        with mock.patch.object(async_transport, 'ASYNC_BACKOFF_BASE', 0), self.fake_api(failures=2) as api:
+            pokemon = async_to_sync(async_transport.fetch_all_pokemon)([1, 2])
+
+        self.assertEqual([p['id'] for p in pokemon], [1, 2])
+        self.assertEqual(len(api.requests), 6)
+
+    def test_async_getAllImages_uses_cache(self):
+        with self.fake_api() as api:
+            first = async_to_sync(async_transport.getAllImages)()
+            second = async_to_sync(async_transport.getAllImages)()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(api.requests), 30)
+
+
+class PaginationTests(TransportTestCase):
+
+    pokemon_range = (1, 61)
+
+    def test_home_page_only_fetches_its_own_pokemon(self):
+        with self.fake_api() as api:
+            response = self.client.get('/home/')
+            self.assertEqual(len(api.requests), config.PAGE_SIZE)
+
+            response = self.client.get('/home/', {'page': 3})
+
+        self.assertEqual(len(api.requests), config.PAGE_SIZE + 12)
+        self.assertEqual([card.id for card in response.context['images']], list(range(49, 61)))
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+
+    def test_search_results_are_paginated_and_keep_the_query(self):
+        with self.fake_api():
+            response = self.client.get('/buscar/', {'query': 'pokemon', 'page': 2})
+
+        self.assertEqual(len(response.context['images']), config.PAGE_SIZE)
+        self.assertEqual(response.context['page_query'], 'query=pokemon')
+        self.assertContains(response, '?query=pokemon&page=3')
+
+
+class StreamingRenderTests(TransportTestCase):
+
+    pokemon_range = (1, 31)
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(config, 'STREAM_COLD_PAGES', True))
+
+    def test_cold_page_is_streamed_in_id_order(self):
+        with self.fake_api():
+            response = self.client.get('/home/')
+            self.assertTrue(response.streaming)
+            self.assertIn('no-store', response['Cache-Control'])  # cuando salen las cabeceras no se sabe si va a estar completa
+            self.assertFalse(response.has_header('ETag'))
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+
+        page = ''.join(chunks)
+        self.assertIn('Buscador de Pokemon', chunks[0])
+        self.assertNotIn('pokemon-1 #1', chunks[0])
+        positions = [page.index(f'pokemon-{i} #{i}') for i in range(1, config.PAGE_SIZE + 1)]
+        self.assertEqual(positions, sorted(positions))
+        self.assertNotIn(f'pokemon-{config.PAGE_SIZE + 1} #', page)
+        self.assertIn('Página 1 de 2', chunks[-1])
+
+        # ya en cache, la página se dibuja de una vez
+        response = self.client.get('/home/')
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.context['images']), config.PAGE_SIZE)
+
+    def test_cards_wait_only_for_the_previous_ones(self):
+        arrived = []
+
+        def iter_pokemon(pokemon_ids):
+            for pokemon_id in (2, 1, 5, 4):  # el 3 no llega nunca
+                arrived.append(pokemon_id)
+                yield project_payload(make_pokemon(pokemon_id))
+
+        with mock.patch.object(transport, 'iter_pokemon', iter_pokemon):
+            cards = services.iterCardsInOrder([1, 2, 3, 4, 5], {4})
+            self.assertEqual(next(cards).id, 1)
+            self.assertEqual(arrived, [2, 1])
+            rest = list(cards)
+
+        self.assertEqual([card.id for card in rest], [2, 4, 5])
+        self.assertEqual([card.is_favourite for card in rest], [False, True, False])
+
+    def test_closed_stream_keeps_what_arrived(self):
+        with self.fake_api():
+            stream = transport.iter_pokemon([1, 2, 3])
+            next(stream)
+            stream.close()
+            join_refills()
+
+        self.assertEqual(sorted(transport._cache), [1, 2, 3])
+        self.assertTrue(snapshot.load_snapshot(self.snapshot_path))
+
+    def test_slow_reader_does_not_hold_the_refill_lock(self):
+        with self.fake_api():
+            stream = transport.iter_pokemon([1, 2, 3])
+            next(stream)  # el cliente no sigue leyendo
+            join_refills()
+            self.assertIsNone(caches[config.POKEMON_CACHE_ALIAS].get(shared_cache.LOCK_PREFIX + shared_cache.ids_lock_name([1, 2, 3])))
+            self.assertEqual(len(list(stream)), 2)
+
+    def test_async_engine_renders_the_whole_page(self):
+        # con el motor async los datos llegan todos juntos: no hay nada que adelantar en streaming
+        with mock.patch.object(config, 'TRANSPORT_ENGINE', 'async'), self.fake_api():
+            response = self.client.get('/home/')
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.context['images']), config.PAGE_SIZE)
+
+
+class NameIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = NameIndex([
+            (25, 'pikachu'), (26, 'raichu'), (172, 'pichu'), (1, 'bulbasaur'),
+            (4, 'charmander'), (5, 'charmeleon'), (6, 'charizard'),
+        ])
+
+    def test_exact_then_prefix_then_substring(self):
+        self.assertEqual(self.index.search('pichu'), [172])
+        self.assertEqual(self.index.search('chu'), [172, 26, 25])
+        self.assertEqual(self.index.search('Char'), [6, 4, 5])
+
+    def test_typos_are_tolerated(self):
+        self.assertEqual(self.index.search('pikahcu'), [25])
+        self.assertEqual(self.index.search('bulbsaur'), [1])
+        self.assertEqual(self.index.search('charizrd'), [6])
+        self.assertEqual(self.index.search('zzzz'), [])
+
+    def test_limit(self):
+        self.assertEqual(self.index.search('char', limit=1), [6])
+
+    def test_complete_prefers_prefixes_and_fills_with_substrings(self):
+        self.assertEqual(self.index.complete('char', 2), [6, 4])
+        self.assertEqual(self.index.complete('Pi', 5), [172, 25])
+        self.assertEqual(self.index.complete('chu', 5), [172, 26, 25])
+        self.assertEqual(self.index.complete('pichu', 5), [172])
+        self.assertEqual(self.index.complete('  ', 5), [])
+
+
+class TypeIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = TypeIndex([
+            (6, ['fire', 'flying']), (4, ['fire']), (7, ['water']), (16, ['normal', 'flying']), (1, ['grass', 'poison']),
+        ])
+
+    def test_boolean_combinations(self):
+        self.assertEqual(self.index.query('fire'), [4, 6])
+        self.assertEqual(self.index.query('Fire AND flying'), [6])
+        self.assertEqual(self.index.query('fire flying'), [6])
+        self.assertEqual(self.index.query('fire OR water'), [4, 6, 7])
+        self.assertEqual(self.index.query('NOT flying'), [1, 4, 7])
+        self.assertEqual(self.index.query('(fire OR water) AND NOT flying'), [4, 7])
+        self.assertEqual(self.index.query('dragon'), [])
+
+    def test_invalid_expressions(self):
+        for expression in ('fire AND', '(fire', 'OR water', 'fire )'):
+            with self.assertRaises(ValueError):
+                self.index.query(expression)
+
+    def test_deeply_nested_expressions_are_rejected(self):
+        for expression in ('(' * 400 + 'fire' + ')' * 400, 'not ' * 1200 + 'fire'):
+            with self.assertRaises(ValueError):
+                self.index.query(expression)
+
+        self.assertEqual(self.index.query('(' * 20 + 'fire' + ')' * 20), [4, 6])
+
+
+class SearchTests(TransportTestCase):
+
+    def test_search_ranks_results_and_rebuilds_index_on_refresh(self):
+        pokemon = [make_pokemon(1, 'pikachu'), make_pokemon(2, 'raichu'), make_pokemon(3, 'bulbasaur')]
+        with self.fake_api(pokemon):
+            response = self.client.get('/buscar/', {'query': 'chu'})
+        self.assertEqual([card.name for card in response.context['images']], ['raichu', 'pikachu'])
+
+        shared_cache.set_entries({3: snapshot.make_entry(make_pokemon(3, 'pichu'))})
+        response = self.client.get('/buscar/', {'query': 'chu'})
+        self.assertEqual([card.name for card in response.context['images']], ['pichu', 'raichu', 'pikachu'])
+
+    def test_warm_index_does_not_walk_the_catalog(self):
+        with self.fake_api():
+            services.getCatalogIndexes()
+
+        metrics.registry.reset()
+        with mock.patch.object(transport, 'getAllImages') as get_all_images:
+            self.assertEqual(services.searchIdsByName('pokemon-2')[0], 2)
+            get_all_images.assert_not_called()
+        self.assertEqual(metrics.registry.get('app_catalog_cache_requests_total', result='hit'), 0)
+
+    def test_incomplete_index_keeps_asking_for_the_missing_pokemon(self):
+        with self.fake_api(failures=1), mock.patch.object(config, 'NEGATIVE_CACHE_TTL', 0):
+            self.assertEqual(services.searchIdsByName('pokemon-3'), [])  # el primer pedido de cada uno falla: índice vacío
+            self.assertEqual(services.searchIdsByName('pokemon-3')[0], 3)
+
+    def test_filter_combines_types_and_name(self):
+        pokemon = [
+            make_pokemon(1, 'charizard', ('fire', 'flying')), make_pokemon(2, 'charmander', ('fire',)),
+            make_pokemon(3, 'pidgey', ('normal', 'flying')),
+        ]
+        with self.fake_api(pokemon):
+            response = self.client.get('/filter_by_type/', {'type': 'flying'})
+            self.assertEqual([card.id for card in response.context['images']], [1, 3])
+
+            response = self.client.get('/filter_by_type/', {'type': 'fire AND NOT flying'})
+            self.assertEqual([card.id for card in response.context['images']], [2])
+
+            response = self.client.get('/filter_by_type/', {'type': 'fire', 'query': 'mander'})
+            self.assertEqual([card.id for card in response.context['images']], [2])
+
+            response = self.client.get('/filter_by_type/', {'type': 'fire AND'})
+            self.assertEqual(list(response.context['images']), [])
+            self.assertContains(response, 'incompleta')
+
+
+class CardCacheTests(TransportTestCase):
+
+    def test_cards_are_translated_once_per_payload(self):
+        with self.fake_api(), mock.patch.object(services.translator, 'fromRequestIntoCard', wraps=services.translator.fromRequestIntoCard) as translate:
+            first = services.getAllImages()
+            second = services.getAllImages()
+            self.assertEqual(translate.call_count, 3)
+            self.assertIs(first[0], second[0])
+
+            shared_cache.set_entries({1: snapshot.make_entry(make_pokemon(1, name='renamed'))})
+            third = services.getAllImages()
+
+        self.assertEqual(translate.call_count, 4)
+        self.assertEqual(third[0].name, 'renamed')
+
+    def test_favourite_overlay_does_not_touch_shared_card(self):
+        with self.fake_api():
+            card = services.getAllImages()[0]
+
+        favourite = services.withFavourite(card, {card.id})
+        self.assertTrue(favourite.is_favourite)
+        self.assertFalse(card.is_favourite)
+        self.assertIs(services.withFavourite(card, set()), card)
+
+    def test_shared_cards_are_read_only(self):
+        with self.fake_api():
+            card = services.getAllImages()[0]
+
+        with self.assertRaises(AttributeError):
+            card.is_favourite = True
+        with self.assertRaises(AttributeError):
+            card.types.append('fire')
+        self.assertEqual(card.replace(name='otro').name, 'otro')
+        self.assertEqual(card.name, 'pokemon-1')
+
+
+class PayloadProjectionTests(TransportTestCase):
+
+    def test_cache_keeps_only_the_fields_the_app_uses(self):
+        full = [make_full_pokemon(i, types=('grass', 'poison')) for i in range(*self.pokemon_range)]
+        with self.fake_api(full):
+            cached = transport.getAllImages()
+
+        self.assertNotIn('moves', cached[0])
+        self.assertEqual(project_payload(cached[0]), cached[0])
+        expected, actual = translator.fromRequestIntoCard(full[0]), translator.fromRequestIntoCard(cached[0])
+        for attribute in ('id', 'name', 'height', 'weight', 'base', 'image', 'types', 'type_images'):
+            self.assertEqual(getattr(actual, attribute), getattr(expected, attribute))
+
+
+class FavouriteQueryTests(TransportTestCase):
+    """Cada vista consulta los favoritos una sola vez: sesión + usuario + favoritos = 3 queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('ash', password='pikachu123')
+        make_favourite(self.user, 2)
+        self.client.force_login(self.user)
+        with self.fake_api():
+            transport.getAllImages()
+
+    def assertFavouritesMarked(self, response):
+        self.assertEqual({card.id for card in response.context['images'] if card.is_favourite}, {2})
+
+    def test_home(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/home/')
+        self.assertFavouritesMarked(response)
+
+    def test_search(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/buscar/', {'query': 'pokemon'})
+        self.assertFavouritesMarked(response)
+
+    def test_filter_by_type(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/filter_by_type/', {'type': 'normal'})
+        self.assertFavouritesMarked(response)
+
+    def test_favourites(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/favourites/')
+        self.assertEqual([card.id for card in response.context['favourite_list']], [2])
+
+
+class FavouriteRepositoryTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ash = User.objects.create_user('ash', password='pikachu123')
+        self.misty = User.objects.create_user('misty', password='starmie123')
+
+    def cards(self, *pokemon_ids):
+        return [Card(name=f'pokemon-{i}', height=10, base=50, weight=100, image=f'https://img.test/{i}.png', types=['normal'], id=i)
+                for i in pokemon_ids]
+
+    def test_bulk_add_is_two_queries_and_ignores_duplicates(self):
+        # un upsert en el catálogo y un INSERT de los favoritos
+        repositories.add_favourites(self.ash, self.cards(3, 1))
+        with self.assertNumQueries(2):
+            repositories.add_favourites(self.ash, self.cards(1, 2))
+
+        self.assertEqual([f['id'] for f in repositories.get_all_favourites(self.ash)], [1, 2, 3])
+
+    def test_pokemon_are_stored_once_and_read_with_one_join(self):
+        repositories.add_favourites(self.ash, self.cards(1, 2))
+        repositories.add_favourites(self.misty, self.cards(2))
+
+        self.assertEqual(Pokemon.objects.count(), 2)
+        with self.assertNumQueries(1):
+            favourites = repositories.get_all_favourites(self.misty)
+        self.assertEqual(favourites, [{'id': 2, 'name': 'pokemon-2', 'height': 10, 'weight': 100, 'base_experience': 50,
+                                       'types': ['normal'], 'image': 'https://img.test/2.png'}])
+
+    def test_deletes_are_one_query_and_scoped_to_the_user(self):
+        repositories.add_favourites(self.ash, self.cards(1, 2, 3))
+        repositories.add_favourites(self.misty, self.cards(1, 2))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(repositories.delete_favourites(self.ash, [1, 2]), 2)
+        self.assertFalse(repositories.delete_favourite(self.ash, 1))
+        self.assertEqual([f['id'] for f in repositories.get_all_favourites(self.misty)], [1, 2])
+
+    def test_delete_view_uses_the_pokemon_id_of_the_logged_in_user(self):
+        # favourites.html manda el pokemon_id de la card, no la clave primaria del favorito
+        repositories.add_favourites(self.misty, self.cards(5))
+        repositories.add_favourites(self.ash, self.cards(7))
+        self.client.force_login(self.ash)
+
+        self.client.post('/favourites/delete/', {'id': Favourite.objects.get(user=self.misty).pk})
+        self.client.post('/favourites/delete/', {'id': 5})
+        self.assertEqual(Favourite.objects.filter(user=self.misty).count(), 1)
+
+        self.client.post('/favourites/delete/', {'id': 7})
+        self.assertFalse(Favourite.objects.filter(user=self.ash).exists())
+
+    def test_bulk_add_view_takes_the_data_from_the_catalog(self):
+        self.client.force_login(self.ash)
+        with self.fake_api():
+            self.client.post('/favourites/add/', {'id': ['1', '3', 'x'], 'name': 'forged'})
+            self.client.post('/favourites/add/', {'id': '2', 'name': 'forged', 'types': "['fire']"})
+
+        self.assertEqual(list(Favourite.objects.values_list('pokemon_id', 'pokemon__name', 'pokemon__types')),
+                         [(1, 'pokemon-1', ['normal']), (2, 'pokemon-2', ['normal']), (3, 'pokemon-3', ['normal'])])
+
+    def test_bulk_add_ignores_ids_outside_the_catalog(self):
+        self.client.force_login(self.ash)
+        with self.fake_api([make_pokemon(i) for i in (1, 99)]) as api:
+            self.client.post('/favourites/add/', {'id': ['1', '99', '100000']})
+
+        self.assertEqual(list(Favourite.objects.values_list('pokemon_id', flat=True)), [1])
+        self.assertEqual([path for path in api.requests if '99' in path or '100000' in path], [])
+        self.assertNotIn(99, transport._cache)
+
+    def test_bulk_requests_are_capped(self):
+        self.client.force_login(self.ash)
+        ids = [str(i) for i in range(1, config.FAVOURITES_MAX_BATCH + 2)]
+        with self.fake_api() as api:
+            self.client.post('/favourites/add/', {'id': ids})
+            self.client.post('/favourites/delete/', {'id': ids})
+            self.assertEqual(api.requests, [])
+            self.assertContains(self.client.get('/home/'), 'como máximo')
+
+        self.assertFalse(Favourite.objects.exists())
+
+    def test_refresh_catalog_updates_the_catalog_table_from_the_api(self):
+        # la migración 0008 llena app_pokemon con los datos que tenían los favoritos; refresh_catalog los pone al día
+        Pokemon.objects.create(id=1, name='ivysaur', image='https://img.test/2.png', types=[])
+        Pokemon.objects.create(id=3, name='', types=[])
+        with self.fake_api():
+            call_command('refresh_catalog', stdout=io.StringIO())
+
+        self.assertEqual(list(Pokemon.objects.values_list('id', 'name')), [(1, 'pokemon-1'), (3, 'pokemon-3')])
+        self.assertNotEqual(Pokemon.objects.get(id=1).image, 'https://img.test/2.png')
+
+
+class SqliteSettingsTests(TestCase):
+
+    def test_pragmas_are_applied_on_every_new_connection(self):
+        new_connection = connections.create_connection('default')
+        self.addCleanup(new_connection.close)
+        # la base de tests es en memoria (sin WAL); el resto de los PRAGMA sí se aplican
+        self.assertEqual(sqlite.get_pragmas(new_connection, ['synchronous', 'busy_timeout', 'temp_store']),
+                         {'synchronous': 1, 'busy_timeout': 20000, 'temp_store': 2})
+
+    def reload_settings(self, **env):
+        self.addCleanup(importlib.reload, main_settings)
+        with mock.patch.dict(os.environ, env):
+            for name in ('DB_CONN_MAX_AGE', 'POKEMON_ASYNC_VIEWS'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            return importlib.reload(main_settings).DATABASES['default']
+
+    def test_persistent_connections_are_opt_in(self):
+        self.assertEqual(self.reload_settings()['CONN_MAX_AGE'], 0)
+        database = self.reload_settings(DB_CONN_MAX_AGE='60')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+    def test_async_views_never_keep_persistent_connections(self):
+        self.assertEqual(self.reload_settings(DB_CONN_MAX_AGE='60', POKEMON_ASYNC_VIEWS='1')['CONN_MAX_AGE'], 0)
+
+
+class MetricsTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+        self.enterContext(self.fake_api())
+
+    def test_server_timing_splits_the_request_by_layer(self):
+        user = User.objects.create_user('ash', password='pikachu123')
+        self.client.force_login(user)
+
+        header = self.client.get('/home/')['Server-Timing']
+        layers = [part.split(';')[0] for part in header.split(', ')]
+
+        for layer in ('transport', 'translate', 'repository', 'render', 'db', 'total'):
+            self.assertIn(layer, layers)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/home/')
+        self.client.get('/home/')
+        self.client.force_login(User.objects.create_user('oak', password='pallet123', is_staff=True))
+        text = self.client.get('/metrics').content.decode()
+
+        self.assertIn('app_catalog_cache_requests_total{result="miss"} 3', text)
+        self.assertIn('app_catalog_cache_requests_total{result="hit"} 3', text)
+        self.assertIn('app_upstream_requests_total{engine="threads",result="200"} 3', text)
+        self.assertIn('app_upstream_request_duration_seconds_count{engine="threads"} 3', text)
+        self.assertIn('app_http_requests_total{status="200",view="home"} 2', text)
+        self.assertIn('app_db_queries_total', text)
+        self.assertIn('app_catalog_cache_size 3', text)
+
+    def test_metrics_are_only_for_staff_or_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)  # sin token configurado
+
+        with mock.patch.object(config, 'METRICS_TOKEN', 's3cret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+        self.client.force_login(User.objects.create_user('ash', password='pikachu123'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        registry.declare('latency_seconds', 'histogram', 'Latencia.', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            registry.observe('latency_seconds', value, engine='threads')
+
+        self.assertEqual(registry.render().splitlines()[2:], [
+            'latency_seconds_bucket{engine="threads",le="0.1"} 1',
+            'latency_seconds_bucket{engine="threads",le="1"} 2',
+            'latency_seconds_bucket{engine="threads",le="+Inf"} 3',
+            'latency_seconds_sum{engine="threads"} 5.55',
+            'latency_seconds_count{engine="threads"} 3',
+        ])
+
+
+class PerformanceBudgetTests(TransportTestCase):
+    """
+    Presupuestos de los caminos calientes: cantidad de consultas y tiempo (mediana de varios pedidos con el cache
+    caliente) con el catálogo completo. Fallan si un cambio agrega consultas o hace notablemente más lenta una vista.
+    Los tiempos dependen de la máquina, así que solo se miden si se pide con la variable de entorno PERF_BUDGET_SCALE
+    (1 = el presupuesto tal cual; en máquinas lentas, ej. 3).
+    """
+
+    pokemon_range = (1, config.POKEMON_CATALOG_SIZE + 1)
+    # ruta -> (consultas, segundos); las consultas son sesión + usuario + favoritos
+    budgets = {
+        '/home/': (3, 0.05),
+        '/buscar/?query=pokemon-1': (3, 0.1),
+        '/filter_by_type/?type=fire': (3, 0.05),
+        '/favourites/': (3, 0.05),
+        '/api/pokemon/?limit=50': (3, 0.03),
+        '/api/favourites/': (3, 0.03),
+    }
+    samples = 5
+
+    def setUp(self):
+        super().setUp()
+        types = ('grass', 'fire', 'water', 'normal')
+        self.api = self.enterContext(self.fake_api([make_pokemon(i, types=(types[i % len(types)],)) for i in range(*self.pokemon_range)]))
+        self.user = User.objects.create_user('ash', password='pikachu123')
+        repositories.add_favourites(self.user, services.getCards(transport.get_pokemon(range(1, 21))))
+        self.client.force_login(self.user)
+
+    def test_cold_home_only_fetches_one_page(self):
+        transport.clear_cache()
+        caches[config.POKEMON_CACHE_ALIAS].clear()
+        os.remove(self.snapshot_path)
+        self.api.requests.clear()
+
+        self.assertEqual(self.client.get('/home/').status_code, 200)
+        self.assertLessEqual(len(self.api.requests), config.PAGE_SIZE)
+
+    def test_hot_paths_stay_within_query_budget(self):
+        for path, (max_queries, _) in self.budgets.items():
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 200)  # calienta caches e índices
+                with self.assertNumQueries(max_queries):
+                    self.client.get(path)
+
+    @skipUnless(os.environ.get('PERF_BUDGET_SCALE'), 'tiempos solo con PERF_BUDGET_SCALE')
+    def test_hot_paths_stay_within_time_budget(self):
+        scale = float(os.environ['PERF_BUDGET_SCALE'])
+        for path, (_, max_seconds) in self.budgets.items():
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 200)  # calienta caches e índices
+                timings = []
+                for _ in range(self.samples):
+                    start = time.perf_counter()
+                    self.client.get(path)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                median = timings[len(timings) // 2]
+                self.assertLess(median, max_seconds * scale, f'{path}: mediana de {median * 1000:.1f}ms')
+
+
+class AsyncViewTests(TransportTestCase):
+    """Las variantes async de las vistas (config.ASYNC_VIEWS) responden lo mismo, con las mismas consultas."""
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.reload_urls)  # los cleanups corren al revés: para entonces config.ASYNC_VIEWS ya volvió a su valor
+        self.enterContext(mock.patch.object(config, 'ASYNC_VIEWS', True))
+        self.reload_urls()
+        self.enterContext(self.fake_api([make_pokemon(i, types=('fire',) if i % 2 else ('water',)) for i in range(*self.pokemon_range)]))
+        self.user = User.objects.create_user('ash', password='pikachu123')
+        make_favourite(self.user, 2, types=('water',))
+
+    def reload_urls(self):
+        # main.urls guarda el include de app.urls con sus patrones ya leídos: hay que recargar los dos
+        importlib.reload(urls)
+        importlib.reload(main_urls)
+        clear_url_caches()
+
+    def test_catalog_views_are_async(self):
+        match = self.client.get('/home/').resolver_match
+        self.assertTrue(asyncio.iscoroutinefunction(match.func))
+
+    def test_pages_mark_favourites_with_the_same_queries(self):
+        self.client.force_login(self.user)
+        for path in ('/home/', '/buscar/?query=pokemon', '/filter_by_type/?type=water'):
+            with self.subTest(path=path), self.assertNumQueries(3):
+                response = self.client.get(path)
+            self.assertEqual({card.id for card in response.context['images'] if card.is_favourite}, {2})
+
+        response = self.client.get('/favourites/')
+        self.assertEqual([card.id for card in response.context['favourite_list']], [2])
+
+    def test_anonymous_catalog_is_cacheable(self):
+        self.client.get('/home/')  # el primer request carga el catálogo (y cambia su versión)
+        response = self.client.get('/home/')
+        self.assertIn('public', response['Cache-Control'])
+
+        self.assertEqual(self.client.get('/home/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/favourites/').status_code, 302)
+
+    def test_incomplete_pages_are_not_cached(self):
+        transport.clear_cache()
+        transport._failed_until[2] = time.monotonic() + 60
+        response = self.client.get('/home/')
+
+        self.assertNotIn(2, [card.id for card in response.context['images']])
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+
+    async def test_cold_page_is_streamed(self):
+        await sync_to_async(transport.clear_cache)()
+        with mock.patch.object(config, 'STREAM_COLD_PAGES', True):
+            response = await self.async_client.get('/home/')
+            page = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual([page.index(f'pokemon-{i} #{i}') for i in range(1, 4)], sorted(page.index(f'pokemon-{i} #{i}') for i in range(1, 4)))
+
+    async def test_add_and_delete_favourites(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+        await self.async_client.post('/favourites/add/', {'id': ['1', '3']})
+        await self.async_client.post('/favourites/delete/', {'id': '2'})
+
+        pokemon_ids = [favourite.pokemon_id async for favourite in Favourite.objects.filter(user=self.user)]
+        self.assertEqual(pokemon_ids, [1, 3])
+        self.assertEqual(await Pokemon.objects.filter(id=3).values_list('name', flat=True).aget(), 'pokemon-3')
+
+
+class HttpCachingTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.fake_api():
+            transport.getAllImages()
+
+    def test_anonymous_pages_are_revalidated_with_304(self):
+        for url, params in (('/home/', {}), ('/buscar/', {'query': 'pokemon'}), ('/filter_by_type/', {'type': 'normal'})):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn('Cookie', response['Vary'])
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            repeated = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repeated.status_code, 304)
+
+    def test_catalog_refresh_changes_the_etag(self):
+        etag = self.client.get('/home/')['ETag']
+        shared_cache.set_entries({1: snapshot.make_entry(make_pokemon(1, name='renamed'))})
+
+        response = self.client.get('/home/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_logged_in_pages_are_private(self):
+        self.client.force_login(User.objects.create_user('misty', password='starmie123'))
+        response = self.client.get('/home/')
+
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('private', response['Cache-Control'])
+
+
+class FragmentCacheTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        caches['template_fragments'].clear()
+        with self.fake_api():
+            transport.getAllImages()
+
+    def test_cards_are_rendered_once_per_catalog_version(self):
+        self.client.get('/home/')
+        # con el fragmento en cache, cambiar la card ya traducida (es de solo lectura: se fuerza) no cambia el HTML...
+        object.__setattr__(services.getCards(transport.getAllImages())[0], 'name', 'cambiado')
+        self.assertNotContains(self.client.get('/home/'), 'cambiado')
+
+        # ...hasta que cambia la versión del catálogo
+        shared_cache.set_entries({1: snapshot.make_entry(make_pokemon(1, name='renamed'))})
+        self.assertContains(self.client.get('/home/'), 'renamed #1')
+
+    def test_favourite_button_is_rendered_per_user(self):
+        self.client.get('/home/')
+        user = User.objects.create_user('misty', password='starmie123')
+        make_favourite(user, 1)
+        self.client.force_login(user)
+
+        response = self.client.get('/home/')
+        self.assertContains(response, '✔️ Favorito<', count=1)
+        self.assertContains(response, '❤️ Agregar', count=2)
+
+
+class ApiTests(TransportTestCase):
+
+    pokemon_range = (1, 6)
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(self.fake_api([make_pokemon(i, types=('fire',) if i % 2 else ('water',)) for i in range(*self.pokemon_range)]))
+
+    def test_cursor_pagination_walks_the_whole_catalog(self):
+        ids, url = [], '/api/pokemon/?limit=2'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 2)
+            ids += [pokemon['id'] for pokemon in data['results']]
+            url = data['next']
+
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_cursor_keeps_the_type_filter(self):
+        first = self.client.get('/api/pokemon/', {'type': 'fire', 'limit': 2, 'fields': 'id'}).json()
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual(first['results'] + second['results'], [{'id': 1}, {'id': 3}, {'id': 5}])
+        self.assertIsNone(second['next'])
+
+    def test_deeply_nested_type_filter_is_a_bad_request(self):
+        for expression in ('(' * 400 + 'fire' + ')' * 400, 'not ' * 1200 + 'fire'):
+            self.assertEqual(self.client.get('/api/pokemon/', {'type': expression}).status_code, 400)
+            self.assertContains(self.client.get('/filter_by_type/', {'type': expression}), 'demasiado larga')
+
+    def test_fields_selection(self):
+        data = self.client.get('/api/pokemon/2/', {'fields': 'name,types'}).json()
+        self.assertEqual(data, {'name': 'pokemon-2', 'types': ['water']})
+
+        self.assertEqual(self.client.get('/api/pokemon/2/', {'fields': 'name,password'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/pokemon/', {'cursor': '!!'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/pokemon/99/').status_code, 404)
+
+    def test_single_pokemon_does_not_list_the_catalog(self):
+        with mock.patch.object(transport, 'get_catalog_ids', side_effect=AssertionError('lista el catálogo entero')):
+            self.assertEqual(self.client.get('/api/pokemon/2/').json()['id'], 2)
+            self.assertEqual(self.client.get('/api/pokemon/99/').status_code, 404)
+
+    def test_errors_are_not_cached_and_do_not_leak_exception_text(self):
+        responses = [
+            self.client.get('/api/pokemon/', {'limit': 'abc'}),
+            self.client.get('/api/pokemon/', {'limit': '0'}),
+            self.client.get('/api/pokemon/2/', {'fields': 'password'}),
+            self.client.get('/api/pokemon/99/'),
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [400, 400, 400, 404])
+        self.assertEqual(responses[0].json(), {'error': 'limit debe ser un número'})
+        for response in responses:
+            self.assertIn('no-store', response['Cache-Control'])
+            self.assertNotIn('public', response['Cache-Control'])
+            self.assertFalse(response.has_header('ETag'))
+            self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_stream_returns_the_full_catalog(self):
+        response = self.client.get('/api/pokemon/', {'stream': 1, 'fields': 'id,name'})
+
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([pokemon['id'] for pokemon in data], [1, 2, 3, 4, 5])
+
+    def test_autocomplete_returns_compact_suggestions(self):
+        transport.getAllImages()
+        response = self.client.get('/api/autocomplete/', {'q': 'Pokemon-', 'limit': 2})
+
+        self.assertEqual(response.content, b'[{"id":1,"name":"pokemon-1","image":"https://img.test/1.png"},'
+                                           b'{"id":2,"name":"pokemon-2","image":"https://img.test/2.png"}]')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertFalse(response.has_header('Vary'))  # no depende de la sesión: un proxy la puede compartir
+        self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'Pokemon-', 'limit': 2}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'zzz'}).json(), [])
+        self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'p', 'limit': 'x'}).status_code, 400)
+
+    def test_autocomplete_errors_are_not_cached(self):
+        transport.getAllImages()
+        response = self.client.get('/api/autocomplete/', {'q': 'p', 'limit': 'x'})
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+        # el limit se valida antes que las precondiciones: un request inválido nunca es un 304
+        response = self.client.get('/api/autocomplete/', {'q': 'p', 'limit': '0'}, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 400)
+
+    def test_autocomplete_responses_are_cached_per_catalog_version(self):
+        transport.getAllImages()
+        with mock.patch.object(services, 'buildSuggestions', wraps=services.buildSuggestions) as build:
+            for query in ('pokemon-3', 'Pokemon-3 '):  # la misma búsqueda, normalizada
+                self.assertEqual(self.client.get('/api/autocomplete/', {'q': query}).json()[0]['id'], 3)
+            self.assertEqual(build.call_count, 1)
+
+            shared_cache.set_entries({3: snapshot.make_entry(make_pokemon(3, name='renamed'))})
+            self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'pokemon-3'}).json(), [])
+            self.assertEqual(build.call_count, 2)
+
+    def test_favourites_require_login(self):
+        self.assertEqual(self.client.get('/api/favourites/').status_code, 401)
+
+        user = User.objects.create_user('misty', password='starmie123')
+        make_favourite(user, 2, types=('water',))
+        self.client.force_login(user)
+
+        self.assertEqual(self.client.get('/api/favourites/', {'fields': 'id,name'}).json(), {'results': [{'id': 2, 'name': 'pokemon-2'}]})
+        self.assertTrue(self.client.get('/api/pokemon/2/', {'fields': 'is_favourite'}).json()['is_favourite'])
+
+
+class RefreshTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.fake_api():
+            transport.getAllImages()
+
+    def test_only_changed_pokemon_are_swapped_in(self):
+        before = transport.get_pokemon([1, 2, 3])
+        version = transport.get_catalog_version()
+
+        with self.fake_api([make_pokemon(1), make_pokemon(2, name='renamed'), make_pokemon(3)]):
+            stats = transport.refresh_catalog()
+
+        after = transport.get_pokemon([1, 2, 3])
+        self.assertEqual((stats['fetched'], stats['changed']), (3, 1))
+        self.assertIs(after[0], before[0])
+        self.assertEqual(after[1]['name'], 'renamed')
+        self.assertNotEqual(transport.get_catalog_version(), version)
+
+    def test_refresh_without_changes_keeps_the_catalog_version(self):
+        version = transport.get_catalog_version()
+        with self.fake_api():
+            stats = transport.refresh_catalog()
+
+        self.assertEqual(stats['changed'], 0)
+        self.assertEqual(transport.get_catalog_version(), version)
+        self.assertGreaterEqual(transport.get_last_modified(), stats['refreshed_at'])
+
+    def test_requests_serve_the_previous_catalog_while_refreshing(self):
+        with self.fake_api([make_pokemon(i, name='new') for i in range(*self.pokemon_range)], latency=0.3):
+            refresh = threading.Thread(target=transport.refresh_catalog)
+            refresh.start()
+            start = time.perf_counter()
+            during = transport.getAllImages()
+            elapsed = time.perf_counter() - start
+            refresh.join()
+
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual({p['name'] for p in during}, {'pokemon-1', 'pokemon-2', 'pokemon-3'})
+        self.assertEqual({p['name'] for p in transport.getAllImages()}, {'new'})
+
+    def test_scheduler_thread_refreshes_periodically(self):
+        with self.fake_api([make_pokemon(i, name='new') for i in range(*self.pokemon_range)]):
+            refresher.start(interval=0.05)
+            self.addCleanup(refresher.stop)
+            deadline = time.monotonic() + 5
+            while not (transport.get_refresh_stats() or {}).get('changed') and time.monotonic() < deadline:
+                time.sleep(0.05)
+            refresher.stop()
+
+        self.assertEqual({p['name'] for p in transport.getAllImages()}, {'new'})
+
+    def test_status_exposes_last_refresh(self):
+        self.assertIsNone(self.client.get('/api/status/').json()['last_refresh'])
+        with self.fake_api():
+            transport.refresh_catalog()
+
+        status = self.client.get('/api/status/').json()
+        self.assertEqual(status['size'], 3)
+        self.assertIsNotNone(status['last_refresh'])
+        self.assertGreaterEqual(status['refresh_duration'], 0)
+
+
+class ConditionalRequestTests(TransportTestCase):
+
+    def full_api(self, **options):
+        return self.fake_api([make_full_pokemon(i) for i in range(*self.pokemon_range)], **options)
+
+    def test_unchanged_pokemon_are_answered_with_304(self):
+        for engine in ('threads', 'async'):
+            with self.subTest(engine=engine):
+                transport.clear_cache()
+                with self.full_api() as api:
+                    before = transport.getAllImages(engine)
+                    first_download = api.bytes_sent
+                    stats = transport.refresh_catalog(engine=engine)
+
+                self.assertEqual((stats['not_modified'], stats['changed']), (3, 0))
+                self.assertEqual(api.bytes_sent, first_download)
+                self.assertTrue(all(a is b for a, b in zip(before, transport.getAllImages(engine))))
+
+    def test_changed_pokemon_are_downloaded_again(self):
+        with self.full_api():
+            transport.getAllImages()
+
+        with self.fake_api([make_full_pokemon(1, name='renamed'), make_full_pokemon(2), make_full_pokemon(3)]) as api:
+            stats = transport.refresh_catalog()
+
+        self.assertEqual((api.not_modified, stats['changed']), (2, 1))
+        self.assertEqual(transport.get_pokemon([1])[0]['name'], 'renamed')
+
+    def test_validators_survive_a_restart_through_the_snapshot(self):
+        with self.full_api():
+            transport.getAllImages()
+        self.assertIn('etag', snapshot.load_snapshot(self.snapshot_path)[1])
+
+        caches[config.POKEMON_CACHE_ALIAS].clear()
+        transport.clear_cache()
+        with self.full_api() as api:
+            transport.getAllImages()
+            stats = transport.refresh_catalog()
+
+        self.assertEqual(stats['not_modified'], 3)
+        self.assertEqual(api.bytes_sent, 0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.breaker = circuit_breaker.CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: self.now)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_a_single_probe_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now = 10
+
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+        self.now = 20
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+
+class DegradedUpstreamTests(TransportTestCase):
+
+    pokemon_range = (1, 41)
+
+    def test_open_circuit_fails_fast_and_failed_ids_are_not_retried_until_later(self):
+        for engine in ('threads', 'async'):
+            with self.subTest(engine=engine):
+                transport.clear_cache()
+                with mock.patch.object(async_transport, 'ASYNC_BACKOFF_BASE', 0), self.fake_api(failures=100) as api:
+                    self.assertEqual(transport.getAllImages(engine), [])
+                    self.assertEqual(transport.get_upstream_state(), 'open')
+                    # los que salieron antes de que se abriera: los que ya estaban en curso más, como mucho, uno por
+                    # cada falla anterior a la que lo abrió (cada falla libera un turno)
+                    max_requests = async_transport.ASYNC_MAX_CONCURRENCY + config.CIRCUIT_FAILURE_THRESHOLD - 1
+                    self.assertLessEqual(len(api.requests), max_requests)
+
+                    requests_made = len(api.requests)
+                    transport.getAllImages(engine)
+                    self.assertEqual(len(api.requests), requests_made)
+
+    def test_failed_ids_are_retried_after_the_negative_cache_expires(self):
+        with self.fake_api(make_pokemon(i) for i in range(1, 40)) as api:
+            self.assertEqual(len(transport.getAllImages()), 39)
+            transport.getAllImages()
+            self.assertEqual(len(api.requests), 40)
+
+            transport._failed_until[40] = time.monotonic() - 1
+            transport.getAllImages()
+            self.assertEqual(len(api.requests), 41)
+
+    def test_bulk_fetch_deadline(self):
+        for engine in ('threads', 'async'):
+            with self.subTest(engine=engine):
+                transport.clear_cache()
+                # ninguna respuesta llega antes de 2s: terminar antes solo puede ser por el plazo (el margen es para
+                # máquinas cargadas)
+                with self.fake_api(latency=2):
+                    start = time.perf_counter()
+                    pokemon = transport.fetch_many(transport.get_catalog_ids(), engine, deadline=0.2)
+                    elapsed = time.perf_counter() - start
+
+                self.assertLess(elapsed, 1.5)
+                self.assertEqual(pokemon, [])
+
+    def test_deadline_only_counts_requests_in_flight_as_failures(self):
+        # con 2 pedidos a la vez, los otros 38 siguen esperando turno cuando vence el plazo: no son fallas de la API
+        with mock.patch.object(async_transport, 'ASYNC_MAX_CONCURRENCY', 2), self.fake_api(latency=2):
+            transport.fetch_many(transport.get_catalog_ids(), 'async', deadline=0.2)
+
+        self.assertEqual(circuit_breaker.upstream._failures, 2)
+        self.assertEqual(transport.get_upstream_state(), 'closed')
+
+    def test_incomplete_pages_are_not_cached(self):
+        transport._failed_until[2] = time.monotonic() + 60  # falló hace poco: la página sale sin el 2
+        with self.fake_api():
+            response = self.client.get('/home/')
+        self.assertNotIn(2, [card.id for card in response.context['images']])
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+
+        transport._failed_until.clear()
+        with self.fake_api():
+            response = self.client.get('/home/')
+        self.assertIn(2, [card.id for card in response.context['images']])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+
+
+class MirrorTests(TransportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = self.enterContext(tempfile.TemporaryDirectory())
+
+    def export(self, name):
+        path = name if name == mirror.DATABASE else os.path.join(self.tmp_dir, name)
+        with self.fake_api([make_full_pokemon(i) for i in range(*self.pokemon_range)]):
+            call_command('export_mirror', path, stdout=io.StringIO())
+        return path
+
+    def test_exported_mirror_serves_the_catalog_without_network(self):
+        for name in ('mirror', 'mirror.zip', 'mirror.sqlite3', mirror.DATABASE):
+            with self.subTest(name=name):
+                transport.clear_cache()
+                path = self.export(name)
+                expected = transport.getAllImages()
+
+                caches[config.POKEMON_CACHE_ALIAS].clear()
+                transport.clear_cache()
+                os.remove(self.snapshot_path)
+                with mock.patch.object(config, 'POKEMON_SOURCE', 'mirror'), mock.patch.object(config, 'POKEMON_MIRROR_PATH', path), \
+                        self.fake_api() as api:
+                    self.assertEqual(transport.getAllImages(), expected)
+                self.assertEqual(api.requests, [])
+
+    def test_directory_in_pokeapi_layout(self):
+        for pokemon_id in (1, 2):
+            os.makedirs(os.path.join(self.tmp_dir, str(pokemon_id)))
+            with open(os.path.join(self.tmp_dir, str(pokemon_id), 'index.json'), 'w') as pokemon_file:
+                json.dump(make_full_pokemon(pokemon_id), pokemon_file)
+
+        pokemon = mirror.open_mirror(self.tmp_dir).fetch([1, 2, 3])
+        self.assertEqual(pokemon, [project_payload(make_full_pokemon(1)), project_payload(make_full_pokemon(2))])
+
+
+def make_png(size):
+    output = io.BytesIO()
+    Image.new('RGBA', (size, size), (200, 40, 40, 255)).save(output, 'PNG')
+    return output.getvalue()
+
+
+class ImageProxyTests(TestCase):
+
+    def setUp(self):
+        self.origin = self.enterContext(StubFileServer({'pokemon/other/official-artwork/1.png': make_png(475)}))
+        for patch in (mock.patch.object(config, 'SPRITES_BASE_URL', self.origin.url),
+                      mock.patch.object(config, 'IMAGE_CACHE_DIR', self.enterContext(tempfile.TemporaryDirectory()))):
+            self.enterContext(patch)
+        self.addCleanup(images.clear_missing)
+
+    def test_thumbnail_is_generated_once_and_cached_forever(self):
+        url = services.getThumbnailUrl(self.origin.url + 'pokemon/other/official-artwork/1.png', 'card')
+        self.assertEqual(url, '/sprites/card/pokemon/other/official-artwork/1.png')
+
+        first = self.client.get(url)
+        second = self.client.get(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], images.THUMBNAIL_CONTENT_TYPE)
+        self.assertIn('immutable', first['Cache-Control'])
+        body = b''.join(first.streaming_content)
+        self.assertLess(len(body), len(make_png(475)))
+        self.assertEqual(b''.join(second.streaming_content), body)
+        self.assertEqual(len(self.origin.requests), 1)
+
+    def test_thumbnail_is_served_even_if_it_cannot_be_written(self):
+        with mock.patch.object(images.os, 'replace', side_effect=OSError('No space left on device')):
+            response = self.client.get('/sprites/card/pokemon/other/official-artwork/1.png')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), len(make_png(475)))
+        self.assertEqual(os.listdir(os.path.join(config.IMAGE_CACHE_DIR, 'card')), [])  # sin temporales sueltos
+
+    def test_missing_sprites_are_not_requested_again_for_a_while(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/sprites/card/pokemon/missing.png').status_code, 404)
+        self.assertEqual(len(self.origin.requests), 1)
+
+        with mock.patch.object(config, 'IMAGE_MISSING_TTL', 0):
+            images.clear_missing()
+            self.client.get('/sprites/icon/pokemon/missing.png')
+            self.client.get('/sprites/icon/pokemon/missing.png')
+        self.assertEqual(len(self.origin.requests), 3)
+
+    def test_only_known_sizes_and_origin_paths_are_proxied(self):
+        self.assertEqual(services.getThumbnailUrl('https://img.test/1.png', 'card'), 'https://img.test/1.png')
+        for url in ('/sprites/huge/pokemon/other/official-artwork/1.png', '/sprites/card/pokemon/../../secret.png',
+                    '/sprites/card/pokemon/missing.png'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
@@ -1,19 +1,33 @@
 from django.contrib import admin
 from django.urls import path
 from . import views
+from .config import config
+
+# vista sync o su variante async, según config.ASYNC_VIEWS
+def pick(sync_view, async_view):
+    return async_view if config.ASYNC_VIEWS else sync_view
 
 urlpatterns = [
     path('', views.index_page, name='index-page'),
     path('login/', views.index_page, name='login'),
     path('register/', views.register, name='register'),
-    path('home/', views.home, name='home'),
+    path('home/', pick(views.home, views.home_async), name='home'),
     
-    path('buscar/', views.search, name='buscar'),
-    path('filter_by_type/', views.filter_by_type, name='filter_by_type'),
+    path('buscar/', pick(views.search, views.search_async), name='buscar'),
+    path('filter_by_type/', pick(views.filter_by_type, views.filter_by_type_async), name='filter_by_type'),
+
+    path('favourites/', pick(views.getAllFavouritesByUser, views.getAllFavouritesByUserAsync), name='favoritos'),
+    path('favourites/add/', pick(views.saveFavourite, views.saveFavouriteAsync), name='agregar-favorito'),
+    path('favourites/delete/', pick(views.deleteFavourite, views.deleteFavouriteAsync), name='borrar-favorito'),
+
+    path('api/pokemon/', views.api_pokemon_list, name='api-pokemon'),
+    path('api/pokemon/<int:pokemon_id>/', views.api_pokemon_detail, name='api-pokemon-detail'),
+    path('api/favourites/', views.api_favourites, name='api-favoritos'),
+    path('api/status/', views.api_catalog_status, name='api-status'),
+    path('api/autocomplete/', views.api_autocomplete, name='api-autocomplete'),
 
-    path('favourites/', views.getAllFavouritesByUser, name='favoritos'),
-    path('favourites/add/', views.saveFavourite, name='agregar-favorito'),
-    path('favourites/delete/', views.deleteFavourite, name='borrar-favorito'),
+    path('sprites/<str:size>/<path:path>', views.sprite, name='sprite'),
+    path('metrics', views.metrics_view, name='metrics'),
 
     path('exit/', views.exit, name='exit'),
 ]
\ No newline at end of file
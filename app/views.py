@@ -1,11 +1,32 @@
 # capa de vista/presentación
 
-from django.shortcuts import redirect, render
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.shortcuts import redirect, render as django_render
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from .layers.services import services
+from .layers.utilities import metrics, translator
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, authenticate, login
 from django.contrib.auth.models import User
 from django.contrib import messages
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.middleware.csrf import get_token
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition, require_GET
+from .config import config
+from functools import wraps
+from hashlib import sha1
+from hmac import compare_digest
+from urllib.parse import urlencode
+
+# render de Django con el tiempo de armado del template medido (capa 'render' en Server-Timing y /metrics)
+@metrics.timed('render')
+def render(request, template_name, context=None, **kwargs):
+    return django_render(request, template_name, context, **kwargs)
 
 def index_page(request):
     return render(request, 'index.html')
@@ -79,36 +100,374 @@ def register(request):
     
     return render(request, 'registration/register.html')
 
-# esta función obtiene 2 listados: uno de las imágenes de la API y otro de favoritos, ambos en formato Card, y los dibuja en el template 'home.html'.
+# Cache HTTP de las páginas del catálogo. Para usuarios anónimos la página depende solo del catálogo y de la URL, así
+# que se valida con ETag/Last-Modified y un request repetido se responde con 304 sin volver a dibujar nada. Para
+# usuarios logueados (favoritos, token CSRF) la respuesta es privada y no se valida.
+def catalog_etag(request, *args, **kwargs):
+    if request.user.is_authenticated:
+        return None
+    return sha1(f'{services.getCatalogVersion()}:{request.get_full_path()}'.encode()).hexdigest()
+
+def catalog_last_modified(request, *args, **kwargs):
+    if request.user.is_authenticated:
+        return None
+    return services.getCatalogLastModified()
+
+# las respuestas de error (400, 404...) no se guardan ni se validan: sin ETag/Last-Modified y con no-store.
+def never_cache_error(response):
+    response.headers.pop('ETag', None)
+    response.headers.pop('Last-Modified', None)
+    add_never_cache_headers(response)
+    return response
+
+# una página incompleta (faltaron pokemon por el deadline o el cortacircuitos) no se guarda ni se valida, igual que un
+# error: el ETag es el de la versión del catálogo, que no cambia cuando llegan los que faltaban. Una página en streaming
+# tampoco: las cabeceras salen antes de saber si va a estar completa.
+def is_cacheable(response, completeness):
+    return response.status_code < 400 and completeness['complete'] and not response.streaming
+
+def catalog_cache(view):
+    if iscoroutinefunction(view):
+        return async_catalog_cache(view)
+    conditional_view = condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        completeness = services.trackCatalogCompleteness()
+        response = conditional_view(request, *args, **kwargs)
+        if not is_cacheable(response, completeness):
+            return never_cache_error(response)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=config.CATALOG_MAX_AGE)
+        return response
+    return wrapper
+
+# lo mismo que catalog_cache para vistas async (en Django 4.2 el decorador condition solo acepta vistas sync).
+def async_catalog_cache(view):
+    def validators(request):
+        last_modified = catalog_last_modified(request)
+        return catalog_etag(request), int(last_modified.timestamp()) if last_modified else None
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        completeness = services.trackCatalogCompleteness()
+        user = await services.getUserAsync(request)
+        if user.is_authenticated:
+            response = await view(request, *args, **kwargs)
+            if not is_cacheable(response, completeness):
+                return never_cache_error(response)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        etag, last_modified = await sync_to_async(validators)(request)
+        etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code == 200:
+                response.headers.setdefault('ETag', etag)
+                if last_modified:
+                    response.headers.setdefault('Last-Modified', http_date(last_modified))
+        if not is_cacheable(response, completeness):
+            return never_cache_error(response)
+        patch_cache_control(response, public=True, max_age=config.CATALOG_MAX_AGE)
+        return response
+    return wrapper
+
+# login_required para vistas async (el de Django 4.2 solo acepta vistas sync).
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await services.getUserAsync(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+# render para vistas async: el template se arma en un hilo, así no bloquea el event loop.
+async def render_async(request, template_name, context=None, **kwargs):
+    return await sync_to_async(render)(request, template_name, context, **kwargs)
+
+# Página con grilla de cards enviada en streaming (ver config.STREAM_COLD_PAGES): el template se dibuja con una marca en
+# lugar de las cards y se envía lo que está antes de la marca; después va cada card (card.html) apenas se obtiene y al
+# final el resto de la página. Así el primer byte y la primera card no esperan al pedido más lento a la API.
+CARDS_PLACEHOLDER = '<!-- cards -->'
+
+def stream_render(request, template_name, context, cards):
+    get_token(request)  # la cookie CSRF sale con las cabeceras: las cards se dibujan cuando ya se enviaron
+    with metrics.timer('render'):
+        head, tail = render_to_string(template_name, {**context, 'streaming': True}, request).split(CARDS_PLACEHOLDER, 1)
+    card_template = get_template('card.html')
+
+    def chunks():
+        yield head
+        empty = True
+        for card in cards:
+            empty = False
+            with metrics.timer('render'):
+                yield card_template.render({'img': card}, request)
+        if empty:
+            yield render_to_string('no_results.html')
+        yield tail
+    return StreamingHttpResponse(chunks())
+
+# stream_render para vistas async: bajo ASGI, Django consume entero un iterador sync antes de enviarlo, así que cada
+# parte se pide en un hilo y se entrega desde un iterador async.
+async def stream_render_async(request, template_name, context, cards):
+    response = await sync_to_async(stream_render)(request, template_name, context, cards)
+    chunks = iter(response.streaming_content)
+
+    async def async_chunks():
+        while (chunk := await sync_to_async(next, thread_sensitive=False)(chunks, None)) is not None:
+            yield chunk
+    response.streaming_content = async_chunks()
+    return response
+
+# esta función obtiene 2 listados: una página de imágenes de la API y los favoritos, ambos en formato Card, y los dibuja en el template 'home.html'.
+# Si la página no está en cache, se envía en streaming (ver stream_render).
+@catalog_cache
 def home(request):
-    images = services.getAllImages(request)
+    cold_page = services.getColdImagesPage(request, request.GET.get('page')) if config.STREAM_COLD_PAGES else None
+    if cold_page:
+        page, cards = cold_page
+        return stream_render(request, 'home.html', { 'page_obj': page }, cards)
+
+    page = services.getImagesPage(request, request.GET.get('page'))
     favourite_list = services.getAllFavourites(request)
 
-    return render(request, 'home.html', { 'images': images, 'favourite_list': favourite_list })
+    return render(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'favourite_list': favourite_list })
 
 # función utilizada en el buscador.
+@catalog_cache
 def search(request):
-    name = request.POST.get('query', '')
+    name = request.GET.get('query', '')
 
     # si el usuario ingresó algo en el buscador, se deben filtrar las imágenes por dicho ingreso.
     if name:
-        images = services.filterByCharacter(name)
+        page = services.paginate(services.filterByCharacter(name, request), request.GET.get('page'))
         favourite_list = services.getAllFavourites(request)
-        return render(request, 'home.html', { 'images': images, 'favourite_list': favourite_list })
+        return render(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'page_query': urlencode({'query': name}), 'favourite_list': favourite_list })
     
     return redirect('home')
 
-# función utilizada para filtrar por el tipo del Pokemon
+# función utilizada para filtrar por el tipo del Pokemon. El tipo puede ser una combinación ("fire AND flying") y
+# se puede acotar además por nombre con el parámetro 'query'.
+@catalog_cache
 def filter_by_type(request):
-    type_filter = request.POST.get('type', '')
+    type_filter = request.GET.get('type', '')
+    name = request.GET.get('query', '')
 
     if type_filter:
-        images = services.filterByType(type_filter) # debe traer un listado filtrado de imágenes, segun si es o contiene ese tipo.
+        try:
+            images = services.filterByType(type_filter, name, request) # debe traer un listado filtrado de imágenes, segun si es o contiene ese tipo.
+        except ValueError as e:
+            messages.error(request, str(e))
+            images = []
+        page = services.paginate(images, request.GET.get('page'))
         favourite_list = services.getAllFavourites(request)
-        return render(request, 'home.html', { 'images': images, 'favourite_list': favourite_list })
+        page_query = urlencode({'type': type_filter, 'query': name} if name else {'type': type_filter})
+        return render(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'page_query': page_query, 'favourite_list': favourite_list })
     
     return redirect('home')
 
+# variantes async de home, search y filter_by_type (ver config.ASYNC_VIEWS): mismas respuestas, pero mientras esperan
+# a PokeAPI o a la base el event loop sigue atendiendo otros requests.
+@catalog_cache
+async def home_async(request):
+    if config.STREAM_COLD_PAGES:
+        cold_page = await sync_to_async(services.getColdImagesPage)(request, request.GET.get('page'))
+        if cold_page:
+            page, cards = cold_page
+            return await stream_render_async(request, 'home.html', { 'page_obj': page }, cards)
+
+    page = await services.getImagesPageAsync(request, request.GET.get('page'))
+    favourite_list = await services.getAllFavouritesAsync(request)
+
+    return await render_async(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'favourite_list': favourite_list })
+
+@catalog_cache
+async def search_async(request):
+    name = request.GET.get('query', '')
+
+    if name:
+        page = services.paginate(await services.filterByCharacterAsync(name, request), request.GET.get('page'))
+        favourite_list = await services.getAllFavouritesAsync(request)
+        return await render_async(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'page_query': urlencode({'query': name}), 'favourite_list': favourite_list })
+
+    return redirect('home')
+
+@catalog_cache
+async def filter_by_type_async(request):
+    type_filter = request.GET.get('type', '')
+    name = request.GET.get('query', '')
+
+    if type_filter:
+        try:
+            images = await services.filterByTypeAsync(type_filter, name, request)
+        except ValueError as e:
+            messages.error(request, str(e))
+            images = []
+        page = services.paginate(images, request.GET.get('page'))
+        favourite_list = await services.getAllFavouritesAsync(request)
+        page_query = urlencode({'type': type_filter, 'query': name} if name else {'type': type_filter})
+        return await render_async(request, 'home.html', { 'images': page.object_list, 'page_obj': page, 'page_query': page_query, 'favourite_list': favourite_list })
+
+    return redirect('home')
+
+# API JSON (/api/...). Usa los mismos servicios que las vistas HTML; las cards se devuelven con los campos de
+# translator.CARD_FIELDS, o solo los indicados en ?fields=name,types.
+def api_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+def parse_fields(request):
+    fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+    unknown = [field for field in fields if field not in translator.CARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(translator.CARD_FIELDS)}")
+    return fields or None
+
+# ?limit=N acotado a maximum; el mensaje de error es fijo (no el de int()).
+def parse_limit(request, default, maximum):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ValueError("limit debe ser un número")
+    if limit < 1:
+        raise ValueError("limit debe ser mayor a 0")
+    return min(limit, maximum)
+
+# el cursor es opaco para el cliente: solo tiene que reenviar el 'next' que recibió.
+def encode_cursor(pokemon_id):
+    return urlsafe_b64encode(str(pokemon_id).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        return int(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+def stream_json_list(cards, fields):
+    # arma el JSON de a una card: nunca está el listado completo en memoria.
+    yield '['
+    for position, card in enumerate(cards):
+        yield (',' if position else '') + json.dumps(translator.fromCardIntoDict(card, fields), separators=(',', ':'))
+    yield ']'
+
+# listado del catálogo paginado por cursor: ?cursor=...&limit=...&type=...&fields=...
+# Con ?stream=1 devuelve el catálogo completo como un único array JSON que se va enviando a medida que se arma.
+@require_GET
+@catalog_cache
+def api_pokemon_list(request):
+    try:
+        fields = parse_fields(request)
+        if request.GET.get('stream'):
+            return StreamingHttpResponse(stream_json_list(services.iterCatalog(request), fields), content_type='application/json')
+
+        cursor = request.GET.get('cursor')
+        after_id = decode_cursor(cursor) if cursor else None
+        limit = parse_limit(request, config.PAGE_SIZE, config.API_MAX_LIMIT)
+        cards, next_cursor = services.getCatalogSlice(after_id, limit, request.GET.get('type'), request)
+    except ValueError as e:
+        return api_error(str(e))
+
+    next_url = None
+    if next_cursor is not None:
+        query = request.GET.copy()
+        query['cursor'] = encode_cursor(next_cursor)
+        next_url = f'{request.path}?{query.urlencode()}'
+
+    return JsonResponse({'results': [translator.fromCardIntoDict(card, fields) for card in cards], 'next': next_url})
+
+@require_GET
+@catalog_cache
+def api_pokemon_detail(request, pokemon_id):
+    try:
+        fields = parse_fields(request)
+    except ValueError as e:
+        return api_error(str(e))
+
+    card = services.getCard(pokemon_id, request)
+    if card is None:
+        return api_error("Pokemon no encontrado", status=404)
+    return JsonResponse(translator.fromCardIntoDict(card, fields))
+
+# estado del catálogo en este proceso: versión, tamaño del cache y cuándo se refrescó por última vez (y cuánto tardó).
+@require_GET
+def api_catalog_status(request):
+    response = JsonResponse(services.getCatalogStatus())
+    patch_cache_control(response, no_cache=True)
+    return response
+
+# sugerencias para el buscador mientras se escribe: /api/autocomplete/?q=pika&limit=8 ->
+# [{"id":25,"name":"pikachu","image":"/sprites/icon/..."}]. La respuesta no depende del usuario (no se lee la sesión),
+# así que es pública para navegadores y proxies y se valida con la versión del catálogo. El limit se valida antes: un
+# 400 no lleva ETag (ni responde 304 a un If-None-Match).
+def autocomplete_etag(request, *args, **kwargs):
+    return sha1(f'{services.getCatalogVersion()}:{request.get_full_path()}'.encode()).hexdigest()
+
+@require_GET
+def api_autocomplete(request):
+    try:
+        limit = parse_limit(request, config.AUTOCOMPLETE_LIMIT, config.AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError as e:
+        return never_cache_error(api_error(str(e)))
+    return autocomplete_suggestions(request, limit)
+
+@condition(etag_func=autocomplete_etag)
+def autocomplete_suggestions(request, limit):
+    response = HttpResponse(services.getSuggestions(request.GET.get('q', ''), limit), content_type='application/json')
+    patch_cache_control(response, public=True, max_age=config.CATALOG_MAX_AGE)
+    return response
+
+# métricas para Prometheus: cache hit ratio, latencia de PokeAPI, consultas a la base y tiempos por capa. No son
+# públicas: solo para staff o con el token de config.METRICS_TOKEN.
+def can_see_metrics(request):
+    if request.user.is_staff:
+        return True
+    authorization = request.headers.get('Authorization', '')
+    return bool(config.METRICS_TOKEN) and compare_digest(authorization.encode(), f'Bearer {config.METRICS_TOKEN}'.encode())
+
+@require_GET
+def metrics_view(request):
+    if not can_see_metrics(request):
+        return HttpResponseForbidden()
+    response = HttpResponse(services.getMetrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_cache=True)
+    return response
+
+# favoritos del usuario logueado. Sin sesión responde 401 en lugar de redirigir al login como las vistas HTML.
+@require_GET
+def api_favourites(request):
+    if not request.user.is_authenticated:
+        return api_error("Autenticación requerida", status=401)
+    try:
+        fields = parse_fields(request)
+    except ValueError as e:
+        return api_error(str(e))
+
+    favourite_list = services.getAllFavourites(request)
+    response = JsonResponse({'results': [translator.fromCardIntoDict(card, fields) for card in favourite_list]})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+# proxy de imágenes: sirve desde el disco la miniatura de una imagen de PokeAPI (ver services.getThumbnailUrl). La URL
+# identifica una imagen que no cambia, así que el navegador puede guardarla sin volver a preguntar.
+@require_GET
+def sprite(request, size, path):
+    thumbnail = services.getThumbnail(size, path)
+    if thumbnail is None:
+        raise Http404("Imagen no encontrada")
+
+    content, content_type = thumbnail
+    if isinstance(content, bytes):  # no se pudo guardar en disco: se sirve igual, sin archivo
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        response = FileResponse(open(content, 'rb'), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=config.IMAGE_MAX_AGE, immutable=True)
+    return response
+
 # Estas funciones se usan cuando el usuario está logueado en la aplicación.
 @login_required
 def getAllFavouritesByUser(request):
@@ -118,13 +477,43 @@ def getAllFavouritesByUser(request):
 @login_required
 def saveFavourite(request):
     if request.method == "POST":
-        services.saveFavourite(request)
+        try:
+            services.saveFavourite(request) # uno o varios 'id'; los datos de cada pokemon salen del catálogo
+        except ValueError as e:
+            messages.error(request, str(e))
     return redirect('home')
 
 @login_required
 def deleteFavourite(request):
     if request.method == "POST":
-        services.deleteFavourite(request)
+        try:
+            services.deleteFavourite(request)
+        except ValueError as e:
+            messages.error(request, str(e))
+    return redirect('home')
+
+# variantes async de las vistas de favoritos (ver config.ASYNC_VIEWS).
+@async_login_required
+async def getAllFavouritesByUserAsync(request):
+    favourite_list = await services.getAllFavouritesAsync(request)
+    return await render_async(request, 'favourites.html', { 'favourite_list': favourite_list })
+
+@async_login_required
+async def saveFavouriteAsync(request):
+    if request.method == "POST":
+        try:
+            await services.saveFavouriteAsync(request)
+        except ValueError as e:
+            await sync_to_async(messages.error)(request, str(e))
+    return redirect('home')
+
+@async_login_required
+async def deleteFavouriteAsync(request):
+    if request.method == "POST":
+        try:
+            await services.deleteFavouriteAsync(request)
+        except ValueError as e:
+            await sync_to_async(messages.error)(request, str(e))
     return redirect('home')
 
 @login_required
@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
+# Bajo ASGI las descargas a PokeAPI usan el motor asíncrono (ver app/layers/transport/async_transport.py).
+os.environ.setdefault('POKEMON_TRANSPORT_ENGINE', 'async')
+# ...y las vistas del catálogo y de favoritos son las async (ver config.ASYNC_VIEWS). Con ellas las conexiones a la
+# base no son persistentes aunque se pida DB_CONN_MAX_AGE (ver DATABASES en main/settings.py).
+os.environ.setdefault('POKEMON_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -1,4 +1,13 @@
 from app.config import config
+from app.layers.services import services
+from django.utils.functional import SimpleLazyObject
 
 def version(request):
-    return {'VERSION': config.VERSION} 
\ No newline at end of file
+    return {'VERSION': config.VERSION}
+
+# versión del catálogo para las claves del cache de fragmentos (ver home.html). Es perezosa: solo se calcula si el template la usa.
+def catalog(request):
+    return {
+        'CATALOG_VERSION': SimpleLazyObject(services.getCatalogVersion),
+        'CARD_FRAGMENT_TIMEOUT': config.CARD_FRAGMENT_TIMEOUT,
+    }
@@ -0,0 +1,68 @@
+# middleware: mide cada request (tiempo total, consultas a la base y tiempos por capa de app/layers/utilities/metrics.py),
+# los manda en la cabecera Server-Timing, los suma a las métricas de /metrics y deja una línea de log JSON por request.
+# Funciona igual con vistas sync (WSGI) y async (ASGI): no obliga a Django a pasar las vistas async a un hilo.
+
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from app.layers.utilities import metrics
+
+logger = logging.getLogger('app.requests')
+
+
+class TimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - start
+            timings = metrics.end_request(token)
+        return self.finish(request, response, timings, total)
+
+    async def __acall__(self, request):
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            total = time.perf_counter() - start
+            timings = metrics.end_request(token)
+        return self.finish(request, response, timings, total)
+
+    def finish(self, request, response, timings, total):
+        # las consultas SQL las cuenta metrics.time_queries (instalado en cada conexión) en la capa 'db'
+        query_count = timings['db'][1] if 'db' in timings else 0
+        response['Server-Timing'] = metrics.server_timing(timings, total)
+
+        view = request.resolver_match.url_name if request.resolver_match else None
+        view = view or 'unknown'
+        metrics.registry.inc('app_http_requests_total', view=view, status=response.status_code)
+        metrics.registry.observe('app_http_request_duration_seconds', total, view=view)
+        metrics.registry.inc('app_db_queries_total', query_count)
+        metrics.registry.observe('app_db_queries_per_request', query_count)
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_queries': query_count,
+            'timings_ms': {layer: round(seconds * 1000, 1) for layer, (seconds, _) in timings.items()},
+        }))
+        return response
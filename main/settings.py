@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.TimingMiddleware',  # primero: mide el request completo, incluidas las consultas de sesión y usuario
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -46,7 +47,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -54,6 +54,15 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'main.context_processors.version',
+                'main.context_processors.catalog',
+            ],
+            # Los templates se compilan una sola vez por proceso. Con DEBUG el autoreloader vacía este cache
+            # cuando cambia un template, así que también sirve en desarrollo.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -65,13 +74,84 @@ WSGI_APPLICATION = 'main.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# SQLite con varios hilos/workers: una conexión por request salvo que se pidan conexiones persistentes con
+# DB_CONN_MAX_AGE (segundos; con health checks, así una conexión cortada se reemplaza) y, al abrir cada conexión, los
+# PRAGMA de SQLITE_PRAGMAS (ver app/layers/persistence/sqlite.py):
+#   - journal_mode=WAL: los lectores no bloquean al escritor ni al revés (solo se serializan las escrituras).
+#   - synchronous=NORMAL: con WAL es seguro ante caídas del proceso; solo se puede perder la última transacción si se
+#     corta la luz, a cambio de no hacer fsync en cada commit.
+#   - busy_timeout: cuánto espera una escritura a que se libere el lock antes de fallar con "database is locked".
+# Con las vistas async (POKEMON_ASYNC_VIEWS, por defecto bajo ASGI, ver main/asgi.py) el ORM corre en los hilos de
+# sync_to_async, donde Django no cierra de forma confiable las conexiones persistentes: ahí siempre es una por request.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0))
+if os.environ.get('POKEMON_ASYNC_VIEWS', '0').lower() in ('1', 'true', 'yes'):
+    DB_CONN_MAX_AGE = 0
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,  # segundos; el mismo valor que busy_timeout
+        },
     }
 }
 
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,  # milisegundos
+    'temp_store': 'memory',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# El alias 'pokemon' guarda los datos de PokeAPI y se comparte entre workers (salvo con locmem, que es por proceso).
+# Se elige con la variable de entorno POKEMON_CACHE_BACKEND: locmem (por defecto), file, db o redis.
+# Para 'db' hay que crear la tabla con: python manage.py createcachetable
+# Para 'redis' (o un servidor compatible) se usa el backend de Django, con la URL de POKEMON_CACHE_LOCATION.
+
+POKEMON_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pokemon',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('POKEMON_CACHE_LOCATION', BASE_DIR / 'cache' / 'pokemon'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'pokemon_cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('POKEMON_CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # HTML ya dibujado de las cards ({% cache %} en home.html)
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'pokemon': {
+        **POKEMON_CACHE_BACKENDS[os.environ.get('POKEMON_CACHE_BACKEND', 'locmem')],
+        'TIMEOUT': None,
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -119,4 +199,27 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # VARIABLES QUE INTEGRAN LOS REDIRECTS DE AUTH
 LOGIN_REDIRECT_URL = 'index-page'
-LOGOUT_REDIRECT_URL = 'index-page'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'index-page'
+
+
+# Logging
+# https://docs.djangoproject.com/en/4.2/topics/logging/
+# 'app.requests' deja una línea JSON por request (vista, código, duración, consultas y tiempos por capa; ver
+# main/middleware.py). Se silencia con APP_REQUEST_LOG_LEVEL=WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'app.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('APP_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
\ No newline at end of file